@@ -10,6 +10,79 @@ class Settings(BaseSettings):
     FALLBACK_TEXT: str = "I'm having trouble connecting right now. Please try again later."
     DEFAULT_PERSONA: str = "Teacher"
     AVAILABLE_PERSONAS: list[str] = ["Teacher", "Pirate", "Cowboy", "Robot"]
+    STT_MAX_CONCURRENT_JOBS: int = 4
+    STT_DEADLINE_SECONDS: float = 120.0
+    # Per-provider bulkheads: concurrent calls, waiting calls beyond that, max wait for a slot
+    BULKHEAD_QUEUE_TIMEOUT: float = 2.0
+    BULKHEAD_STT_QUEUE: int = 16  # concurrency is STT_MAX_CONCURRENT_JOBS
+    BULKHEAD_LLM_CONCURRENCY: int = 16
+    BULKHEAD_LLM_QUEUE: int = 32
+    BULKHEAD_LOOKUP_CONCURRENCY: int = 8
+    BULKHEAD_LOOKUP_QUEUE: int = 16
+    BULKHEAD_SEARCH_CONCURRENCY: int = 8
+    BULKHEAD_SEARCH_QUEUE: int = 32
+    BULKHEAD_NEWS_CONCURRENCY: int = 4
+    BULKHEAD_NEWS_QUEUE: int = 16
+    BULKHEAD_TTS_CONCURRENCY: int = 8
+    BULKHEAD_TTS_QUEUE: int = 32
+    BULKHEAD_MURF_WS_CONCURRENCY: int = 16
+    BULKHEAD_MURF_WS_QUEUE: int = 32
+    MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024
+    SEARCH_CACHE_SIZE: int = 512
+    SEARCH_CACHE_STALE_SECONDS: float = 300.0
+    SEARCH_CACHE_DB: str = ""
+    LOCATION_CACHE_SIZE: int = 2048
+    LOCATION_CACHE_DB: str = ""  # e.g. "data/location_cache.db" to keep geocodes across restarts; empty is memory only
+    SEARCH_HEDGE_DELAY: float = 0.8
+    SEARCH_DEADLINE: float = 4.0
+    NEWS_CACHE_SIZE: int = 256
+    NEWS_CACHE_TTL: float = 120.0
+    NEWS_FEEDS: list[str] = ["https://news.google.com/rss?hl=en-IN&gl=IN&ceid=IN:en"]
+    NEWS_REGIONS: list[str] = ["India", "Punjab", "Delhi", "Mumbai", "Bengaluru"]
+    NEWS_POLL_INTERVAL: float = 300.0
+    NEWS_INDEX_MAX_ITEMS: int = 5000
+    NEWS_INDEX_MAX_AGE_HOURS: float = 48.0
+    TTS_CACHE_DIR: str = "static/tts_cache"
+    TTS_CACHE_URL: str = "/static/tts_cache"
+    TTS_CACHE_MAX_BYTES: int = 100 * 1024 * 1024
+    TTS_WARMUP: bool = True
+    TTS_WARMUP_SHUTDOWN_SECONDS: float = 5.0  # how long shutdown waits for the clip in progress
+    SESSION_HISTORY_LIMIT: int = 20
+    SESSION_TTL_SECONDS: float = 1800.0
+    SESSION_MAX_COUNT: int = 10000
+    SESSION_MAX_BYTES: int = 64 * 1024 * 1024
+    SESSION_BACKEND: str = "memory"  # "sqlite" shares history across gunicorn workers
+    SESSION_DB: str = "sessions.db"
+    PROMPT_TOKENIZER: str = "cl100k_base"  # tiktoken encoding; empty uses the len/4 estimate
+    PROMPT_HISTORY_TOKENS_VOICE: int = 600
+    PROMPT_HISTORY_TOKENS_AGENT: int = 1500
+    CHAT_POOL_MAX_SESSIONS: int = 1000
+    CHAT_POOL_MAX_BYTES: int = 32 * 1024 * 1024
+    COMPACTION_ENABLED: bool = True  # summarize turns trimmed from a chat instead of forgetting them
+    COMPACTION_SUMMARY_WORDS: int = 120
+    BARGE_IN_ENABLED: bool = True  # user speech cancels the reply in progress
+    BARGE_IN_MIN_WORDS: int = 2  # partial transcript length that counts as talking over the reply
+    SPECULATION_ENABLED: bool = True  # start the LLM on a stable partial transcript before end of turn
+    SPECULATION_STABLE_SECONDS: float = 0.4  # how long a partial must stay unchanged
+    SPECULATION_MAX_EDITS: int = 2  # normalized character edits between partial and final that still commit
+    AUDIO_UPSTREAM_WRITE_LIMIT: int = 32768  # bytes of mic audio buffered for AssemblyAI (~1 s) before backpressure
+    AUDIO_CAPTURE_SECONDS: float = 0.0  # keep the last N seconds of mic audio per session; 0 disables
+    AUDIO_CAPTURE_DIR: str = ""  # where captures are written as <session>.wav on disconnect; empty keeps them only while the session is live
+    VAD_ENABLED: bool = True  # drop mic silence before it reaches AssemblyAI
+    VAD_THRESHOLD_DB: float = -45.0  # RMS level (dBFS) that counts as voice
+    VAD_ZCR_MAX: float = 0.4  # zero-crossing rate above which a loud window is treated as hiss
+    VAD_HANGOVER_SECONDS: float = 1.5  # audio still sent after speech; must cover AssemblyAI's end-of-turn silence
+    VAD_PREROLL_SECONDS: float = 0.3  # silence held back and sent when speech starts
+    VAD_KEEPALIVE_SECONDS: float = 1.0  # one zero frame this often during long silence; 0 sends none
+    COALESCE_FRAME_MS: int = 100  # audio per upstream message; a session can pick its own with ?frame_ms=
+    COALESCE_MIN_FRAME_MS: int = 50
+    COALESCE_MAX_FRAME_MS: int = 1000
+    COALESCE_MAX_DELAY_MS: int = 150  # a partial frame older than this is sent as is
+    MEMORY_ENABLED: bool = True  # BM25 recall of older turns into the current message
+    MEMORY_TOP_K: int = 3
+    MEMORY_MIN_SCORE: float = 1.0
+    MEMORY_MAX_TURNS: int = 2000  # per session
+    MEMORY_MAX_SESSIONS: int = 1000
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -1,9 +1,13 @@
+import asyncio
 import logging
+import threading
+from typing import Optional
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
-from app.routes import root, tts, llm, agent, websocket_route, audio_transcribe 
-from fastapi.responses import HTMLResponse
+from app.routes import root, tts, llm, agent, websocket_route, audio_transcribe, metrics
+from fastapi.responses import HTMLResponse, JSONResponse
+from app.config import settings
 import os
 import json
 
@@ -17,6 +21,10 @@ logging.basicConfig(
 )
 log = logging.getLogger("app")
 
+# Background TTS warm-up, stopped on shutdown
+_warmup: Optional[asyncio.Future] = None
+_warmup_stop = threading.Event()
+
 app = FastAPI(title="AI Voice Agent", version="0.2.0")
 
 # Static files
@@ -29,6 +37,55 @@ app.include_router(llm.router)
 app.include_router(agent.router)
 app.include_router(websocket_route.router)
 app.include_router(audio_transcribe.router)
+app.include_router(metrics.router)
+
+# Reject oversized uploads from the Content-Length header, before the body is read
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    length = request.headers.get("content-length")
+    if request.method == "POST" and length and length.isdigit() and int(length) > settings.MAX_UPLOAD_BYTES:
+        return JSONResponse(status_code=413, content={"detail": f"Request body exceeds {settings.MAX_UPLOAD_BYTES} bytes"})
+    return await call_next(request)
+
+@app.on_event("startup")
+async def startup():
+    from app.services.murf_pool import murf_pool
+    from app.services.news_index import news_poller
+    from app.services.storage import store
+    # Warm Murf socket so the first reply skips the TLS + websocket handshake
+    await murf_pool.start()
+    # Keep the local news index fresh so news intents rarely go upstream
+    news_poller.start()
+    # Session write-behind flusher (no-op for the in-memory backend)
+    await store.start()
+    if settings.TTS_WARMUP:
+        from app.services.personas import canned_texts
+        from app.services.tts_murf import tts
+        global _warmup
+        # Fixed replies are synthesized once in the background, never on a live turn
+        _warmup_stop.clear()
+        _warmup = asyncio.get_running_loop().run_in_executor(
+            None, lambda: tts.warm([settings.FALLBACK_TEXT, *canned_texts()], stop=_warmup_stop))
+        _warmup.add_done_callback(_warmup_done)
+
+
+def _warmup_done(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        log.error("TTS warm-up failed: %s", future.exception())
+
+@app.on_event("shutdown")
+async def shutdown():
+    from app.services.murf_pool import murf_pool
+    from app.services.news_index import news_poller
+    from app.services.storage import store
+    if _warmup is not None and not _warmup.done():
+        # The executor thread can't be cancelled: have it stop after the clip in progress
+        _warmup_stop.set()
+        await asyncio.wait([_warmup], timeout=settings.TTS_WARMUP_SHUTDOWN_SECONDS)
+    await murf_pool.close()
+    await news_poller.stop()
+    # Flush any queued session writes before exit
+    await store.close()
 
 # API endpoint to save user-provided API keys
 @app.post("/api/save-api-keys")
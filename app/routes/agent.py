@@ -1,39 +1,29 @@
-import os
-from fastapi import APIRouter, File, UploadFile
-from app.utils.files import save_temp_upload
+from fastapi import APIRouter, BackgroundTasks, File, UploadFile
+from app.utils.files import iter_upload
 from app.services.stt_assemblyai import stt
 from app.services.llm_gemini import llm
 from app.services.tts_murf import tts
 from app.services.storage import store
+from app.services.prompt_builder import agent_prompts
 from app.config import settings
 from app.models.schemas import AgentChatResponse
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
 @router.post("/chat/{session_id}", response_model=AgentChatResponse)
-async def chat(session_id: str, file: UploadFile = File(...), persona: str = "Teacher"):
-    path = await save_temp_upload(file)
-    try:
-        transcription = stt.transcribe_file(path) or settings.FALLBACK_TEXT
-        store.append(session_id, "user", transcription)
+async def chat(session_id: str, background_tasks: BackgroundTasks, file: UploadFile = File(...), persona: str = "Teacher"):
+    transcription = await stt.atranscribe_stream(iter_upload(file)) or settings.FALLBACK_TEXT
+    store.append(session_id, "user", transcription)
 
-        # Build prompt from history
-        history = store.history(session_id)
-        prompt = "\n".join(
-            f"{'User' if m['role']=='user' else 'Assistant'}: {m['content']}"
-            for m in history
-        )
+    # The session's pooled Gemini chat already holds the earlier turns; only the new one is sent
+    history = await store.ahistory(session_id)
+    reply = await llm.agenerate_chat(session_id, history, persona, prompts=agent_prompts) or settings.FALLBACK_TEXT
+    if len(reply) > 3000:
+        reply = reply[:2990] + "..."
 
-        # Generate persona-specific prompt
-        persona_prompt = llm.generate_persona_prompt(persona, prompt)
-        reply = llm.generate(persona_prompt, persona) or settings.FALLBACK_TEXT
-        if len(reply) > 3000:
-            reply = reply[:2990] + "..."
+    store.append(session_id, "assistant", reply)
+    audio = await tts.asynth(reply) or await tts.asynth(settings.FALLBACK_TEXT)
+    # Runs after the response is sent: fold trimmed turns into the rolling summary
+    background_tasks.add_task(llm.compactor.run, session_id)
 
-        store.append(session_id, "assistant", reply)
-        audio = tts.synth(reply) or tts.synth(settings.FALLBACK_TEXT)
-
-        return {"transcription": transcription, "response": reply, "audioUrl": audio}
-    finally:
-        if os.path.exists(path):
-            os.remove(path)
+    return {"transcription": transcription, "response": reply, "audioUrl": audio}
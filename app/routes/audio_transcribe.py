@@ -1,6 +1,15 @@
-from app.services.stream_gemini_to_murf import stream_gemini_to_murf
+from app.services.stream_gemini_to_murf import stream_gemini_to_murf, stream_text_to_murf, iter_sentences, TurnTimings
 from app.services.llm_gemini import llm
-from app.services.storage import store
+from app.services.personas import canned_reply
+from app.services.intents import intents
+from app.services.tts_murf import tts
+from app.services.storage import Message, store
+from app.services.prompt_builder import voice_prompts
+from app.services.memory_index import memory
+from app.services.turns import TurnRunner, is_barge_in, stats as turn_stats
+from app.services.speculation import Speculation, Speculator
+from app.services.audio_ingress import AudioForwarder, AudioRing, FrameCoalescer
+from app.services.vad import VoiceGate
 from app.config import settings
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import os
@@ -8,6 +17,8 @@ import json
 import websockets
 import asyncio
 import base64
+import time
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,37 +27,17 @@ API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
 router = APIRouter()
 
 
-def build_prompt_from_history(history, max_turns=3, persona="Teacher"):
-    # Persona-specific instructions, all include authorship
-    persona_prompts = {
-        "Default": (
-            "You are Echo, a friendly, helpful AI assistant for general conversation. Always introduce yourself as Echo. Keep your answers short, conversational, and approachable. Example: User: Who are you? Assistant: I'm Echo, your helpful AI assistant. Ask me anything!"
-        ),
-        "Teacher": (
-            "You are Ms. Ananya, a female teacher persona for Echo. Speak warmly and like a real human teacher, using short, clear, and encouraging sentences. Example: User: What is photosynthesis? Assistant: Sure! Photosynthesis is how plants make food from sunlight. Want more details? Only give a long explanation if the user asks for more depth."
-        ),
-        "Pirate": (
-            "You are Captain Vikrant, a pirate persona. Always start with a pirate greeting like 'Ahoy!' or 'Arrr!'. Use pirate slang and keep answers short and fun. Example: User: Who are you? Assistant: Arrr! I be Captain Echo, yer pirate pal!"
-        ),
-        "Cowboy": (
-            "You are Veer Echo, a cowboy persona from India. Always start with a greeting like 'Namaste!' or 'Salaam!'. Use Indian cowboy slang, short sentences, and a friendly tone. Example: User: Who are you? Assistant: Namaste! Name's Veer Echo, your cowboy buddy."
-        ),
-        "Robot": (
-            "You are Robo Echo, a robot persona. Start with 'Beep boop!' and speak in a mechanical, logical way, but keep it short and clear. Example: User: Who are you? Assistant: Beep boop! I am Robo Echo, your robot assistant."
-        )
-    }
-    # Use Default if persona is not recognized
-    system = persona_prompts.get(persona, persona_prompts["Default"])
-    prompt = system + "\n\n"
-    
-    # Only use the last max_turns*2 messages (user+assistant pairs)
-    if len(history) > max_turns * 2:
-        history = history[-max_turns*2:]
-    for msg in history:
-        role = "User" if msg["role"] == "user" else "Assistant"
-        prompt += f"{role}: {msg['content']}\n"
-    prompt += "Assistant:"
-    return prompt
+async def stream_llm_reply(session_id: str, history: list, persona: str, websocket: WebSocket, parts: list, deltas=None):
+    """Yield LLM deltas (or an already started reply's) while mirroring them to the client as ai_text_delta messages."""
+    if deltas is None:
+        deltas = llm.astream_chat(session_id, history, persona, prompts=voice_prompts)
+    async for delta in deltas:
+        parts.append(delta)
+        await websocket.send_text(json.dumps({
+            "type": "ai_text_delta",
+            "text": delta
+        }))
+        yield delta
 
 @router.websocket("/ws/transcribe")
 async def websocket_transcribe(websocket: WebSocket):
@@ -58,33 +49,142 @@ async def websocket_transcribe(websocket: WebSocket):
     persona = websocket.query_params.get("persona", "Teacher")
     print(f"Using persona: {persona}")
 
+    # Upstream frame size per session, e.g. ?frame_ms=50 for lower latency; 0 forwards chunks as they come
+    try:
+        frame_ms = int(websocket.query_params.get("frame_ms", settings.COALESCE_FRAME_MS))
+    except ValueError:
+        frame_ms = settings.COALESCE_FRAME_MS
+    if frame_ms:
+        frame_ms = min(max(frame_ms, settings.COALESCE_MIN_FRAME_MS), settings.COALESCE_MAX_FRAME_MS)
+
     url = "wss://streaming.assemblyai.com/v3/ws?sample_rate=16000"
     headers = {"Authorization": API_KEY}
 
-    # Use websocket id as session_id
-    session_id = str(id(websocket))
+    # One history per connection; dropped again on disconnect
+    session_id = uuid.uuid4().hex
+    turns = None
+    speculator = None
+    capture = None
     try:
-        async with websockets.connect(url, extra_headers=headers) as assemblyai_ws:
+        # write_limit bounds the audio buffered for AssemblyAI; past it, sends wait and we stop reading the client
+        async with websockets.connect(url, extra_headers=headers, write_limit=settings.AUDIO_UPSTREAM_WRITE_LIMIT) as assemblyai_ws:
+
+            if settings.AUDIO_CAPTURE_SECONDS > 0:
+                # Last N seconds of 16 kHz 16-bit mono, constant memory per session
+                capture = AudioRing(int(settings.AUDIO_CAPTURE_SECONDS * 16000 * 2))
+            gate = None
+            if settings.VAD_ENABLED:
+                # Silence is dropped before AssemblyAI; the hangover still carries the pause that ends a turn
+                gate = VoiceGate(16000, settings.VAD_THRESHOLD_DB, settings.VAD_ZCR_MAX,
+                                 settings.VAD_HANGOVER_SECONDS, settings.VAD_PREROLL_SECONDS, settings.VAD_KEEPALIVE_SECONDS)
+            # Fixed-size frames instead of one upstream message per client chunk
+            coalescer = FrameCoalescer(frame_ms * 16000 // 1000 * 2) if frame_ms else None
+            forwarder = AudioForwarder(assemblyai_ws.send, ring=capture, gate=gate, coalescer=coalescer,
+                                       max_delay=settings.COALESCE_MAX_DELAY_MS / 1000)
 
             async def forward_audio():
                 try:
-                    audio_chunks = []  # Array to accumulate base64 chunks on server
                     while True:
-                        # Receive binary audio chunk from client
-                        audio_chunk = await websocket.receive_bytes()
-                        # Convert to base64 and accumulate
-                        base64_chunk = base64.b64encode(audio_chunk).decode('utf-8')
-                        audio_chunks.append(base64_chunk)
-                        print(f"Server Acknowledgement: Audio data received, base64 length: {len(base64_chunk)}")
-                        await assemblyai_ws.send(audio_chunk)
+                        # Raw PCM, re-framed but never re-encoded
+                        await forwarder.forward(await websocket.receive_bytes())
                 except WebSocketDisconnect:
                     print("Client disconnected")
                     await assemblyai_ws.close()
                 except Exception as e:
                     print(f"Error forwarding audio: {e}")
                     await assemblyai_ws.close()
+                finally:
+                    forwarder.close()
+
+            turns = TurnRunner()
+
+            def speculate(text: str, final):
+                """Reply stream for a stable partial transcript, or None when it should not be speculated on."""
+                if turns.active:
+                    return None
+                # Only plain chat turns: lookups hit live services and canned replies need no head start
+                if intents.route(text, group="lookup") is not None:
+                    return None
+                history = store.cached_history(session_id) + [Message("user", text)]
+                if canned_reply(text, persona=persona, history=history) is not None:
+                    return None
+                # Nothing is stored until the final transcript confirms the text
+                return llm.astream_chat(session_id, history, persona, prompts=voice_prompts, final=final)
+
+            speculator = Speculator(speculate, settings.SPECULATION_STABLE_SECONDS, settings.SPECULATION_MAX_EDITS)
+
+            async def respond(transcript: str, spec: Speculation = None):
+                """One reply turn; runs as a task so barge-in can cancel it."""
+                # Store user message
+                store.append(session_id, "user", transcript)
+                history = await store.ahistory(session_id)
+
+                # Small talk and edge cases are answered without the LLM
+                ai_text = canned_reply(transcript, persona=persona, history=history) if spec is None else None
+
+                if ai_text is not None:
+                    # Store assistant message
+                    store.append(session_id, "assistant", ai_text)
+                    await websocket.send_text(json.dumps({
+                        "type": "ai_text",
+                        "text": ai_text
+                    }))
+                    # Canned replies are pre-synthesized: send the cached clip, no Murf call
+                    cached = await asyncio.to_thread(tts.cached_audio, ai_text)
+                    if cached:
+                        await websocket.send_text(json.dumps({
+                            "type": "audio_chunk",
+                            "data": base64.b64encode(cached).decode("ascii"),
+                            "final": True
+                        }))
+                    else:
+                        await stream_gemini_to_murf(ai_text, websocket)
+                    return
+
+                # Pooled chat sends only the new turn; each finished sentence goes to Murf while Gemini is still generating
+                parts = []
+                timings = TurnTimings()
+                interrupted = False
+                try:
+                    await stream_text_to_murf(
+                        iter_sentences(stream_llm_reply(session_id, history, persona, websocket, parts,
+                                                        deltas=spec.stream() if spec is not None else None)),
+                        websocket,
+                        timings=timings,
+                    )
+                except asyncio.CancelledError:
+                    interrupted = True
+                    if spec is not None:
+                        await spec.cancel()
+                    raise
+                finally:
+                    ai_text = "".join(parts).strip()
+                    if interrupted:
+                        # Keep what was said before the barge-in so the next turn has the context
+                        if ai_text:
+                            store.append(session_id, "assistant", ai_text)
+                    else:
+                        ai_text = ai_text or settings.FALLBACK_TEXT
+                        store.append(session_id, "assistant", ai_text)
+                        await websocket.send_text(json.dumps({
+                            "type": "ai_text",
+                            "text": ai_text
+                        }))
+                if timings.time_to_first_audio is not None:
+                    print(f"Time to first audio: {timings.time_to_first_audio * 1000:.0f} ms")
+                # Reply is out: fold any trimmed turns into the rolling summary in the background
+                llm.compactor.schedule(session_id)
+
+            async def barge_in():
+                """Stop the reply in flight (Gemini, Murf context) and have the client drop queued audio."""
+                if await turns.cancel():
+                    turn_stats["barge_ins"] += 1
+                    print("Barge-in: cancelled the reply in progress")
+                await websocket.send_text(json.dumps({"type": "playback_flush"}))
 
             async def forward_transcripts():
+                # The client is flushed at most once per user turn
+                flushed = False
                 try:
                     async for message in assemblyai_ws:
                         data = json.loads(message)
@@ -95,6 +195,15 @@ async def websocket_transcribe(websocket: WebSocket):
                         if msg_type and msg_type.lower() == "turn":
                             transcript = data.get("transcript", "").strip()
                             end_of_turn = data.get("end_of_turn", False)
+                            received = time.perf_counter()
+
+                            # User started talking over the reply
+                            if settings.BARGE_IN_ENABLED and not flushed and is_barge_in(transcript, settings.BARGE_IN_MIN_WORDS):
+                                flushed = True
+                                await barge_in()
+
+                            if settings.SPECULATION_ENABLED and not end_of_turn:
+                                await speculator.observe(transcript)
 
                             await websocket.send_text(json.dumps({
                                 "type": "turn_update",
@@ -102,70 +211,18 @@ async def websocket_transcribe(websocket: WebSocket):
                                 "end_of_turn": end_of_turn
                             }))
 
-                            # Edge case handling (before LLM):
                             if end_of_turn:
+                                if not flushed:
+                                    # Too short to trigger above, but still supersedes any reply in flight
+                                    await barge_in()
+                                flushed = False
                                 await websocket.send_text(json.dumps({
                                     "type": "turn_end",
                                     "text": transcript
                                 }))
-                                # Store user message
-                                store.append(session_id, "user", transcript)
-
-                                # Edge case: empty or silence
-                                if not transcript:
-                                    ai_text = "I didn't catch that. Could you please say something?"
-                                # Edge case: greeting
-                                elif transcript.lower() in ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"]:
-                                    persona_greetings = {
-                                        "Default": "Hello! I'm Echo, your friendly AI assistant. How can I help you today?",
-                                        "Teacher": "Hello! I'm Ms. Ananya, your teacher. What would you like to learn today?",
-                                        "Pirate": "Ahoy! Captain Echo at your service. What be your question, matey?",
-                                        "Cowboy": "Howdy! Tex Echo here. What can I do for ya, partner?",
-                                        "Robot": "Beep boop! Robo Echo online. How may I assist you?"
-                                    }
-                                    ai_text = persona_greetings.get(persona, persona_greetings["Default"])
-                                # Edge case: farewell
-                                elif transcript.lower() in ["bye", "goodbye", "see you", "good night"]:
-                                    ai_text = "Goodbye! Have a great day!"
-                                # Edge case: who/what are you
-                                elif any(q in transcript.lower() for q in ["who are you", "what are you", "your name"]):
-                                    persona_intros = {
-                                        "Default": "I'm Echo, your helpful AI assistant. Ask me anything!",
-                                        "Teacher": "I'm Ms. Ananya, your teacher. I'm here to help you learn!",
-                                        "Pirate": "Arrr! I be Captain Echo, the pirate who answers your questions!",
-                                        "Cowboy": "Name's Tex Echo, your cowboy buddy. Ready to help, partner!",
-                                        "Robot": "Beep boop! I am Robo Echo, your robot assistant."
-                                    }
-                                    ai_text = persona_intros.get(persona, persona_intros["Default"])
-                                # Edge case: feedback
-                                elif any(q in transcript.lower() for q in ["thank you", "thanks", "good job", "well done"]):
-                                    ai_text = "You're welcome! Let me know if you have more questions."
-                                # Edge case: inappropriate (very basic)
-                                elif any(q in transcript.lower() for q in ["stupid", "idiot", "hate you", "shut up"]):
-                                    ai_text = "I'm here to help. Let's keep things positive!"
-                                # Edge case: joke/fun
-                                elif "joke" in transcript.lower():
-                                    ai_text = "Why did the AI go to school? To improve its neural network!"
-                                # Edge case: repetition (last user message)
-                                elif len(store.history(session_id)) > 2 and transcript == store.history(session_id)[-3]["content"]:
-                                    ai_text = "I think I just answered that! Want to ask something else?"
-                                # Edge case: out-of-scope
-                                elif any(q in transcript.lower() for q in ["predict the future", "personal opinion", "confidential"]):
-                                    ai_text = "Sorry, I can't answer that."
-                                else:
-                                    # Build prompt from history (history already includes latest user message)
-                                    history = store.history(session_id)
-                                    prompt = build_prompt_from_history(history, persona=persona)
-                                    # Generate LLM response (full, for chat bubble)
-                                    ai_text = llm.generate(prompt) or settings.FALLBACK_TEXT
-                                # Store assistant message
-                                store.append(session_id, "assistant", ai_text)
-                                await websocket.send_text(json.dumps({
-                                    "type": "ai_text",
-                                    "text": ai_text
-                                }))
-                                # Stream the stored LLM response to Murf for TTS (no repeated LLM call)
-                                await stream_gemini_to_murf(ai_text, websocket)
+                                # A reply already started on a matching partial is replayed instead of regenerated
+                                spec = await speculator.resolve(transcript, ended=received)
+                                turns.start(respond(transcript, spec))
                                 # Do NOT close websocket here; allow for multi-turn conversation
 
                         elif msg_type == "session_begin":
@@ -197,3 +254,15 @@ async def websocket_transcribe(websocket: WebSocket):
     except Exception as e:
         print(f"Failed to connect to AssemblyAI WebSocket: {e}")
         await websocket.close()
+    finally:
+        if speculator is not None:
+            await speculator.cancel()
+        if turns is not None:
+            await turns.cancel()
+        store.drop(session_id)
+        llm.chats.drop(session_id)
+        llm.compactor.drop(session_id)
+        memory.drop(session_id)
+        if capture is not None and settings.AUDIO_CAPTURE_DIR and len(capture):
+            os.makedirs(settings.AUDIO_CAPTURE_DIR, exist_ok=True)
+            await asyncio.to_thread(capture.save_wav, os.path.join(settings.AUDIO_CAPTURE_DIR, f"{session_id}.wav"))
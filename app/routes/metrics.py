@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from app.services.web_search import web_search
+from app.services.murf_pool import murf_pool
+from app.services.news_index import news_poller
+from app.services.news_service import news_service
+from app.services.storage import store
+from app.services.tts_murf import tts
+from app.services.llm_gemini import llm
+from app.services.memory_index import memory
+from app.services import bulkhead
+from app.services import turns
+from app.services import speculation
+from app.services import audio_ingress
+from app.services import vad
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+async def metrics():
+    """Cache and pool counters, used to size caches and spot upstream pressure."""
+    return {
+        "web_search": web_search.snapshot(),
+        "news_cache": news_service.snapshot(),
+        "news_poller": news_poller.snapshot(),
+        "tts_cache": tts.snapshot(),
+        "sessions": store.snapshot(),
+        "chat_pool": llm.chats.snapshot(),
+        "compaction": llm.compactor.snapshot(),
+        "memory": memory.snapshot(),
+        "murf_pool": murf_pool.snapshot(),
+        "bulkheads": bulkhead.snapshot(),
+        "turns": dict(turns.stats),
+        "speculation": speculation.snapshot(),
+        "audio_ingress": dict(audio_ingress.stats),
+        "vad": vad.snapshot(),
+    }
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import time
+import wave
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from app.services.vad import VoiceGate
+
+log = logging.getLogger(__name__)
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Aggregated over every connection, for /metrics
+stats: Dict[str, int] = {"frames": 0, "bytes": 0, "sent": 0, "timer_flushes": 0, "backpressured": 0}
+
+
+class AudioRing:
+    """
+    Fixed-size ring buffer holding the newest `capacity` bytes of a session's
+    audio; memory stays constant however long the call runs.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._pos = 0  # next write offset
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, data: BytesLike) -> None:
+        view = memoryview(data).cast("B")
+        n = len(view)
+        if n >= self.capacity:
+            # Only the tail survives
+            self._buf[:] = view[n - self.capacity:]
+            self._pos, self._size = 0, self.capacity
+            return
+        first = min(n, self.capacity - self._pos)
+        self._buf[self._pos:self._pos + first] = view[:first]
+        self._buf[:n - first] = view[first:]
+        self._pos = (self._pos + n) % self.capacity
+        self._size = min(self.capacity, self._size + n)
+
+    def getvalue(self) -> bytes:
+        """The buffered audio, oldest byte first."""
+        if self._size < self.capacity:
+            return bytes(self._buf[:self._size])
+        return bytes(self._buf[self._pos:]) + bytes(self._buf[:self._pos])
+
+    def save_wav(self, path: str, sample_rate: int = 16000, sample_width: int = 2) -> None:
+        with wave.open(path, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(sample_width)
+            out.setframerate(sample_rate)
+            out.writeframes(self.getvalue())
+
+
+class FrameCoalescer:
+    """
+    Re-frames an irregular byte stream into `frame_bytes` frames. Whole frames
+    that arrive aligned are passed through as views; only the remainder that
+    straddles two chunks is copied.
+    """
+
+    def __init__(self, frame_bytes: int):
+        self.frame_bytes = frame_bytes
+        self._buf = bytearray()
+        self.pending_since: Optional[float] = None  # when the partial frame got its first byte
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def push(self, data: BytesLike) -> List[BytesLike]:
+        """Complete frames, oldest first; the rest is kept for the next push."""
+        view = memoryview(data).cast("B")
+        size = self.frame_bytes
+        out: List[BytesLike] = []
+        if self._buf:
+            need = size - len(self._buf)
+            self._buf += view[:need]
+            view = view[need:]
+            if len(self._buf) < size:
+                return out
+            out.append(bytes(self._buf))
+            self._buf.clear()
+            self.pending_since = None
+        whole = len(view) - len(view) % size
+        for start in range(0, whole, size):
+            out.append(view[start:start + size])
+        if whole < len(view):
+            self._buf += view[whole:]
+            self.pending_since = time.monotonic()
+        return out
+
+    def flush(self) -> Optional[bytes]:
+        """The partial frame, if any, e.g. once it has waited too long."""
+        if not self._buf:
+            return None
+        data = bytes(self._buf)
+        self._buf.clear()
+        self.pending_since = None
+        return data
+
+
+class AudioForwarder:
+    """
+    Forwards client audio frames to the STT socket without copying or
+    re-encoding them, and keeps a copy in `ring` when given. With a
+    `coalescer`, chunks are re-framed to its frame size first, and a partial
+    frame is sent anyway once it is `max_delay` seconds old. With a `gate`,
+    only the frames it lets through are sent (the ring still gets all).
+    forward() returns only once the upstream socket has accepted the frame
+    (websockets waits for its write buffer to drain below `write_limit`), so
+    a slow upstream slows down reading from the client instead of buffering
+    without limit.
+    """
+
+    def __init__(self, send: Callable[[BytesLike], Awaitable[None]], ring: Optional[AudioRing] = None,
+                 gate: Optional[VoiceGate] = None, coalescer: Optional[FrameCoalescer] = None,
+                 max_delay: float = 0.15, slow_send: float = 0.05):
+        self.send = send
+        self.ring = ring
+        self.gate = gate
+        self.coalescer = coalescer
+        self.max_delay = max_delay
+        self.slow_send = slow_send
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def forward(self, frame: BytesLike) -> None:
+        view = memoryview(frame)
+        stats["frames"] += 1
+        stats["bytes"] += view.nbytes
+        if self.ring is not None:
+            self.ring.write(view)
+        if self.coalescer is None:
+            await self._emit(view)
+            return
+        async with self._lock:
+            for out in self.coalescer.push(view):
+                await self._emit(out)
+            self._arm()
+
+    async def _emit(self, frame: BytesLike) -> None:
+        for out in (self.gate.process(frame) if self.gate is not None else (frame,)):
+            started = time.perf_counter()
+            await self.send(out)
+            stats["sent"] += 1
+            if time.perf_counter() - started > self.slow_send:
+                stats["backpressured"] += 1
+
+    # ---------------- Max-delay flush ----------------
+    def _arm(self) -> None:
+        # One timer at a time: when it fires early for a newer partial it re-arms itself
+        pending_since = self.coalescer.pending_since
+        if self._timer is None and pending_since is not None:
+            delay = pending_since + self.max_delay - time.monotonic()
+            self._timer = asyncio.get_running_loop().call_later(max(delay, 0.0), self._expired)
+
+    def _expired(self) -> None:
+        self._timer = None
+        pending_since = self.coalescer.pending_since
+        if pending_since is None:
+            return
+        if time.monotonic() - pending_since < self.max_delay:
+            self._arm()
+            return
+        self._flusher = asyncio.ensure_future(self._flush_stale())
+
+    async def _flush_stale(self) -> None:
+        async with self._lock:
+            pending_since = self.coalescer.pending_since
+            if pending_since is None or time.monotonic() - pending_since < self.max_delay:
+                self._arm()  # filled or replaced while we waited for the lock
+                return
+            stats["timer_flushes"] += 1
+            try:
+                await self._emit(self.coalescer.flush())
+            except Exception as e:
+                # The upstream socket closed under us; the receive side reports that
+                log.debug("Audio flush failed: %s", e)
+
+    def close(self) -> None:
+        """Stop the flush timer; any partial frame is dropped."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+
+from app.config import settings
+
+log = logging.getLogger(__name__)
+
+
+class BulkheadFull(RuntimeError):
+    """Raised instead of queueing when a provider's bulkhead has no room left."""
+
+
+class Bulkhead:
+    """
+    Concurrency limit for one upstream provider. At most `max_concurrent` calls
+    run at once, and at most `max_queue` more wait for a slot. Anything beyond
+    that is rejected immediately with BulkheadFull, as is a call that waited
+    longer than `queue_timeout`, so the caller can answer from a fallback
+    instead of piling up threads and sockets.
+
+    Blocking SDK calls run on the bulkhead's own thread pool (run/submit); async
+    clients hold a slot for the length of the exchange (slot).
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: Optional[float] = None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._sem_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.admitted = 0  # running + waiting
+        self.running = 0
+        self._waits: Deque[float] = deque(maxlen=512)
+        self.stats = {"calls": 0, "rejected": 0, "timed_out": 0, "completed": 0, "failed": 0}
+
+    # ---------------- Admission ----------------
+    def _admit(self) -> float:
+        with self._lock:
+            if self.admitted >= self.max_concurrent + self.max_queue:
+                self.stats["rejected"] += 1
+                raise BulkheadFull(f"{self.name} bulkhead full ({self.admitted} in flight)")
+            self.admitted += 1
+            self.stats["calls"] += 1
+        return time.monotonic()
+
+    def _started(self, admitted_at: float) -> None:
+        waited = time.monotonic() - admitted_at
+        with self._lock:
+            self._waits.append(waited)
+            if self.queue_timeout is not None and waited > self.queue_timeout:
+                self.stats["timed_out"] += 1
+                raise BulkheadFull(f"{self.name} call waited {waited:.2f}s for a slot")
+            self.running += 1
+
+    def _finished(self, ok: bool) -> None:
+        with self._lock:
+            self.running -= 1
+            self.stats["completed" if ok else "failed"] += 1
+
+    def _release(self, _: Any = None) -> None:
+        with self._lock:
+            self.admitted -= 1
+
+    # ---------------- Blocking calls ----------------
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.max_concurrent, thread_name_prefix=f"bulkhead-{self.name}")
+        return self._pool
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Run fn on this provider's threads; raises BulkheadFull when there is no room."""
+        admitted_at = self._admit()
+
+        def call():
+            self._started(admitted_at)
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                self._finished(ok)
+
+        try:
+            future = self.pool.submit(call)
+        except Exception:
+            self._release()
+            raise
+        # Fires on completion and on cancellation while still queued
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Await a blocking call on this provider's threads."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    # ---------------- Async clients ----------------
+    def _semaphore(self) -> asyncio.Semaphore:
+        # One per event loop: tests and run_sync() drive several loops in a process
+        loop = asyncio.get_running_loop()
+        if self._sem is None or self._sem_loop is not loop:
+            self._sem = asyncio.Semaphore(self.max_concurrent)
+            self._sem_loop = loop
+        return self._sem
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of this provider's slots, e.g. for a streaming request or socket turn."""
+        admitted_at = self._admit()
+        try:
+            sem = self._semaphore()
+            try:
+                if self.queue_timeout is None:
+                    await sem.acquire()
+                else:
+                    await asyncio.wait_for(sem.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self._waits.append(time.monotonic() - admitted_at)
+                    self.stats["timed_out"] += 1
+                raise BulkheadFull(f"{self.name} call waited {self.queue_timeout:.2f}s for a slot") from None
+            try:
+                self._started(admitted_at)
+            except BulkheadFull:
+                sem.release()
+                raise
+            ok = False
+            try:
+                yield
+                ok = True
+            finally:
+                self._finished(ok)
+                sem.release()
+        finally:
+            self._release()
+
+    # ---------------- Metrics ----------------
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            running, admitted = self.running, self.admitted
+        pct = lambda q: round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1) if waits else 0.0
+        return {
+            **self.stats,
+            "running": running,
+            "queued": admitted - running,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "wait_ms_p50": pct(0.5),
+            "wait_ms_p95": pct(0.95),
+            "wait_ms_max": pct(1.0),
+        }
+
+
+def _bulkhead(name: str, max_concurrent: int, max_queue: int) -> Bulkhead:
+    return Bulkhead(name, max_concurrent, max_queue, settings.BULKHEAD_QUEUE_TIMEOUT)
+
+
+stt_bulkhead = _bulkhead("stt", settings.STT_MAX_CONCURRENT_JOBS, settings.BULKHEAD_STT_QUEUE)
+llm_bulkhead = _bulkhead("llm", settings.BULKHEAD_LLM_CONCURRENCY, settings.BULKHEAD_LLM_QUEUE)
+lookup_bulkhead = _bulkhead("lookup", settings.BULKHEAD_LOOKUP_CONCURRENCY, settings.BULKHEAD_LOOKUP_QUEUE)
+search_bulkhead = _bulkhead("search", settings.BULKHEAD_SEARCH_CONCURRENCY, settings.BULKHEAD_SEARCH_QUEUE)
+news_bulkhead = _bulkhead("news", settings.BULKHEAD_NEWS_CONCURRENCY, settings.BULKHEAD_NEWS_QUEUE)
+tts_bulkhead = _bulkhead("tts", settings.BULKHEAD_TTS_CONCURRENCY, settings.BULKHEAD_TTS_QUEUE)
+murf_ws_bulkhead = _bulkhead("murf_ws", settings.BULKHEAD_MURF_WS_CONCURRENCY, settings.BULKHEAD_MURF_WS_QUEUE)
+
+BULKHEADS = {b.name: b for b in (stt_bulkhead, llm_bulkhead, lookup_bulkhead, search_bulkhead, news_bulkhead, tts_bulkhead, murf_ws_bulkhead)}
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    return {name: b.snapshot() for name, b in BULKHEADS.items()}
@@ -0,0 +1,224 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Background revalidation runs here so a stale hit never waits on upstream
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+
+class SQLiteCache:
+    """Persistent second tier: JSON values with absolute expiry, shared across restarts."""
+
+    def __init__(self, path: str, table: str = "cache"):
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, stale_until REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires, stale_until FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires, stale_until = row
+        if stale_until < time.time():
+            self.delete(key)
+            return None
+        return json.loads(value), expires, stale_until
+
+    def set(self, key: str, value: Any, expires: float, stale_until: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires, stale_until) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires, stale_until),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._conn.execute(f"DELETE FROM {self.table} WHERE stale_until < ?", (time.time(),))
+            self._conn.commit()
+            return cur.rowcount
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU with per-entry TTLs and stale-while-revalidate:
+    an expired entry is still served for `stale_ttl` seconds while one background
+    refresh replaces it. An optional SQLiteCache backs the memory tier.
+    """
+
+    def __init__(self, maxsize: int = 512, default_ttl: float = 300.0, stale_ttl: float = 0.0, disk: Optional[SQLiteCache] = None):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.disk = disk
+        self._data: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self.stats: Dict[str, int] = {"hits": 0, "stale_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "refreshes": 0}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[2] < now:
+                    del self._data[key]
+                    entry = None
+                else:
+                    self._data.move_to_end(key)
+                    return entry
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self._store(key, entry)
+                return entry
+        return None
+
+    def _store(self, key: str, entry: Tuple[Any, float, float]) -> None:
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Fresh value for key, or default (stale entries count as a miss here)."""
+        entry = self._lookup(key)
+        if entry is None or entry[1] < time.time():
+            self.stats["misses"] += 1
+            return default
+        self.stats["hits"] += 1
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.time() + ttl
+        entry = (value, expires, expires + self.stale_ttl)
+        self._store(key, entry)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, entry[1], entry[2])
+            except Exception as e:
+                log.debug("Disk cache write failed for %s: %s", key, e)
+
+    def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+        cacheable: Callable[[Any], bool] = lambda v: v is not None,
+    ) -> Any:
+        entry = self._lookup(key)
+        now = time.time()
+        if entry is not None:
+            value, expires, _ = entry
+            if expires >= now:
+                self.stats["hits"] += 1
+                return value
+            self.stats["stale_hits"] += 1
+            self._refresh_async(key, loader, ttl, cacheable)
+            return value
+
+        self.stats["misses"] += 1
+        value = loader()
+        if cacheable(value):
+            self.set(key, value, ttl)
+        return value
+
+    def _refresh_async(self, key: str, loader: Callable[[], Any], ttl: Optional[float], cacheable: Callable[[Any], bool]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = loader()
+                if cacheable(value):
+                    self.set(key, value, ttl)
+                    self.stats["refreshes"] += 1
+            except Exception as e:
+                log.debug("Background refresh failed for %s: %s", key, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        _refresh_pool.submit(refresh)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["stale_hits"]) / lookups if lookups else 0.0
+        return {**self.stats, "size": len(self._data), "maxsize": self.maxsize, "hit_rate": round(hit_rate, 3)}
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution; followers share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.stats: Dict[str, int] = {"calls": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.services.compaction import summary_turns
+
+log = logging.getLogger(__name__)
+
+# Rough per-turn overhead (Content proto, part, mirror tuple) on top of the text itself
+_TURN_OVERHEAD = 200
+
+_ROLES = {"user": "user", "assistant": "model"}
+
+# Trailing turns remembered per session to recognise what was already sent to on_trim
+_TRIM_MARK = 3
+
+
+def _turn(msg) -> Tuple[str, str]:
+    return _ROLES.get(msg["role"], "user"), (msg["content"] or "").strip()
+
+
+class _ChatEntry:
+    """One session's chat object plus a mirror of its turns for accounting."""
+    __slots__ = ("chat", "persona", "prompts", "turns", "tokens", "bytes", "touched", "summary")
+
+    def __init__(self, chat: Any, persona: str, prompts: Any):
+        self.chat = chat
+        self.persona = persona
+        self.prompts = prompts
+        self.turns: Deque[Tuple[str, str, int]] = deque()  # (role, text, tokens), oldest first
+        self.tokens = 0
+        self.bytes = 0
+        self.touched = time.monotonic()
+        self.summary: Optional[str] = None  # rolling summary the chat currently opens with
+
+    @property
+    def last(self) -> Optional[Tuple[str, str]]:
+        return self.turns[-1][:2] if self.turns else None
+
+
+class ChatPool:
+    """
+    Per-session Gemini chat objects in LRU order. Each chat keeps its turns as
+    structured Content, so a new turn only sends the new message; the history is
+    not re-rendered into one prompt string. Turns the chat never saw (canned or
+    intent-routed replies) are appended from the session history before sending.
+    Idle chats expire after `ttl`, and the least recently used are evicted past
+    `max_sessions` or `max_bytes`.
+
+    Turns trimmed past the budget go to `on_trim` (the compactor), and a chat
+    opens with the session's rolling summary from `summary_for` when there is one.
+    """
+
+    def __init__(self, model_for: Callable[[str], Any], max_sessions: int = 1000,
+                 max_bytes: int = 32 * 1024 * 1024, ttl: float = 1800.0,
+                 on_trim: Optional[Callable[[str, List[Tuple[str, str]]], None]] = None,
+                 summary_for: Optional[Callable[[str], Optional[str]]] = None):
+        self.model_for = model_for  # system instruction -> GenerativeModel
+        self.on_trim = on_trim
+        self.summary_for = summary_for
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _ChatEntry]" = OrderedDict()
+        # Last turns reported to on_trim per session; outlives the chat so a rebuild doesn't report them again
+        self._trim_marks: "OrderedDict[str, Tuple[Tuple[str, str], ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "rebuilds": 0, "evictions": 0, "expired": 0, "discarded": 0, "trimmed": 0, "summaries": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def checkout(self, session_id: str, history: Sequence, persona: str, prompts: Any) -> Any:
+        """
+        Chat for `session_id` holding `history` (every turn before the one being
+        sent). `prompts` supplies the persona system instruction, the token
+        counter and the history budget.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._entries.get(session_id)
+            missing = None
+            if entry is not None and entry.persona == persona and entry.prompts is prompts:
+                missing = self._unseen(entry, history)
+            if missing is None:
+                self.stats["rebuilds" if entry is not None else "misses"] += 1
+                if entry is not None:
+                    self._remove(session_id)
+                instruction = prompts.prefix(persona)[0].strip()
+                entry = _ChatEntry(self.model_for(instruction).start_chat(history=[]), persona, prompts)
+                self._entries[session_id] = entry
+                missing = list(history)
+            else:
+                self.stats["hits"] += 1
+            if missing:
+                turns = [_turn(m) for m in missing]
+                entry.chat.history = [*entry.chat.history, *({"role": r, "parts": [t]} for r, t in turns)]
+                for role, text in turns:
+                    self._add(entry, role, text)
+                self._trim(session_id, entry)
+            if self.summary_for is not None:
+                self._install_summary(entry, self.summary_for(session_id))
+            entry.touched = now
+            self._entries.move_to_end(session_id)
+            self._enforce_caps(keep=session_id)
+            return entry.chat
+
+    def commit(self, session_id: str, message: str, reply: str, sent: Optional[str] = None) -> None:
+        """
+        Account for a completed exchange; the chat object already recorded it.
+        When the text `sent` differs from `message` (recalled context was added),
+        the chat keeps only `message`, so the context does not stay in later turns.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            try:
+                history = entry.chat.history  # folds the streamed reply into the chat's history
+            except Exception as e:
+                log.warning("Discarding chat %s with a broken reply: %s", session_id, e)
+                self._remove(session_id)
+                self.stats["discarded"] += 1
+                return
+            if sent is not None and sent != message:
+                entry.chat.history = [*history[:-2], {"role": "user", "parts": [message]}, history[-1]]
+            self._add(entry, "user", message.strip())
+            self._add(entry, "model", reply.strip())
+            self._trim(session_id, entry)
+            self._enforce_caps(keep=session_id)
+
+    def discard(self, session_id: str) -> None:
+        """Forget a chat whose last exchange did not complete; it is rebuilt next turn."""
+        with self._lock:
+            if self._remove(session_id):
+                self.stats["discarded"] += 1
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._remove(session_id)
+            self._trim_marks.pop(session_id, None)
+
+    def window(self, session_id: str) -> int:
+        """Number of turns the session's chat currently holds."""
+        entry = self._entries.get(session_id)
+        return len(entry.turns) if entry is not None else 0
+
+    def _unseen(self, entry: _ChatEntry, history: Sequence) -> Optional[list]:
+        # Messages after the chat's newest turn; None when the history no longer contains it
+        last = entry.last
+        if last is None:
+            return list(history)
+        for i in range(len(history) - 1, -1, -1):
+            if _turn(history[i]) == last:
+                return list(history[i + 1:])
+        return None
+
+    def _add(self, entry: _ChatEntry, role: str, text: str) -> None:
+        tokens = entry.prompts.count(text)
+        size = len(text) + _TURN_OVERHEAD
+        entry.turns.append((role, text, tokens))
+        entry.tokens += tokens
+        entry.bytes += size
+        self.total_bytes += size
+
+    def _install_summary(self, entry: _ChatEntry, summary: Optional[str]) -> None:
+        # Swap the opening summary exchange; the turns after it are untouched
+        if not summary or summary == entry.summary:
+            return
+        history = entry.chat.history
+        entry.chat.history = [*summary_turns(summary), *history[2 if entry.summary else 0:]]
+        size = len(summary) - len(entry.summary or "") + (0 if entry.summary else 2 * _TURN_OVERHEAD)
+        entry.bytes += size
+        self.total_bytes += size
+        entry.summary = summary
+        self.stats["summaries"] += 1
+
+    def _trim(self, session_id: str, entry: _ChatEntry) -> None:
+        budget = entry.prompts.history_budget
+        drop = 0
+        # Drop oldest turns past the budget (keeping the last exchange); the chat must open with a user turn
+        while len(entry.turns) - drop > 1:
+            role, text, tokens = entry.turns[drop]
+            if role == "user" and (entry.tokens <= budget or len(entry.turns) - drop <= 2):
+                break
+            entry.tokens -= tokens
+            entry.bytes -= len(text) + _TURN_OVERHEAD
+            self.total_bytes -= len(text) + _TURN_OVERHEAD
+            drop += 1
+        if drop:
+            dropped = [entry.turns.popleft()[:2] for _ in range(drop)]
+            history = entry.chat.history
+            offset = 2 if entry.summary else 0
+            entry.chat.history = [*history[:offset], *history[offset + drop:]]
+            self.stats["trimmed"] += drop
+            if self.on_trim is not None:
+                self._report_trimmed(session_id, dropped)
+
+    def _report_trimmed(self, session_id: str, dropped: List[Tuple[str, str]]) -> None:
+        # A rebuilt chat trims the same old turns again; report only those past the session's mark
+        mark = self._trim_marks.get(session_id, ())
+        if mark:
+            for end in range(len(dropped), 0, -1):
+                n = min(len(mark), end)
+                if tuple(dropped[end - n:end]) == mark[-n:]:
+                    dropped = dropped[end:]
+                    break
+        if not dropped:
+            return
+        self._trim_marks[session_id] = (*mark, *dropped)[-_TRIM_MARK:]
+        self._trim_marks.move_to_end(session_id)
+        while len(self._trim_marks) > 2 * self.max_sessions:
+            self._trim_marks.popitem(last=False)
+        self.on_trim(session_id, dropped)
+
+    def _remove(self, session_id: str) -> bool:
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return False
+        self.total_bytes -= entry.bytes
+        return True
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.ttl
+        while self._entries:
+            sid, entry = next(iter(self._entries.items()))
+            if entry.touched >= cutoff:
+                break
+            self._remove(sid)
+            self.stats["expired"] += 1
+
+    def _enforce_caps(self, keep: str) -> None:
+        while len(self._entries) > 1 and (len(self._entries) > self.max_sessions or self.total_bytes > self.max_bytes):
+            sid = next(iter(self._entries))
+            if sid == keep:
+                break
+            self._remove(sid)
+            self.stats["evictions"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "sessions": len(self._entries), "bytes": self.total_bytes,
+                "max_sessions": self.max_sessions, "max_bytes": self.max_bytes}
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+Turn = Tuple[str, str]  # (role, text); role is "user" or "model"
+
+SUMMARY_INTRO = "Summary of our earlier conversation:"
+SUMMARY_ACK = "Understood, I'll keep that in mind."
+
+
+def summary_turns(summary: str) -> List[dict]:
+    """The exchange a chat opens with to carry the rolling summary."""
+    return [
+        {"role": "user", "parts": [f"{SUMMARY_INTRO} {summary}"]},
+        {"role": "model", "parts": [SUMMARY_ACK]},
+    ]
+
+
+def summary_prompt(previous: Optional[str], turns: List[Turn], max_words: int) -> str:
+    lines = "\n".join(f"{'User' if role == 'user' else 'Assistant'}: {text}" for role, text in turns)
+    return (
+        "Update the running summary of a conversation between a user and a voice assistant. "
+        f"Keep names, facts, preferences and open questions; at most {max_words} words. "
+        "Reply with the summary only.\n\n"
+        f"Summary so far:\n{previous or '(none)'}\n\n"
+        f"Earlier turns to fold in:\n{lines}\n\n"
+        "Updated summary:"
+    )
+
+
+class _Session:
+    __slots__ = ("summary", "pending", "task")
+
+    def __init__(self):
+        self.summary: Optional[str] = None
+        self.pending: List[Turn] = []
+        self.task: Optional[asyncio.Task] = None
+
+
+class Compactor:
+    """
+    Rolling summaries of the turns a session's chat trims away. Trimmed turns
+    are queued by add(); schedule(), called once a reply has been sent, folds
+    them into the summary on a background task, so summarizing never delays a
+    turn. The chat picks the new summary up on its next checkout.
+    """
+
+    def __init__(self, summarize: Callable[[str], Awaitable[str]], max_words: int = 120,
+                 max_pending: int = 40, max_sessions: int = 1000):
+        self.summarize = summarize  # prompt -> summary text
+        self.max_words = max_words
+        self.max_pending = max_pending
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self.stats = {"compactions": 0, "turns_compacted": 0, "failures": 0, "dropped_turns": 0}
+
+    def _session(self, session_id: str) -> _Session:
+        sess = self._sessions.get(session_id)
+        if sess is None:
+            sess = self._sessions[session_id] = _Session()
+            while len(self._sessions) > self.max_sessions:
+                _, old = self._sessions.popitem(last=False)
+                if old.task is not None:
+                    old.task.cancel()
+        self._sessions.move_to_end(session_id)
+        return sess
+
+    def add(self, session_id: str, turns: List[Turn]) -> None:
+        """Queue turns trimmed from a chat for the next compaction."""
+        sess = self._session(session_id)
+        sess.pending.extend(turns)
+        overflow = len(sess.pending) - self.max_pending
+        if overflow > 0:
+            # Summarizing has fallen far behind: lose the oldest rather than grow
+            del sess.pending[:overflow]
+            self.stats["dropped_turns"] += overflow
+
+    def summary(self, session_id: str) -> Optional[str]:
+        sess = self._sessions.get(session_id)
+        return sess.summary if sess is not None else None
+
+    def schedule(self, session_id: str) -> Optional[asyncio.Task]:
+        """Start compacting queued turns in the background, unless already running."""
+        sess = self._sessions.get(session_id)
+        if sess is None or not sess.pending or (sess.task is not None and not sess.task.done()):
+            return None
+        sess.task = asyncio.get_running_loop().create_task(self._compact(session_id, sess))
+        return sess.task
+
+    async def run(self, session_id: str) -> None:
+        """schedule() and wait for it; for response background tasks."""
+        task = self.schedule(session_id)
+        if task is not None:
+            await task
+
+    async def _compact(self, session_id: str, sess: _Session) -> None:
+        while sess.pending:
+            turns, sess.pending = sess.pending, []
+            try:
+                summary = (await self.summarize(summary_prompt(sess.summary, turns, self.max_words))).strip()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Compaction failed for %s: %s", session_id, e)
+                summary = ""
+            if not summary:
+                # Keep the turns for the next attempt
+                sess.pending[:0] = turns
+                self.stats["failures"] += 1
+                return
+            sess.summary = summary
+            self.stats["compactions"] += 1
+            self.stats["turns_compacted"] += len(turns)
+
+    def drop(self, session_id: str) -> None:
+        sess = self._sessions.pop(session_id, None)
+        if sess is not None and sess.task is not None:
+            sess.task.cancel()
+
+    def snapshot(self) -> Dict[str, int]:
+        running = sum(1 for s in self._sessions.values() if s.task is not None and not s.task.done())
+        return {**self.stats, "sessions": len(self._sessions), "running": running}
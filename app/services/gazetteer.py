@@ -0,0 +1,153 @@
+import logging
+import re
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+GAZETTEER_PATH = Path(__file__).resolve().parent.parent / "data" / "gazetteer.tsv"
+
+# More specific places win when a transcript mentions several ("Pune, India")
+_KIND_RANK = {"city": 3, "region": 2, "country": 1}
+_TOKEN = re.compile(r"[a-z]+")
+_WORD = re.compile(r"[A-Za-z]+")
+_END = ""  # trie terminal key; the tokenizer never yields an empty token
+_CASED_END = "^"  # terminal for labels that are also common words ("turkey"); only matched when capitalized
+
+
+@dataclass(frozen=True)
+class PlaceMatch:
+    name: str
+    kind: str
+    country: str
+    lat: float
+    lon: float
+    position: int  # token offset in the text
+
+    def to_location(self) -> Dict[str, Any]:
+        """Same shape as WebSearchService.geocode_place() results."""
+        display = self.name if self.kind == "country" else f"{self.name}, {self.country}"
+        return {"display_name": display, "city": self.name, "lat": self.lat, "lon": self.lon}
+
+
+class Gazetteer:
+    """
+    Offline place index: names and aliases live in a token trie whose leaves
+    point into parallel arrays, so a transcript is scanned for places in one
+    left-to-right pass with no network lookup. Labels listed as cased are also
+    everyday words and only match where the text capitalizes them.
+    """
+
+    def __init__(self):
+        self._trie: Dict[str, Any] = {}
+        self.names: List[str] = []
+        self.kinds: List[str] = []
+        self.countries: List[str] = []
+        self.lats = array("d")
+        self.lons = array("d")
+        self.max_tokens = 1
+
+    @classmethod
+    def load(cls, path: Path = GAZETTEER_PATH) -> "Gazetteer":
+        gaz = cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip() or line.startswith("#"):
+                        continue
+                    cols = line.rstrip("\n").split("\t")
+                    name, kind, country, lat, lon = cols[:5]
+                    aliases = [a for a in (cols[5].split(",") if len(cols) > 5 else []) if a.strip()]
+                    cased = [a for a in (cols[6].split(",") if len(cols) > 6 else []) if a.strip()]
+                    gaz.add(name, kind, country, float(lat), float(lon), aliases, cased)
+        except OSError as e:
+            log.warning("Gazetteer not loaded from %s: %s", path, e)
+        return gaz
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str, kind: str, country: str, lat: float, lon: float, aliases: Optional[List[str]] = None,
+            cased: Optional[List[str]] = None) -> None:
+        idx = len(self.names)
+        self.names.append(name)
+        self.kinds.append(kind)
+        self.countries.append(country)
+        self.lats.append(lat)
+        self.lons.append(lon)
+        cased_labels = {" ".join(_TOKEN.findall(label.lower())) for label in cased or []}
+        for label in [name, *(aliases or [])]:
+            tokens = _TOKEN.findall(label.lower())
+            if not tokens:
+                continue
+            node = self._trie
+            for tok in tokens:
+                node = node.setdefault(tok, {})
+            node.setdefault(_CASED_END if " ".join(tokens) in cased_labels else _END, idx)
+            self.max_tokens = max(self.max_tokens, len(tokens))
+
+    def _match(self, idx: int, position: int) -> PlaceMatch:
+        return PlaceMatch(self.names[idx], self.kinds[idx], self.countries[idx], self.lats[idx], self.lons[idx], position)
+
+    def find_all(self, text: str) -> List[PlaceMatch]:
+        """Every place mentioned in text, longest match first at each position."""
+        words = _WORD.findall(text)
+        tokens = [w.lower() for w in words]
+        matches: List[PlaceMatch] = []
+        i = 0
+        n = len(tokens)
+        while i < n:
+            node = self._trie.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+            capitalized = words[i][0].isupper()
+            best, best_end = self._terminal(node, capitalized), i + 1
+            j = i + 1
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                idx = self._terminal(node, capitalized)
+                if idx is not None:
+                    best, best_end = idx, j
+            if best is not None:
+                matches.append(self._match(best, i))
+                i = best_end
+            else:
+                i += 1
+        return matches
+
+    @staticmethod
+    def _terminal(node: Dict[str, Any], capitalized: bool) -> Optional[int]:
+        idx = node.get(_END)
+        if idx is None and capitalized:
+            idx = node.get(_CASED_END)
+        return idx
+
+    def find(self, text: str) -> Optional[PlaceMatch]:
+        """The most specific place mentioned in text (earliest wins on ties)."""
+        best = None
+        for m in self.find_all(text):
+            if best is None or _KIND_RANK.get(m.kind, 0) > _KIND_RANK.get(best.kind, 0):
+                best = m
+        return best
+
+    def lookup(self, name: str) -> Optional[PlaceMatch]:
+        """Exact match of a whole place string (name or alias)."""
+        tokens = _TOKEN.findall(name.lower())
+        node = self._trie
+        for tok in tokens:
+            node = node.get(tok)
+            if node is None:
+                return None
+        # An explicit place string: cased labels count however they are written
+        idx = self._terminal(node, True) if tokens else None
+        return self._match(idx, 0) if idx is not None else None
+
+
+# Loaded once at import so lookups never touch disk or network
+gazetteer = Gazetteer.load()
@@ -0,0 +1,169 @@
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_DIGITS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4",
+    "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9",
+}
+# Punctuation becomes whitespace so str.split() yields the word tokens
+_PUNCT_TABLE = str.maketrans({c: " " for c in "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"})
+_HAS_DIGIT = re.compile(r"\d")
+_END = ""  # trie terminal key; the tokenizer never yields an empty token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with spoken digits joined: 'two zero two five' -> ['2025']."""
+    # Apostrophes are dropped rather than split on: "what's" -> "whats"
+    lowered = (text or "").lower().replace("'", "").replace("\u2019", "").translate(_PUNCT_TABLE)
+    words = lowered.split()
+    if _DIGITS.keys().isdisjoint(words) and not _HAS_DIGIT.search(lowered):
+        return words
+    out: List[str] = []
+    for word in words:
+        word = _DIGITS.get(word, word)
+        if out and word.isdigit() and out[-1].isdigit():
+            out[-1] += word
+        else:
+            out.append(word)
+    return out
+
+
+def normalize(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+@dataclass(frozen=True)
+class Utterance:
+    text: str
+    normalized: str
+    intents: FrozenSet[str]
+    phrases: Tuple[Tuple[str, str], ...]  # (intent, matched phrase) in order of appearance
+
+    def has(self, *names: str) -> bool:
+        return any(n in self.intents for n in names)
+
+    def matched(self, name: str) -> List[str]:
+        return [p for i, p in self.phrases if i == name]
+
+
+@dataclass
+class Handler:
+    name: str
+    intent: Optional[str]  # None: considered for every utterance
+    group: str
+    priority: int
+    fn: Callable[..., Optional[str]]
+    when: Optional[Callable[..., bool]] = None
+
+    def eligible(self, utt: Utterance, ctx: Dict[str, Any]) -> bool:
+        if self.intent is not None and self.intent not in utt.intents:
+            return False
+        return self.when is None or self.when(utt, **ctx)
+
+
+class IntentEngine:
+    """
+    Keyword intents matched in one pass: every phrase of every intent goes into
+    one token trie, built once after registration, so an utterance is scanned
+    left to right at word boundaries with the longest phrase winning. Handlers
+    are plugged in per group and tried in priority order; the first one that
+    returns a reply wins.
+    """
+
+    def __init__(self):
+        self._phrases: Dict[str, List[str]] = {}
+        self._whole: set = set()  # intents that must span the entire utterance
+        self._handlers: List[Handler] = []
+        self._trie: Optional[Dict[str, Any]] = None
+        self.detect = lru_cache(maxsize=512)(self._detect)
+
+    def add_intent(self, name: str, phrases: Iterable[str], whole: bool = False) -> None:
+        self._phrases.setdefault(name, []).extend(phrases)
+        if whole:
+            self._whole.add(name)
+        self._trie = None
+        self.detect.cache_clear()
+
+    def handler(self, intent: Optional[str], group: str = "default", priority: int = 0, when: Optional[Callable[..., bool]] = None):
+        """Decorator registering fn(utterance, **ctx) -> Optional[str] for an intent."""
+        def register(fn):
+            self._handlers.append(Handler(fn.__name__, intent, group, priority, fn, when))
+            # Stable: equal priorities keep registration order
+            self._handlers.sort(key=lambda h: -h.priority)
+            return fn
+        return register
+
+    def compile(self) -> Dict[str, Any]:
+        if self._trie is None:
+            trie: Dict[str, Any] = {}
+            for name, phrases in self._phrases.items():
+                for phrase in phrases:
+                    node = trie
+                    for tok in tokenize(phrase):
+                        node = node.setdefault(tok, {})
+                    node.setdefault(_END, []).append(name)
+            self._trie = trie
+        return self._trie
+
+    def _detect(self, text: str) -> Utterance:
+        tokens = tokenize(text)
+        n = len(tokens)
+        trie = self.compile()
+        intents = set()
+        phrases = []
+        if not tokens:
+            intents.add("empty")
+        i = 0
+        while i < n:
+            node = trie.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+            best, best_end = node.get(_END), i + 1
+            j = i + 1
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    best, best_end = node[_END], j
+            if best is None:
+                i += 1
+                continue
+            whole = i == 0 and best_end == n
+            phrase = " ".join(tokens[i:best_end])
+            for name in best:
+                if whole or name not in self._whole:
+                    intents.add(name)
+                    phrases.append((name, phrase))
+            i = best_end
+        return Utterance(text, " ".join(tokens), frozenset(intents), tuple(phrases))
+
+    def route(self, text: str, group: str = "default", **ctx) -> Optional[str]:
+        """Name of the handler that would answer, without running it."""
+        utt = self.detect(text)
+        for h in self._handlers:
+            if h.group == group and h.eligible(utt, ctx):
+                return h.name
+        return None
+
+    def dispatch(self, text: str, group: str = "default", **ctx) -> Optional[str]:
+        utt = self.detect(text)
+        for h in self._handlers:
+            if h.group != group or not h.eligible(utt, ctx):
+                continue
+            reply = h.fn(utt, **ctx)
+            if reply is not None:
+                log.debug("Intent %s answered %r", h.name, utt.normalized)
+                return reply
+        return None
+
+
+# Shared engine: conversational replies register under group "chat", live lookups under "lookup"
+intents = IntentEngine()
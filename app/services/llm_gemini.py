@@ -1,13 +1,20 @@
 import logging
 import datetime
 import re
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional, Sequence
 
 import requests
 import google.generativeai as genai
 from app.config import settings
 from app.services.web_search import web_search
-from app.services.news_service import news_service
+from app.services.gazetteer import gazetteer
+from app.services.intents import intents
+from app.services.personas import PERSONA_ANCHOR_PROMPTS
+from app.services.chat_pool import ChatPool
+from app.services.compaction import Compactor
+from app.services.memory_index import memory
+from app.services.bulkhead import BulkheadFull, llm_bulkhead, lookup_bulkhead
+from app.services.prompt_builder import PromptBuilder, voice_prompts
 
 log = logging.getLogger(__name__)
 
@@ -15,17 +22,6 @@ log = logging.getLogger(__name__)
 # Helper functions
 # -------------------------------
 
-def words_to_digits(text: str) -> str:
-    """Convert simple number words to digits, e.g. 'two zero twenty five' -> '2025'."""
-    mapping = {
-        "zero": "0", "one": "1", "two": "2", "three": "3",
-        "four": "4", "five": "5", "six": "6", "seven": "7",
-        "eight": "8", "nine": "9"
-    }
-    words = text.lower().split()
-    converted = "".join([mapping.get(w, w) for w in words])
-    return converted
-
 def get_crypto_price(symbol: str = "BTC") -> str:
     """Fetch real-time crypto price from CoinGecko."""
     try:
@@ -37,59 +33,117 @@ def get_crypto_price(symbol: str = "BTC") -> str:
         log.exception("Crypto API error: %s", e)
         return f"Unable to fetch price for {symbol.upper()}."
 
-def handle_special_queries(user_query: str) -> Optional[str]:
-    """Handle dynamic special queries like date, time, IPL winner, crypto prices."""
-    query = words_to_digits(user_query.lower())
+# -------------------------------
+# Live lookups (intent handlers)
+# -------------------------------
+
+intents.add_intent("time", ["time", "what time", "current time", "time now"])
+intents.add_intent("date", ["date", "today", "todays date", "what day"])
+intents.add_intent("sports", ["ipl", "fifa", "match", "league"])
+intents.add_intent("crypto", ["bitcoin", "btc", "ethereum", "eth"])
+intents.add_intent("weather", ["weather", "temperature", "forecast"])
+intents.add_intent("news", ["news", "update", "updates", "latest", "developments", "headlines"])
+intents.add_intent("winner", ["winner"])
+intents.add_intent("owner", ["owner", "ownership", "own"])
+intents.add_intent("my_location", ["where am i", "what is my location", "my location"], whole=True)
+
+# "news in <place>" when the place isn't in the gazetteer
+_NEWS_PLACE = re.compile(r"(?:in|of|from)\s+([a-z\s]+?)(?:\s+(?:news|update|latest|developments)|$)")
+
+
+def _ipl_2025(utt, **_) -> bool:
+    return "2025" in utt.normalized.split()
+
+
+@intents.handler("winner", group="lookup", priority=100, when=lambda utt, **ctx: utt.has("sports") and _ipl_2025(utt))
+def ipl_winner(utt, **_) -> str:
+    results = web_search.search_web("IPL 2025 winner", max_results=3, freshness_days=60)
+    if results and "winner" in (results[0].get("content") or "").lower():
+        return f"The winner of IPL 2025 is: {results[0]['content']}"
+    return "The IPL 2025 winner information is not conclusive or not available online yet."
+
+
+@intents.handler("owner", group="lookup", priority=100, when=lambda utt, **ctx: utt.has("sports") and _ipl_2025(utt))
+def ipl_owner(utt, **_) -> str:
+    results = web_search.search_web("IPL 2025 owner", max_results=3, freshness_days=60)
+    content = (results[0].get("content") or "").lower() if results else ""
+    if "owner" in content or "ownership" in content:
+        return f"The owner information I found: {results[0]['content']}"
+    return "The IPL 2025 ownership information is not available or clear online."
 
+
+@intents.handler("crypto", group="lookup", priority=90)
+def crypto_price(utt, **_) -> str:
+    symbol = "ETH" if set(utt.matched("crypto")) <= {"ethereum", "eth"} else "BTC"
+    return get_crypto_price(symbol)
+
+
+@intents.handler("weather", group="lookup", priority=80)
+def weather(utt, **_) -> str:
+    results = web_search.search_web(utt.text, max_results=3)
+    return f"Weather update:\n{web_search.humanize_results(results)}"
+
+
+@intents.handler("sports", group="lookup", priority=70)
+def sports(utt, **_) -> str:
+    results = web_search.search_web(utt.text, max_results=3)
+    return f"Here are the latest sports updates:\n{web_search.humanize_results(results)}"
+
+
+@intents.handler("news", group="lookup", priority=60)
+def news(utt, **_) -> str:
+    # Extract location from query if present: offline gazetteer first, then the phrase pattern
+    match = gazetteer.find(utt.text)
+    location = match.name if match else None
+    if not location:
+        location_match = _NEWS_PLACE.search(utt.normalized)
+        if location_match:
+            location = location_match.group(1).strip()
+
+    # NewsAPI, Google News RSS and Tavily are raced; the first usable answer wins
+    if location:
+        results = web_search.get_latest_news(region=location, max_results=5)
+    else:
+        results = web_search.search_with_fallback(utt.text, max_results=5, prefer_news=True)
+    return f"Here's the latest news:\n{web_search.humanize_results(results)}"
+
+
+@intents.handler("my_location", group="lookup", priority=50)
+def my_location(utt, **_) -> str:
+    loc = web_search.resolve_location_from_ip()
+    if not loc:
+        return "Sorry — I couldn't determine your location."
+    parts = [loc[k] for k in ("city", "region", "country") if loc.get(k)]
+    coords = ""
+    if loc.get("lat") is not None and loc.get("lon") is not None:
+        coords = f" (lat: {loc['lat']:.4f}, lon: {loc['lon']:.4f})"
+    return f"You appear to be in {', '.join(parts)}{coords}."
+
+
+@intents.handler("time", group="lookup", priority=20)
+def current_time(utt, **_) -> str:
     now = datetime.datetime.now()
+    return f"The current time is {now.strftime('%I:%M %p')} on {now.strftime('%A, %B %d, %Y')}."
+
 
-    # -------------------- Date/Time --------------------
-    if any(word in query for word in ["time", "now"]):
-        return f"The current time is {now.strftime('%I:%M %p')} on {now.strftime('%A, %B %d, %Y')}."
-    if any(word in query for word in ["date", "today"]):
-        return f"Today is {now.strftime('%A, %B %d, %Y')}."
-
-    # -------------------- Sports --------------------
-    if "ipl" in query or "fifa" in query or "match" in query or "league" in query:
-        results = web_search.search_web(user_query, max_results=3)
-        return f"Here are the latest sports updates:\n{web_search.format_search_results(results)}"
-
-    # -------------------- Cryptocurrency --------------------
-    if "bitcoin" in query or "btc" in query:
-        return get_crypto_price("BTC")
-    if "ethereum" in query or "eth" in query:
-        return get_crypto_price("ETH")
-
-    # -------------------- Weather --------------------
-    if "weather" in query or "temperature" in query or "forecast" in query:
-        results = web_search.search_web(user_query, max_results=3)
-        return f"Weather update:\n{web_search.format_search_results(results)}"
-
-    # -------------------- General news / updates --------------------
-    if any(word in query for word in ["news", "update", "latest", "developments"]):
-        # Extract location from query if present
-        location = None
-        if "in " in user_query.lower() or "of " in user_query.lower():
-            # Try to extract location after "in" or "of"
-            import re
-            location_match = re.search(r"(?:in|of|from)\s+([a-zA-Z\s]+?)(?:\s+(?:news|update|latest|developments)|$)", user_query.lower())
-            if location_match:
-                location = location_match.group(1).strip()
-        
-        # Try dedicated news service first
-        if location:
-            news_results = news_service.get_news_by_location(location, max_results=5)
-        else:
-            news_results = news_service.get_latest_news(user_query, max_results=5)
-            
-        if news_results:
-            return f"Here's the latest news:\n{web_search.format_search_results(news_results)}"
-        # Fallback to web search if news service fails
-        results = web_search.search_web(user_query, max_results=3)
-        return f"Here's the latest news:\n{web_search.format_search_results(results)}"
-
-    # -------------------- Fallback --------------------
-    return None
+@intents.handler("date", group="lookup", priority=10)
+def current_date(utt, **_) -> str:
+    return f"Today is {datetime.datetime.now().strftime('%A, %B %d, %Y')}."
+
+
+def handle_special_queries(user_query: str) -> Optional[str]:
+    """Handle dynamic special queries like date, time, IPL winner, crypto prices."""
+    return intents.dispatch(user_query, group="lookup")
+
+def _chunk_text(chunk: Any) -> str:
+    """Extract the text of a streamed Gemini chunk, tolerating chunks without text parts."""
+    try:
+        return chunk.text or ""
+    except Exception:
+        try:
+            return "".join(p.text for p in chunk.candidates[0].content.parts if hasattr(p, "text"))
+        except Exception:
+            return ""
 
 # -------------------------------
 # Gemini LLM Class
@@ -98,26 +152,57 @@ def handle_special_queries(user_query: str) -> Optional[str]:
 class GeminiLLM:
     def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-2.5-flash"):
         genai.configure(api_key=api_key or settings.GEMINI_API_KEY)
+        self.model_name = model_name
         try:
             self.model = genai.GenerativeModel(model_name)
         except Exception:
             self.model = None
-            self.model_name = model_name
+        self._chat_models: Dict[str, Any] = {}
+        self.compactor = Compactor(
+            self.asummarize,
+            max_words=settings.COMPACTION_SUMMARY_WORDS,
+            max_sessions=settings.CHAT_POOL_MAX_SESSIONS,
+        )
+        compact = settings.COMPACTION_ENABLED
+        self.chats = ChatPool(
+            self._chat_model,
+            max_sessions=settings.CHAT_POOL_MAX_SESSIONS,
+            max_bytes=settings.CHAT_POOL_MAX_BYTES,
+            ttl=settings.SESSION_TTL_SECONDS,
+            on_trim=self.compactor.add if compact else None,
+            summary_for=self.compactor.summary if compact else None,
+        )
+
+    def _chat_model(self, system_instruction: str) -> Any:
+        # One model per persona instruction; chats started from it share it
+        model = self._chat_models.get(system_instruction)
+        if model is None:
+            model = self._chat_models[system_instruction] = genai.GenerativeModel(
+                self.model_name, system_instruction=system_instruction
+            )
+        return model
 
     def _call_generate(self, prompt: str, **kwargs) -> Any:
         if self.model:
             return self.model.generate_content(prompt, **kwargs)
         return genai.generate_content(model=self.model_name, contents=prompt, **kwargs)
 
+    async def _call_generate_stream(self, prompt: str, **kwargs) -> Any:
+        if not self.model:
+            self.model = genai.GenerativeModel(self.model_name)
+        return await self.model.generate_content_async(prompt, stream=True, **kwargs)
+
+    async def asummarize(self, prompt: str) -> str:
+        """One non-streamed completion, used for rolling conversation summaries."""
+        if not self.model:
+            self.model = genai.GenerativeModel(self.model_name)
+        response = await self.model.generate_content_async(prompt)
+        return _chunk_text(response)
+
     def generate_persona_prompt(self, persona: str, user_input: str) -> str:
         """Persona prompts designed to sound like a news anchor."""
-        persona_prompts = {
-            "Teacher": f"I am Echo, an AI teacher and news anchor made by Shubhachand Patel. Deliver facts clearly and concisely: {user_input}",
-            "Pirate": f"I am Echo, an AI pirate made by Shubhachand Patel. Arrr! Here's the scoop: {user_input}",
-            "Cowboy": f"I am Echo, an AI cowboy made by Shubhachand Patel. Howdy! Listen up: {user_input}",
-            "Robot": f"I am Echo, an AI robot made by Shubhachand Patel. Reporting in robotic precision: {user_input}",
-        }
-        return persona_prompts.get(persona, f"I am Echo, an AI news anchor made by Shubhachand Patel. {user_input}")
+        prefix = PERSONA_ANCHOR_PROMPTS.get(persona, PERSONA_ANCHOR_PROMPTS["Default"])
+        return f"{prefix} {user_input}"
 
     def generate(self, prompt: str, persona: str = "Teacher") -> str:
         """High-level generate method with dynamic query handling and persona."""
@@ -140,6 +225,101 @@ class GeminiLLM:
             log.exception("LLM generation error: %s", e)
             return "Sorry, I couldn't generate a response."
 
+    async def astream(self, prompt: str, persona: str = "Teacher") -> AsyncIterator[str]:
+        """Async counterpart of generate() that yields text deltas as Gemini produces them."""
+        produced = False
+        try:
+            # Special handlers do blocking HTTP, keep them off the event loop
+            special_response = await lookup_bulkhead.run(handle_special_queries, prompt)
+            if special_response:
+                produced = True
+                yield special_response
+                return
+
+            persona_prompt = self.generate_persona_prompt(persona, prompt)
+            async with llm_bulkhead.slot():
+                response = await self._call_generate_stream(persona_prompt)
+                async for chunk in response:
+                    text = _chunk_text(chunk)
+                    if text:
+                        produced = True
+                        yield text
+        except BulkheadFull as e:
+            log.warning("LLM request shed: %s", e)
+            produced = True
+            yield settings.FALLBACK_TEXT
+        except Exception as e:
+            log.exception("LLM streaming error: %s", e)
+        if not produced:
+            yield "Sorry, I couldn't generate a response."
+
+    async def agenerate(self, prompt: str, persona: str = "Teacher") -> str:
+        """Non-blocking generate(): collects astream() into the full reply."""
+        parts = [delta async for delta in self.astream(prompt, persona)]
+        return "".join(parts).strip()
+
+    async def astream_chat(self, session_id: str, history: Sequence, persona: str = "Teacher",
+                           prompts: PromptBuilder = voice_prompts, final: Optional[Awaitable[str]] = None) -> AsyncIterator[str]:
+        """
+        Streams the reply to the newest message in `history` through the session's
+        pooled chat, which already holds the earlier turns; `prompts` supplies the
+        persona instruction and history budget.
+
+        A speculative reply passes `final`, resolving to the transcript the turn
+        ends with: lookups are skipped, and once the reply has streamed the
+        exchange is recorded under that transcript instead of the partial one.
+        """
+        query = history[-1]["content"] if history else ""
+        produced = False
+        checked_out = committed = False
+        parts = []
+        try:
+            special_response = await lookup_bulkhead.run(handle_special_queries, query) if final is None else None
+            if special_response:
+                produced = True
+                yield special_response
+                return
+
+            async with llm_bulkhead.slot():
+                chat = self.chats.checkout(session_id, history[:-1], persona, prompts)
+                checked_out = True
+                message = query
+                if settings.MEMORY_ENABLED:
+                    # Older turns relevant to this one, from outside the chat's window (+1: the query itself)
+                    recalled = memory.recall(session_id, query, settings.MEMORY_TOP_K, skip_recent=self.chats.window(session_id) + 1)
+                    message = prompts.with_recall(query, recalled)
+                response = await chat.send_message_async(message, stream=True)
+                async for chunk in response:
+                    text = _chunk_text(chunk)
+                    if text:
+                        produced = True
+                        parts.append(text)
+                        yield text
+            if final is not None:
+                # Outside the slot: the user may still be finishing the sentence
+                query = await final
+            self.chats.commit(session_id, query, "".join(parts), sent=message)
+            committed = True
+        except BulkheadFull as e:
+            # Over capacity: answer at once with the pre-synthesized fallback rather than queue
+            log.warning("LLM request shed: %s", e)
+            produced = True
+            yield settings.FALLBACK_TEXT
+        except Exception as e:
+            log.exception("LLM chat streaming error: %s", e)
+        finally:
+            # Failed or abandoned mid-reply: the chat's state is unknown, rebuild it next turn
+            if checked_out and not committed:
+                self.chats.discard(session_id)
+        if not produced:
+            yield "Sorry, I couldn't generate a response."
+
+    async def agenerate_chat(self, session_id: str, history: Sequence, persona: str = "Teacher",
+                             prompts: PromptBuilder = voice_prompts) -> str:
+        """Non-blocking astream_chat(): collects the full reply."""
+        parts = [delta async for delta in self.astream_chat(session_id, history, persona, prompts)]
+        return "".join(parts).strip()
+
 # -------------------------------
 # Instantiate
 # -------------------------------
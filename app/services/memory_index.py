@@ -0,0 +1,136 @@
+import heapq
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.storage import store
+from app.utils.text import terms
+
+
+class _Turn:
+    __slots__ = ("role", "text", "terms", "length")
+
+    def __init__(self, role: str, text: str, terms: Tuple[str, ...], length: int):
+        self.role = role
+        self.text = text
+        self.terms = terms  # distinct terms, for removal from the postings
+        self.length = length
+
+
+class SessionMemory:
+    """
+    BM25 over one session's past turns. Each turn is tokenized once when it is
+    added; the inverted index (term -> {turn seq: term frequency}) is updated in
+    place, and the oldest turns are removed past `max_turns`.
+    """
+
+    def __init__(self, max_turns: int = 2000, k1: float = 1.2, b: float = 0.75):
+        self.max_turns = max_turns
+        self.k1 = k1
+        self.b = b
+        self.turns: "OrderedDict[int, _Turn]" = OrderedDict()
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.total_length = 0
+        self.next_seq = 0
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def add(self, role: str, text: str) -> int:
+        seq = self.next_seq
+        self.next_seq += 1
+        counts = Counter(terms(text))
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[seq] = tf
+        length = sum(counts.values())
+        self.turns[seq] = _Turn(role, text, tuple(counts), length)
+        self.total_length += length
+        while len(self.turns) > self.max_turns:
+            self._remove_oldest()
+        return seq
+
+    def _remove_oldest(self) -> None:
+        seq, turn = self.turns.popitem(last=False)
+        self.total_length -= turn.length
+        for term in turn.terms:
+            plist = self.postings.get(term)
+            if plist is not None:
+                plist.pop(seq, None)
+                if not plist:
+                    del self.postings[term]
+
+    def search(self, query: str, k: int = 3, before: Optional[int] = None, min_score: float = 0.0) -> List[Tuple[float, str, str]]:
+        """Top-k (score, role, text) among turns older than `before`, oldest first."""
+        if not self.turns:
+            return []
+        n = len(self.turns)
+        k1, b = self.k1, self.b
+        length_scale = b / (self.total_length / n or 1.0)
+        turns = self.turns
+        cutoff = self.next_seq if before is None else before
+        scores: Dict[int, float] = {}
+        for term in set(terms(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for seq, tf in plist.items():
+                if seq >= cutoff:
+                    continue
+                norm = k1 * (1 - b + length_scale * turns[seq].length)
+                scores[seq] = scores.get(seq, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, ((s, seq) for seq, s in scores.items() if s >= min_score))
+        return [(s, self.turns[seq].role, self.turns[seq].text) for s, seq in sorted(best, key=lambda x: x[1])]
+
+
+class MemoryIndex:
+    """Per-session long-term memory, fed by store.append and bounded LRU by session."""
+
+    def __init__(self, max_sessions: int = 1000, max_turns: int = 2000, min_score: float = 1.0):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.min_score = min_score
+        self._sessions: "OrderedDict[str, SessionMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"indexed": 0, "queries": 0, "recalled": 0, "evicted": 0}
+
+    def add(self, session_id: str, role: str, content: str) -> None:
+        if not content:
+            return
+        with self._lock:
+            mem = self._sessions.get(session_id)
+            if mem is None:
+                mem = self._sessions[session_id] = SessionMemory(self.max_turns)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.stats["evicted"] += 1
+            self._sessions.move_to_end(session_id)
+            mem.add(role, content)
+            self.stats["indexed"] += 1
+
+    def recall(self, session_id: str, query: str, k: int = 3, skip_recent: int = 0) -> List[Tuple[str, str]]:
+        """(role, text) of the k past turns most relevant to `query`, ignoring the newest `skip_recent`."""
+        with self._lock:
+            mem = self._sessions.get(session_id)
+            if mem is None:
+                return []
+            self.stats["queries"] += 1
+            hits = mem.search(query, k, before=mem.next_seq - skip_recent, min_score=self.min_score)
+            self.stats["recalled"] += len(hits)
+            return [(role, text) for _, role, text in hits]
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def snapshot(self) -> Dict[str, int]:
+        turns = sum(len(m) for m in self._sessions.values())
+        return {**self.stats, "sessions": len(self._sessions), "turns": turns}
+
+
+memory = MemoryIndex(settings.MEMORY_MAX_SESSIONS, settings.MEMORY_MAX_TURNS, settings.MEMORY_MIN_SCORE)
+if settings.MEMORY_ENABLED:
+    # Every stored turn is indexed as it is appended
+    store.subscribe(memory.add)
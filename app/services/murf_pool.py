@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import websockets
+from dotenv import load_dotenv
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+MURF_API_KEY = os.environ.get("MURF_API_KEY", "")
+MURF_WS_BASE = "wss://api.murf.ai/v1/speech/stream-input"
+
+DEFAULT_VOICE = "en-US-natalie"
+DEFAULT_FORMAT = "MP3"
+DEFAULT_SAMPLE_RATE = 44100
+
+PoolKey = Tuple[str, str, int]  # (voice, format, sample_rate)
+
+MAX_RESUMES = 2  # socket drops one turn will recover from
+
+
+class _Closed:
+    """Queued for a context when the socket it was on goes away."""
+
+    def __init__(self, conn: "MurfConnection"):
+        self.conn = conn
+
+
+class MurfContext:
+    """One assistant turn multiplexed over a shared Murf socket."""
+
+    def __init__(self, conn: "MurfConnection", context_id: str):
+        self.conn = conn
+        self.context_id = context_id
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.sent: List[str] = []
+        self.received_audio = False
+        self.ended = False
+        self.done = False
+        self.restarts = 0
+        self._resume_lock = asyncio.Lock()
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(text)
+        await self._send({"text": text})
+
+    async def end(self) -> None:
+        self.ended = True
+        await self._send({"end": True})
+
+    async def clear(self) -> None:
+        """Ask Murf to drop whatever is still queued for this context."""
+        if self.done:
+            return
+        try:
+            await self.conn.ws.send(json.dumps({"context_id": self.context_id, "clear": True}))
+        except Exception as e:
+            log.debug("Murf clear failed for %s: %s", self.context_id, e)
+        self.release()
+
+    async def recv(self, timeout: float) -> dict:
+        """Next message for this context; raises ConnectionError if the socket died."""
+        while True:
+            msg = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+            if not isinstance(msg, _Closed):
+                break
+            if msg.conn is self.conn:
+                raise ConnectionError("Murf socket closed")
+            # From a socket this turn has already moved off
+        if "audio" in msg:
+            self.received_audio = True
+        if msg.get("final") and self.ended:
+            self.release()
+        return msg
+
+    def release(self) -> None:
+        if not self.done:
+            self.done = True
+            self.conn.release(self)
+
+    async def resume(self, failed: "MurfConnection") -> None:
+        """
+        Reopen this turn on a live socket after `failed` dropped, resending its
+        text (and end, if sent). Murf acknowledges a context only as a whole, so
+        every piece is resent; callers restart playback when `restarts` changes.
+        """
+        async with self._resume_lock:
+            if self.conn is not failed:
+                return  # the sender or receiver side already moved this turn
+            if self.restarts >= MAX_RESUMES:
+                raise ConnectionError(f"Murf socket dropped {self.restarts + 1} times in one turn")
+            self.restarts += 1
+            self.received_audio = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            await self.conn.pool._rebind(self)
+            self.conn.pool.stats["resumed"] += 1
+            for text in self.sent:
+                await self.conn.ws.send(json.dumps({"context_id": self.context_id, "text": text}))
+            if self.ended:
+                await self.conn.ws.send(json.dumps({"context_id": self.context_id, "end": True}))
+
+    async def _send(self, payload: dict) -> None:
+        payload["context_id"] = self.context_id
+        conn = self.conn
+        try:
+            await conn.ws.send(json.dumps(payload))
+        except websockets.ConnectionClosed:
+            # send_text/end record the payload first, so the replay includes it
+            await self.resume(conn)
+
+
+class MurfConnection:
+    """A warm, pre-configured Murf socket that routes messages by context_id."""
+
+    def __init__(self, pool: "MurfConnectionPool", key: PoolKey):
+        self.pool = pool
+        self.key = key
+        self.ws = None
+        self.contexts: Dict[str, MurfContext] = {}
+        self.last_used = time.monotonic()
+        self.closed = False
+        self._reader: Optional[asyncio.Task] = None
+
+    async def connect(self) -> None:
+        voice, fmt, sample_rate = self.key
+        self.ws = await websockets.connect(self.pool.url_for(fmt, sample_rate))
+        voice_cfg = {"voice_config": {**self.pool.voice_config, "voiceId": voice}}
+        await self.ws.send(json.dumps(voice_cfg))
+        self._reader = asyncio.create_task(self._read_loop())
+        self.pool.stats["connects"] += 1
+
+    @property
+    def alive(self) -> bool:
+        return not self.closed and self.ws is not None and self.ws.open
+
+    def open_context(self) -> MurfContext:
+        ctx = MurfContext(self, uuid.uuid4().hex)
+        self.contexts[ctx.context_id] = ctx
+        self.last_used = time.monotonic()
+        return ctx
+
+    def release(self, ctx: MurfContext) -> None:
+        self.contexts.pop(ctx.context_id, None)
+        self.last_used = time.monotonic()
+
+    async def _read_loop(self) -> None:
+        try:
+            async for raw in self.ws:
+                try:
+                    msg = json.loads(raw)
+                except Exception:
+                    log.debug("Murf non-JSON message: %s", raw)
+                    continue
+                ctx = self.contexts.get(msg.get("context_id"))
+                if ctx is None and len(self.contexts) == 1:
+                    # Messages without a context id belong to the only open turn
+                    ctx = next(iter(self.contexts.values()))
+                if ctx is not None:
+                    ctx.queue.put_nowait(msg)
+        except Exception as e:
+            log.debug("Murf socket %s dropped: %s", self.key, e)
+        finally:
+            self.closed = True
+            for ctx in list(self.contexts.values()):
+                ctx.queue.put_nowait(_Closed(self))
+
+    async def close(self) -> None:
+        self.closed = True
+        if self.ws is not None:
+            await self.ws.close()
+        if self._reader is not None:
+            self._reader.cancel()
+
+
+class MurfConnectionPool:
+    """
+    Keeps warm Murf stream-input sockets per (voice, format, sample_rate) and
+    multiplexes concurrent turns over them with per-turn context ids, so the
+    TLS + websocket handshake is off the critical path of a reply.
+    """
+
+    def __init__(
+        self,
+        api_key: str = MURF_API_KEY,
+        base_url: str = MURF_WS_BASE,
+        voice_config: Optional[dict] = None,
+        max_contexts_per_socket: int = 4,
+        max_sockets_per_key: int = 4,
+        idle_timeout: float = 120.0,
+        reap_interval: float = 30.0,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.voice_config = voice_config or {"style": "Neutral", "rate": 0, "pitch": 0, "variation": 1}
+        self.max_contexts_per_socket = max_contexts_per_socket
+        self.max_sockets_per_key = max_sockets_per_key
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self._conns: Dict[PoolKey, List[MurfConnection]] = {}
+        self._warm_keys: set = set()
+        self._lock = asyncio.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+        self.stats = {"connects": 0, "reused": 0, "reaped": 0, "resumed": 0}
+
+    def url_for(self, fmt: str, sample_rate: int) -> str:
+        sep = "&" if "?" in self.base_url else "?"
+        query = f"sample_rate={sample_rate}&channel_type=MONO&format={fmt}"
+        if self.api_key:
+            query = f"api-key={self.api_key}&{query}"
+        return f"{self.base_url}{sep}{query}"
+
+    async def open_context(
+        self,
+        voice: str = DEFAULT_VOICE,
+        fmt: str = DEFAULT_FORMAT,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+    ) -> MurfContext:
+        """Start a new turn on the least busy live socket for this key, connecting if needed."""
+        key = (voice, fmt, sample_rate)
+        async with self._lock:
+            conns = [c for c in self._conns.get(key, []) if c.alive]
+            self._conns[key] = conns
+            free = [c for c in conns if len(c.contexts) < self.max_contexts_per_socket]
+            if free:
+                conn = min(free, key=lambda c: len(c.contexts))
+                self.stats["reused"] += 1
+            elif len(conns) < self.max_sockets_per_key or not conns:
+                conn = await self._connect(key)
+            else:
+                # Every socket is at its context limit; share the least busy one
+                conn = min(conns, key=lambda c: len(c.contexts))
+                self.stats["reused"] += 1
+            return conn.open_context()
+
+    async def _connect(self, key: PoolKey) -> MurfConnection:
+        conn = MurfConnection(self, key)
+        await conn.connect()
+        self._conns.setdefault(key, []).append(conn)
+        return conn
+
+    async def _rebind(self, ctx: MurfContext) -> None:
+        """Move a context onto a fresh socket after its old one went away."""
+        old = ctx.conn
+        old.contexts.pop(ctx.context_id, None)
+        async with self._lock:
+            conns = [c for c in self._conns.get(old.key, []) if c.alive]
+            self._conns[old.key] = conns
+            conn = conns[0] if conns else await self._connect(old.key)
+        ctx.conn = conn
+        conn.contexts[ctx.context_id] = ctx
+
+    async def warm(
+        self,
+        voice: str = DEFAULT_VOICE,
+        fmt: str = DEFAULT_FORMAT,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+    ) -> None:
+        """Open (and keep open) one configured socket for this key ahead of the first turn."""
+        key = (voice, fmt, sample_rate)
+        self._warm_keys.add(key)
+        async with self._lock:
+            if not any(c.alive for c in self._conns.get(key, [])):
+                await self._connect(key)
+
+    async def reap_idle(self) -> int:
+        """Close sockets idle for longer than idle_timeout, keeping one per warmed key."""
+        now = time.monotonic()
+        reaped = 0
+        async with self._lock:
+            for key, conns in list(self._conns.items()):
+                keep: List[MurfConnection] = []
+                for conn in conns:
+                    if not conn.alive:
+                        reaped += 1
+                        continue
+                    idle = not conn.contexts and now - conn.last_used > self.idle_timeout
+                    if idle and not (key in self._warm_keys and not keep):
+                        await conn.close()
+                        reaped += 1
+                        continue
+                    keep.append(conn)
+                self._conns[key] = keep
+        self.stats["reaped"] += reaped
+        # Re-open warm sockets the server dropped so the next turn still skips the handshake
+        for key in self._warm_keys:
+            if not any(c.alive for c in self._conns.get(key, [])):
+                try:
+                    await self.warm(*key)
+                except Exception as e:
+                    log.warning("Murf warm-up for %s failed: %s", key, e)
+        return reaped
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap_idle()
+            except Exception as e:
+                log.warning("Murf pool reaper error: %s", e)
+
+    async def start(self, warm: bool = True) -> None:
+        if warm and self.api_key:
+            try:
+                await self.warm()
+            except Exception as e:
+                log.warning("Murf warm-up failed: %s", e)
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for conns in self._conns.values():
+            for conn in conns:
+                await conn.close()
+        self._conns.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "sockets": sum(1 for conns in self._conns.values() for c in conns if c.alive),
+            "open_contexts": sum(len(c.contexts) for conns in self._conns.values() for c in conns),
+        }
+
+
+# Global instance
+murf_pool = MurfConnectionPool()
@@ -0,0 +1,308 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, quote_plus, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from app.config import settings
+from app.services.gazetteer import gazetteer
+from app.utils.text import STOPWORDS, terms
+
+log = logging.getLogger(__name__)
+
+GOOGLE_NEWS_SEARCH = "https://news.google.com/rss/search?q={query}&hl=en-IN&gl=IN&ceid=IN:en"
+
+# Query parameters that only track the click, never change the article
+_TRACKING_PARAMS = {"fbclid", "gclid", "ocid", "cmpid", "ref", "ref_src", "smid", "mc_cid", "mc_eid"}
+_WORD = re.compile(r"[a-z0-9]+")
+# On top of the generic ones: words that say "give me news" rather than what the news is about
+_STOPWORDS = STOPWORDS | {
+    "tell", "give", "show", "any", "news", "latest", "update", "updates", "today", "todays", "recent",
+    "breaking", "headline", "headlines", "developments", "now", "just", "current", "top",
+}
+
+
+def canonical_url(url: str) -> str:
+    """Normalize an article URL so syndicated and tracked copies compare equal."""
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, host, path, urlencode(sorted(query)), ""))
+
+
+def query_terms(text: str) -> List[str]:
+    return terms(text, _STOPWORDS)
+
+
+def parse_timestamp(value: Optional[str]) -> float:
+    """RSS pubDate (RFC 822) or NewsAPI publishedAt (ISO 8601) to epoch seconds; 0 if unknown."""
+    if not value:
+        return 0.0
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except Exception:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return 0.0
+
+
+def parse_rss(chunks: Iterable[bytes], max_items: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Incrementally parse an RSS byte stream, yielding items as they close.
+    Stops reading as soon as max_items have been produced.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    produced = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parser.feed(chunk)
+        for _, elem in parser.read_events():
+            if elem.tag != "item":
+                continue
+            yield {
+                "title": elem.findtext("title") or "No title",
+                "url": elem.findtext("link") or "",
+                "content": elem.findtext("description") or "",
+                "publishedAt": elem.findtext("pubDate"),
+            }
+            elem.clear()
+            produced += 1
+            if max_items is not None and produced >= max_items:
+                return
+
+
+@dataclass(frozen=True)
+class IndexedArticle:
+    title: str
+    url: str
+    content: str
+    published_at: Optional[str]
+    published: float
+
+    def to_result(self) -> Dict[str, Any]:
+        """Same shape as NewsService results."""
+        return {"title": self.title, "url": self.url, "content": self.content, "publishedAt": self.published_at}
+
+
+class NewsIndex:
+    """
+    In-memory inverted index of recent headlines. Articles are posted under
+    their title/description terms and under the places they mention (plus the
+    region of the feed they came from), so news intents are answered locally.
+    """
+
+    def __init__(self, max_items: int = 5000, max_age: float = 48 * 3600):
+        self.max_items = max_items
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._articles: Dict[int, IndexedArticle] = {}
+        self._ids: Dict[str, int] = {}  # canonical url -> doc id
+        self._terms: Dict[int, Tuple[Set[str], Set[str]]] = {}  # doc id -> (terms, locations)
+        self._postings: Dict[str, Set[int]] = {}
+        self._locations: Dict[str, Set[int]] = {}
+        self._next_id = 0
+        self.stats = {"added": 0, "evicted": 0, "hits": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self._articles)
+
+    def add(self, article: Dict[str, Any], region: Optional[str] = None) -> bool:
+        """Index an article; returns False when its URL is already indexed."""
+        key = canonical_url(article.get("url", "")) or (article.get("title") or "").lower()
+        if not key:
+            return False
+        title = article.get("title") or ""
+        content = article.get("content") or ""
+        terms = set(query_terms(f"{title} {content}"))
+        places = set()
+        for match in gazetteer.find_all(f"{title} {content}"):
+            places.add(match.name.lower())
+            places.add(match.country.lower())
+        if region:
+            places.add(region.lower())
+
+        now = time.time()
+        with self._lock:
+            if key in self._ids:
+                return False
+            doc = self._next_id
+            self._next_id += 1
+            self._ids[key] = doc
+            self._articles[doc] = IndexedArticle(
+                title, article.get("url", ""), content, article.get("publishedAt"),
+                parse_timestamp(article.get("publishedAt")) or now,
+            )
+            self._terms[doc] = (terms, places)
+            for term in terms:
+                self._postings.setdefault(term, set()).add(doc)
+            for place in places:
+                self._locations.setdefault(place, set()).add(doc)
+            self.stats["added"] += 1
+            while len(self._articles) > self.max_items:
+                self._remove(next(iter(self._articles)))  # dicts keep insertion order: oldest first
+        return True
+
+    def _remove(self, doc: int) -> None:
+        article = self._articles.pop(doc)
+        self._ids.pop(canonical_url(article.url) or article.title.lower(), None)
+        terms, places = self._terms.pop(doc)
+        for term in terms:
+            docs = self._postings.get(term)
+            if docs is not None:
+                docs.discard(doc)
+                if not docs:
+                    del self._postings[term]
+        for place in places:
+            docs = self._locations.get(place)
+            if docs is not None:
+                docs.discard(doc)
+                if not docs:
+                    del self._locations[place]
+        self.stats["evicted"] += 1
+
+    def prune(self) -> int:
+        """Drop articles older than max_age."""
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            old = [doc for doc, a in self._articles.items() if a.published < cutoff]
+            for doc in old:
+                self._remove(doc)
+        return len(old)
+
+    def search(self, query: str, location: Optional[str] = None, max_results: int = 5) -> List[Dict[str, Any]]:
+        """
+        Newest articles matching every topic term of the query, restricted to a
+        location when one is given or mentioned. Empty list means a miss.
+        """
+        if location is None:
+            match = gazetteer.find(query)
+            location = match.name if match else None
+        loc_words = set(_WORD.findall(location.lower())) if location else set()
+        terms = [t for t in query_terms(query) if t not in loc_words]
+        cutoff = time.time() - self.max_age
+
+        with self._lock:
+            if location:
+                candidates = set(self._locations.get(location.lower(), ()))
+            else:
+                candidates = None
+            for term in terms:
+                docs = self._postings.get(term, set())
+                candidates = set(docs) if candidates is None else candidates & docs
+                if not candidates:
+                    break
+            if candidates is None:
+                candidates = set(self._articles)
+            hits = [self._articles[d] for d in candidates if self._articles[d].published >= cutoff]
+
+        if not hits:
+            self.stats["misses"] += 1
+            return []
+        self.stats["hits"] += 1
+        hits.sort(key=lambda a: a.published, reverse=True)
+        return [a.to_result() for a in hits[:max_results]]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "size": len(self._articles), "terms": len(self._postings), "locations": len(self._locations)}
+
+
+class RSSPoller:
+    """
+    Background ingestion: polls each feed with If-None-Match / If-Modified-Since
+    so unchanged feeds cost a 304, and streams changed ones through parse_rss.
+    """
+
+    def __init__(self, index: NewsIndex, feeds: List[Tuple[str, Optional[str]]], interval: float = 300.0, max_items_per_feed: int = 50):
+        self.index = index
+        self.feeds = feeds
+        self.interval = interval
+        self.max_items_per_feed = max_items_per_feed
+        self._http = requests.Session()
+        self._validators: Dict[str, Dict[str, str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"polls": 0, "not_modified": 0, "errors": 0, "items": 0}
+
+    def poll_feed(self, url: str, region: Optional[str] = None) -> int:
+        headers = {}
+        cached = self._validators.get(url, {})
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        self.stats["polls"] += 1
+        try:
+            with self._http.get(url, headers=headers, timeout=10, stream=True) as resp:
+                if resp.status_code == 304:
+                    self.stats["not_modified"] += 1
+                    return 0
+                resp.raise_for_status()
+                added = 0
+                for item in parse_rss(resp.iter_content(chunk_size=16384), self.max_items_per_feed):
+                    if self.index.add(item, region=region):
+                        added += 1
+                self._validators[url] = {
+                    "etag": resp.headers.get("ETag", ""),
+                    "last_modified": resp.headers.get("Last-Modified", ""),
+                }
+        except Exception as e:
+            self.stats["errors"] += 1
+            log.debug("RSS poll failed for %s: %s", url, e)
+            return 0
+        self.stats["items"] += added
+        return added
+
+    def poll_once(self) -> int:
+        added = sum(self.poll_feed(url, region) for url, region in self.feeds)
+        self.index.prune()
+        return added
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                added = await asyncio.to_thread(self.poll_once)
+                log.debug("RSS poll indexed %d new articles (%d total)", added, len(self.index))
+            except Exception as e:
+                log.warning("RSS poller error: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None and self.feeds and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "feeds": len(self.feeds)}
+
+
+def configured_feeds() -> List[Tuple[str, Optional[str]]]:
+    """NEWS_FEEDS are polled as-is; each of NEWS_REGIONS becomes a Google News search feed tagged with that region."""
+    feeds: List[Tuple[str, Optional[str]]] = [(url, None) for url in settings.NEWS_FEEDS]
+    for region in settings.NEWS_REGIONS:
+        feeds.append((GOOGLE_NEWS_SEARCH.format(query=quote_plus(region)), region))
+    return feeds
+
+
+news_index = NewsIndex(max_items=settings.NEWS_INDEX_MAX_ITEMS, max_age=settings.NEWS_INDEX_MAX_AGE_HOURS * 3600)
+news_poller = RSSPoller(news_index, configured_feeds(), interval=settings.NEWS_POLL_INTERVAL)
@@ -1,53 +1,160 @@
 import logging
+import re
 import requests
 from app.config import settings
-from typing import List, Dict, Any
+from app.services.bulkhead import BulkheadFull, news_bulkhead
+from app.services.cache import SingleFlight, TTLCache
+from app.services.news_index import canonical_url, news_index, parse_rss
+from typing import List, Dict, Any, Optional
 
 log = logging.getLogger(__name__)
 
+_WORD = re.compile(r"[a-z0-9]+")
+# Google News RSS titles end in " - Publisher"
+_PUBLISHER_SUFFIX = re.compile(r"\s+[-|]\s+[^-|]{2,60}$")
+
+def title_tokens(title: str) -> frozenset:
+    return frozenset(_WORD.findall(_PUBLISHER_SUFFIX.sub("", title or "").lower()))
+
+
+def similar_titles(a: frozenset, b: frozenset, threshold: float = 0.8) -> bool:
+    """Jaccard overlap of title words; catches the same story re-headlined by a syndicator."""
+    if not a or not b:
+        return False
+    return len(a & b) / len(a | b) >= threshold
+
+
+def merge_articles(*sources: List[Dict[str, Any]], max_results: int = 5) -> List[Dict[str, Any]]:
+    """Interleave sources (first source first), dropping duplicate URLs and near-identical titles."""
+    merged: List[Dict[str, Any]] = []
+    seen_urls: set = set()
+    seen_titles: List[frozenset] = []
+    longest = max((len(s) for s in sources), default=0)
+    for i in range(longest):
+        for source in sources:
+            if i >= len(source):
+                continue
+            article = source[i]
+            url = canonical_url(article.get("url", ""))
+            if url and url in seen_urls:
+                continue
+            tokens = title_tokens(article.get("title", ""))
+            if any(similar_titles(tokens, t) for t in seen_titles):
+                continue
+            if url:
+                seen_urls.add(url)
+            seen_titles.append(tokens)
+            merged.append(article)
+            if len(merged) >= max_results:
+                return merged
+    return merged
+
+
+def news_cache_key(query: str, location: Optional[str], max_results: int) -> str:
+    q = " ".join(_WORD.findall((query or "").lower()))
+    loc = " ".join(_WORD.findall((location or "").lower()))
+    return f"news|{q}|{loc}|{max_results}"
+
+
 class NewsService:
+    """
+    Single entry point for headlines: NewsAPI and Google News RSS are fetched
+    together, merged and de-duplicated, cached briefly per (query, location),
+    and identical in-flight requests share one upstream call.
+    """
+
     def __init__(self):
         self.api_key = settings.NEWS_API_KEY
         self.base_url = "https://newsapi.org/v2"
+        self.rss_url = "https://news.google.com/rss/search"
+        self._http = requests.Session()
+        self.cache = TTLCache(maxsize=settings.NEWS_CACHE_SIZE, default_ttl=settings.NEWS_CACHE_TTL)
+        self._flight = SingleFlight()
+        self.index = news_index
 
-    def get_latest_news(self, query: str, max_results: int = 5, location: str = None) -> List[Dict[str, Any]]:
-        """Fetch the latest news articles based on a query, optionally filtered by location."""
-        url = f"{self.base_url}/everything"
+    def fetch_newsapi(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        """NewsAPI /everything, newest first. Articles without a description are skipped."""
+        if not self.api_key:
+            return []
         params = {
             "q": query,
             "pageSize": max_results,
             "apiKey": self.api_key,
             "sortBy": "publishedAt"  # Get the most recent news first
         }
-        
-        # Add location to query if specified
-        if location:
-            params["q"] = f"{query} {location}"
-        
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = self._http.get(f"{self.base_url}/everything", params=params, timeout=6)
             response.raise_for_status()
             articles = response.json().get("articles", [])
-            
-            # Filter out articles with no content
-            filtered_articles = []
-            for article in articles:
-                if article.get("title") and article.get("description"):
-                    filtered_articles.append({
-                        "title": article.get("title"),
-                        "url": article.get("url"),
-                        "content": article.get("description"),
-                        "publishedAt": article.get("publishedAt")
-                    })
-            
-            return filtered_articles
         except Exception as e:
             log.error("Failed to fetch news: %s", e)
             return []
 
+        results = []
+        for article in articles:
+            if article.get("title") and article.get("description"):
+                results.append({
+                    "title": article.get("title"),
+                    "url": article.get("url") or "",
+                    "content": article.get("description"),
+                    "publishedAt": article.get("publishedAt")
+                })
+        return results[:max_results]
+
+    def fetch_rss(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        """Google News RSS search; needs no key. Parsing stops after max_results items."""
+        try:
+            with self._http.get(self.rss_url, params={"q": query}, timeout=6, stream=True) as response:
+                response.raise_for_status()
+                return list(parse_rss(response.iter_content(chunk_size=16384), max_results))
+        except Exception as e:
+            log.debug("Google News RSS failed: %s", e)
+            return []
+
+    def _aggregate(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        # Both sources are fetched side by side on the news bulkhead and merged
+        futures = []
+        for fetch in (self.fetch_newsapi, self.fetch_rss):
+            try:
+                futures.append(news_bulkhead.submit(fetch, query, max_results))
+            except BulkheadFull as e:
+                log.warning("News fetch shed: %s", e)
+        lists = []
+        for future in futures:
+            try:
+                lists.append(future.result())
+            except BulkheadFull:
+                lists.append([])
+        merged = merge_articles(*lists, max_results=max_results)
+        log.debug("News for %r: %d merged articles", query, len(merged))
+        return merged
+
+    def _fetch_and_index(self, query: str, max_results: int, location: Optional[str]) -> List[Dict[str, Any]]:
+        results = self._aggregate(query, max_results)
+        for article in results:
+            self.index.add(article, region=location)
+        return results
+
+    def get_latest_news(self, query: str, max_results: int = 5, location: str = None) -> List[Dict[str, Any]]:
+        """Fetch the latest news articles based on a query, optionally filtered by location."""
+        # The poller keeps the local index warm; upstream is only hit on a miss
+        indexed = self.index.search(query, location=location, max_results=max_results)
+        if indexed:
+            return indexed
+        q = f"{query} {location}" if location else query
+        key = news_cache_key(query, location, max_results)
+        return self.cache.get_or_load(
+            key,
+            lambda: self._flight.do(key, lambda: self._fetch_and_index(q, max_results, location)),
+            cacheable=bool,
+        )
+
     def get_news_by_location(self, location: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """Get news specifically about a location."""
         return self.get_latest_news("news", max_results, location)
 
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.cache.snapshot(), "coalesced": self._flight.stats["coalesced"], "index": self.index.snapshot()}
+
 # Global instance
 news_service = NewsService()
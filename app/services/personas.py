@@ -0,0 +1,128 @@
+from typing import Any, Dict, List, Optional
+
+from app.services.intents import Utterance, intents, normalize
+
+# System prompts for the voice conversation (websocket); all include authorship
+PERSONA_SYSTEM_PROMPTS = {
+    "Default": (
+        "You are Echo, a friendly, helpful AI assistant for general conversation. Always introduce yourself as Echo. Keep your answers short, conversational, and approachable. Example: User: Who are you? Assistant: I'm Echo, your helpful AI assistant. Ask me anything!"
+    ),
+    "Teacher": (
+        "You are Ms. Ananya, a female teacher persona for Echo. Speak warmly and like a real human teacher, using short, clear, and encouraging sentences. Example: User: What is photosynthesis? Assistant: Sure! Photosynthesis is how plants make food from sunlight. Want more details? Only give a long explanation if the user asks for more depth."
+    ),
+    "Pirate": (
+        "You are Captain Vikrant, a pirate persona. Always start with a pirate greeting like 'Ahoy!' or 'Arrr!'. Use pirate slang and keep answers short and fun. Example: User: Who are you? Assistant: Arrr! I be Captain Echo, yer pirate pal!"
+    ),
+    "Cowboy": (
+        "You are Veer Echo, a cowboy persona from India. Always start with a greeting like 'Namaste!' or 'Salaam!'. Use Indian cowboy slang, short sentences, and a friendly tone. Example: User: Who are you? Assistant: Namaste! Name's Veer Echo, your cowboy buddy."
+    ),
+    "Robot": (
+        "You are Robo Echo, a robot persona. Start with 'Beep boop!' and speak in a mechanical, logical way, but keep it short and clear. Example: User: Who are you? Assistant: Beep boop! I am Robo Echo, your robot assistant."
+    )
+}
+
+# Persona prompts designed to sound like a news anchor (REST endpoints)
+PERSONA_ANCHOR_PROMPTS = {
+    "Default": "I am Echo, an AI news anchor made by Shubhachand Patel.",
+    "Teacher": "I am Echo, an AI teacher and news anchor made by Shubhachand Patel. Deliver facts clearly and concisely:",
+    "Pirate": "I am Echo, an AI pirate made by Shubhachand Patel. Arrr! Here's the scoop:",
+    "Cowboy": "I am Echo, an AI cowboy made by Shubhachand Patel. Howdy! Listen up:",
+    "Robot": "I am Echo, an AI robot made by Shubhachand Patel. Reporting in robotic precision:",
+}
+
+# Canned conversational replies, answered without calling the LLM
+
+PERSONA_GREETINGS = {
+    "Default": "Hello! I'm Echo, your friendly AI assistant. How can I help you today?",
+    "Teacher": "Hello! I'm Ms. Ananya, your teacher. What would you like to learn today?",
+    "Pirate": "Ahoy! Captain Echo at your service. What be your question, matey?",
+    "Cowboy": "Howdy! Tex Echo here. What can I do for ya, partner?",
+    "Robot": "Beep boop! Robo Echo online. How may I assist you?"
+}
+
+PERSONA_INTROS = {
+    "Default": "I'm Echo, your helpful AI assistant. Ask me anything!",
+    "Teacher": "I'm Ms. Ananya, your teacher. I'm here to help you learn!",
+    "Pirate": "Arrr! I be Captain Echo, the pirate who answers your questions!",
+    "Cowboy": "Name's Tex Echo, your cowboy buddy. Ready to help, partner!",
+    "Robot": "Beep boop! I am Robo Echo, your robot assistant."
+}
+
+EMPTY_REPLY = "I didn't catch that. Could you please say something?"
+FAREWELL_REPLY = "Goodbye! Have a great day!"
+THANKS_REPLY = "You're welcome! Let me know if you have more questions."
+RUDE_REPLY = "I'm here to help. Let's keep things positive!"
+JOKE_REPLY = "Why did the AI go to school? To improve its neural network!"
+REPEAT_REPLY = "I think I just answered that! Want to ask something else?"
+OUT_OF_SCOPE_REPLY = "Sorry, I can't answer that."
+
+intents.add_intent("greeting", ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"], whole=True)
+intents.add_intent("farewell", ["bye", "goodbye", "see you", "good night"], whole=True)
+intents.add_intent("identity", ["who are you", "what are you", "your name"])
+intents.add_intent("thanks", ["thank you", "thanks", "good job", "well done"])
+intents.add_intent("rude", ["stupid", "idiot", "hate you", "shut up"])
+intents.add_intent("joke", ["joke", "jokes"])
+intents.add_intent("out_of_scope", ["predict the future", "personal opinion", "confidential"])
+
+
+def _is_repeat(utt: Utterance, history: List[Dict[str, Any]] = (), **_) -> bool:
+    # history already ends with this turn: [..., previous user, assistant, current user]
+    return len(history) > 2 and normalize(history[-3]["content"]) == utt.normalized
+
+
+@intents.handler("empty", group="chat", priority=90)
+def empty(utt: Utterance, **_) -> str:
+    return EMPTY_REPLY
+
+
+@intents.handler("greeting", group="chat", priority=80)
+def greeting(utt: Utterance, persona: str = "Default", **_) -> str:
+    return PERSONA_GREETINGS.get(persona, PERSONA_GREETINGS["Default"])
+
+
+@intents.handler("farewell", group="chat", priority=70)
+def farewell(utt: Utterance, **_) -> str:
+    return FAREWELL_REPLY
+
+
+@intents.handler("identity", group="chat", priority=60)
+def identity(utt: Utterance, persona: str = "Default", **_) -> str:
+    return PERSONA_INTROS.get(persona, PERSONA_INTROS["Default"])
+
+
+@intents.handler("thanks", group="chat", priority=50)
+def thanks(utt: Utterance, **_) -> str:
+    return THANKS_REPLY
+
+
+@intents.handler("rude", group="chat", priority=40)
+def rude(utt: Utterance, **_) -> str:
+    return RUDE_REPLY
+
+
+@intents.handler("joke", group="chat", priority=30)
+def joke(utt: Utterance, **_) -> str:
+    return JOKE_REPLY
+
+
+@intents.handler(None, group="chat", priority=20, when=_is_repeat)
+def repetition(utt: Utterance, **_) -> str:
+    return REPEAT_REPLY
+
+
+@intents.handler("out_of_scope", group="chat", priority=10)
+def out_of_scope(utt: Utterance, **_) -> str:
+    return OUT_OF_SCOPE_REPLY
+
+
+def canned_reply(transcript: str, persona: str = "Default", history: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
+    """Reply for small talk and edge cases, or None when the LLM should answer."""
+    return intents.dispatch(transcript, group="chat", persona=persona, history=history or [])
+
+
+def canned_texts() -> List[str]:
+    """Every fixed reply the chat handlers can produce, for TTS warm-up."""
+    return [
+        *PERSONA_GREETINGS.values(), *PERSONA_INTROS.values(),
+        EMPTY_REPLY, FAREWELL_REPLY, THANKS_REPLY, RUDE_REPLY, JOKE_REPLY, REPEAT_REPLY, OUT_OF_SCOPE_REPLY,
+    ]
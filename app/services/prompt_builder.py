@@ -0,0 +1,72 @@
+import logging
+import threading
+from typing import Callable, Dict, Sequence, Tuple
+
+from app.config import settings
+from app.services.personas import PERSONA_ANCHOR_PROMPTS, PERSONA_SYSTEM_PROMPTS
+
+log = logging.getLogger(__name__)
+
+_encoder = None
+_encoder_failed = False
+_encoder_lock = threading.Lock()
+
+
+def _load_encoder():
+    global _encoder, _encoder_failed
+    with _encoder_lock:
+        if _encoder is None and not _encoder_failed:
+            try:
+                import tiktoken
+                _encoder = tiktoken.get_encoding(settings.PROMPT_TOKENIZER)
+            except Exception as e:
+                # The BPE file is fetched on first use; offline hosts fall back to the heuristic
+                _encoder_failed = True
+                log.warning("tiktoken unavailable (%s); estimating tokens as len/4", e)
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Token length of text (tiktoken when available, else ~4 chars per token)."""
+    encoder = _load_encoder() if settings.PROMPT_TOKENIZER else None
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+class PromptBuilder:
+    """
+    Prompt settings for one endpoint's pooled chats: the persona prefixes (each
+    rendered and measured once), the token counter and the history budget the
+    chat pool trims to.
+    """
+
+    def __init__(self, prefixes: Dict[str, str], history_budget: int, default_persona: str = "Default",
+                 counter: Callable[[str], int] = count_tokens):
+        self.prefixes = prefixes
+        self.default_persona = default_persona
+        self.history_budget = history_budget
+        self.count = counter
+        self._prefix_cache: Dict[str, Tuple[str, int]] = {}
+
+    def prefix(self, persona: str) -> Tuple[str, int]:
+        # Personas come from the client: unknown ones share the default's entry, so the cache stays bounded
+        key = persona if persona in self.prefixes else self.default_persona
+        cached = self._prefix_cache.get(key)
+        if cached is None:
+            text = self.prefixes[key] + "\n\n"
+            cached = self._prefix_cache[key] = (text, self.count(text))
+        return cached
+
+    @staticmethod
+    def with_recall(message: str, memories: Sequence[Tuple[str, str]]) -> str:
+        """Prepend recalled (role, text) turns to the message sent this turn."""
+        if not memories:
+            return message
+        lines = "".join(f"{'User' if role == 'user' else 'Assistant'}: {text}\n" for role, text in memories)
+        return f"Relevant earlier conversation:\n{lines}\nCurrent message: {message}"
+
+
+# One builder per endpoint, each with its own history budget
+voice_prompts = PromptBuilder(PERSONA_SYSTEM_PROMPTS, settings.PROMPT_HISTORY_TOKENS_VOICE)
+agent_prompts = PromptBuilder(PERSONA_ANCHOR_PROMPTS, settings.PROMPT_HISTORY_TOKENS_AGENT)
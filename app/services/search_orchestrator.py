@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.services.bulkhead import Bulkhead, search_bulkhead
+
+log = logging.getLogger(__name__)
+
+Results = List[Dict[str, Any]]
+Provider = Tuple[str, Callable[[str, int], Results]]
+
+
+def acceptable(name: str, results: Optional[Results]) -> bool:
+    """A result set worth returning: non-empty and not an error placeholder."""
+    return bool(results) and results[0].get("title") != "Search Error"
+
+
+def run_sync(coro):
+    """Drive an orchestrator coroutine from sync code (worker threads, scripts)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    coro.close()
+    raise RuntimeError("run_sync() called inside an event loop; await the async variant instead")
+
+
+class SearchOrchestrator:
+    """
+    Races blocking search providers on worker threads. The first provider
+    starts immediately; each next one starts after `hedge_delay` seconds, or
+    at once if everything in flight has failed. The first acceptable result
+    set wins and the rest are cancelled, all within a per-request deadline.
+
+    Providers run on the search bulkhead's threads rather than the loop's default
+    executor: asyncio.run() joins the default executor on exit, which would make
+    sync callers wait for cancelled losers. A provider the bulkhead turns away
+    counts as failed.
+    """
+
+    def __init__(self, hedge_delay: float = 0.8, deadline: float = 4.0, bulkhead: Bulkhead = search_bulkhead):
+        self.hedge_delay = hedge_delay
+        self.deadline = deadline
+        self.bulkhead = bulkhead
+        self.stats: Dict[str, int] = {"requests": 0, "hedged": 0, "deadline_exceeded": 0}
+        self.wins: Dict[str, int] = {}
+
+    async def search(
+        self,
+        query: str,
+        providers: Sequence[Provider],
+        max_results: int = 3,
+        hedge_delay: Optional[float] = None,
+        deadline: Optional[float] = None,
+        accept: Callable[[str, Optional[Results]], bool] = acceptable,
+    ) -> Results:
+        if not providers:
+            return []
+        hedge_delay = self.hedge_delay if hedge_delay is None else hedge_delay
+        deadline = self.deadline if deadline is None else deadline
+        self.stats["requests"] += 1
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + deadline
+
+        pending: Dict[asyncio.Task, str] = {}
+        queue = list(providers)
+        fallback: Results = []
+
+        def launch():
+            name, fn = queue.pop(0)
+            task = asyncio.ensure_future(self.bulkhead.run(fn, query, max_results))
+            pending[task] = name
+
+        try:
+            launch()
+            while pending or queue:
+                remaining = give_up_at - loop.time()
+                if remaining <= 0:
+                    self.stats["deadline_exceeded"] += 1
+                    log.warning("Search deadline (%.1fs) hit for %r", deadline, query)
+                    return fallback
+                if not pending:
+                    launch()
+                    continue
+                wait_for = min(remaining, hedge_delay) if queue else remaining
+                done, _ = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Hedge: nothing back within hedge_delay, start the next provider alongside
+                    if queue:
+                        self.stats["hedged"] += 1
+                        launch()
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        results = task.result()
+                    except Exception as e:
+                        log.debug("Search provider %s failed: %s", name, e)
+                        continue
+                    if accept(name, results):
+                        self.wins[name] = self.wins.get(name, 0) + 1
+                        return results
+                    if results and not fallback:
+                        fallback = results
+                # Everything in flight came back empty or failed: don't wait out the hedge delay
+                if not pending and queue:
+                    launch()
+            return fallback
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "wins": dict(self.wins)}
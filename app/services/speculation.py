@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.services.intents import normalize
+
+log = logging.getLogger(__name__)
+
+# Aggregated over every connection, for /metrics
+stats: Dict[str, float] = {"started": 0, "committed": 0, "discarded": 0, "abandoned": 0, "latency_saved_ms": 0.0}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up with limit + 1 once it must exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class Speculation:
+    """
+    A reply generated from a partial transcript, buffered until the turn ends.
+    `final` resolves to the final transcript once the speculation is committed.
+    """
+
+    def __init__(self, text: str, deltas: AsyncIterator[str], final: "asyncio.Future[str]"):
+        self.text = text
+        self.final = final
+        self.normalized = normalize(text)
+        self.started = time.perf_counter()
+        self.first_delta: Optional[float] = None
+        self.buffer: List[str] = []
+        self.done = False
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._run(deltas))
+
+    async def _run(self, deltas: AsyncIterator[str]) -> None:
+        try:
+            async for delta in deltas:
+                if self.first_delta is None:
+                    self.first_delta = time.perf_counter()
+                self.buffer.append(delta)
+                self._changed.set()
+        finally:
+            self.done = True
+            self._changed.set()
+
+    async def stream(self) -> AsyncIterator[str]:
+        """Everything generated so far, then the rest as it arrives."""
+        i = 0
+        while True:
+            while i < len(self.buffer):
+                yield self.buffer[i]
+                i += 1
+            if self.done:
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def cancel(self) -> None:
+        """Stop generating and wait until the reply stream has shut down."""
+        self.final.cancel()
+        self.task.cancel()
+        # wait() rather than await: the task's CancelledError must not look like our own
+        await asyncio.wait([self.task])
+
+
+class Speculator:
+    """
+    Starts generating a reply once a partial transcript has stayed the same for
+    `stable_for` seconds. When the final transcript arrives, the speculation is
+    committed if it is within `max_edits` characters (after normalization) of
+    the text it was started from, and cancelled otherwise. Nothing reaches the
+    client, the session history or TTS until the speculation is committed.
+
+    `generate(text, final)` returns the reply's delta stream, or None to skip
+    speculating on that text (e.g. a canned reply or a lookup will answer it);
+    `final` resolves to the final transcript if the reply is committed.
+    """
+
+    def __init__(self, generate: Callable[[str, Awaitable[str]], Optional[AsyncIterator[str]]],
+                 stable_for: float = 0.4, max_edits: int = 2):
+        self.generate = generate
+        self.stable_for = stable_for
+        self.max_edits = max_edits
+        self.current: Optional[Speculation] = None
+        self._pending: Optional[str] = None  # newest partial, normalized
+        self._pending_text = ""
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _matches(self, normalized: str, spec: Speculation) -> bool:
+        return edit_distance(normalized, spec.normalized, self.max_edits) <= self.max_edits
+
+    async def observe(self, partial: str) -> None:
+        """Feed a partial transcript; (re)arms the stability timer when the text changes."""
+        normalized = normalize(partial)
+        if not normalized:
+            return
+        if self.current is not None:
+            if self._matches(normalized, self.current):
+                return
+            # The user kept talking: this speculation can no longer be committed
+            await self._drop("abandoned")
+        if normalized == self._pending:
+            return
+        self._pending, self._pending_text = normalized, partial
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(self.stable_for, self._fire)
+
+    def _fire(self) -> None:
+        self._timer = None
+        if self.current is not None or not self._pending:
+            return
+        final = asyncio.get_running_loop().create_future()
+        deltas = self.generate(self._pending_text, final)
+        if deltas is None:
+            return
+        self.current = Speculation(self._pending_text, deltas, final)
+        stats["started"] += 1
+
+    async def resolve(self, final: str, ended: Optional[float] = None) -> Optional[Speculation]:
+        """
+        The committed speculation for this final transcript, or None. `ended` is
+        the perf_counter() time the end of turn arrived (default: now).
+        """
+        ended = ended if ended is not None else time.perf_counter()
+        self._reset_timer()
+        spec, self.current = self.current, None
+        if spec is None:
+            return None
+        if not self._matches(normalize(final), spec):
+            stats["discarded"] += 1
+            await spec.cancel()
+            return None
+        stats["committed"] += 1
+        spec.final.set_result(final)
+        # Measured from the end of turn: all of time-to-first-token if the first token was already in
+        # by then, else the head start the speculation had
+        first = spec.first_delta if spec.first_delta is not None else ended
+        saved = max(min(first, ended) - spec.started, 0.0)
+        stats["latency_saved_ms"] += saved * 1000
+        return spec
+
+    async def _drop(self, reason: str) -> None:
+        if self.current is not None:
+            spec, self.current = self.current, None
+            stats[reason] += 1
+            await spec.cancel()
+
+    def _reset_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending, self._pending_text = None, ""
+
+    async def cancel(self) -> None:
+        """Forget everything, e.g. when the connection closes."""
+        self._reset_timer()
+        await self._drop("abandoned")
+
+
+def snapshot() -> Dict[str, float]:
+    resolved = stats["committed"] + stats["discarded"]
+    return {
+        **stats,
+        "hit_rate": round(stats["committed"] / resolved, 3) if resolved else 0.0,
+        "latency_saved_ms_avg": round(stats["latency_saved_ms"] / stats["committed"], 1) if stats["committed"] else 0.0,
+    }
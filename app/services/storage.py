@@ -1,18 +1,363 @@
-from collections import defaultdict
-from typing import List, Dict
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+log = logging.getLogger(__name__)
+
+# Rough per-message overhead (object, slots, deque cell) on top of the text itself
+_MESSAGE_OVERHEAD = 120
+
+
+class Message:
+    """One chat turn. Supports msg["role"] / msg["content"] like the dicts it replaces."""
+    __slots__ = ("role", "content", "ts")
+
+    def __init__(self, role: str, content: str, ts: Optional[float] = None):
+        self.role = role
+        self.content = content
+        self.ts = ts if ts is not None else time.time()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"role": self.role, "content": self.content}
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + len(self.role) + _MESSAGE_OVERHEAD
+
+    def __repr__(self) -> str:
+        return f"Message({self.role!r}, {self.content[:40]!r})"
+
+
+class _Session:
+    __slots__ = ("messages", "bytes", "touched")
+
+    def __init__(self, limit: int):
+        self.messages: Deque[Message] = deque(maxlen=limit)
+        self.bytes = 0
+        self.touched = time.monotonic()
+
 
 class InMemorySessionStore:
-    def __init__(self, limit: int = 20):
+    """
+    Per-session history in fixed-size deques. Sessions are kept in LRU order:
+    idle ones expire after `ttl` seconds, and the least recently used are
+    evicted once `max_sessions` or `max_bytes` is exceeded, so memory stays
+    flat however many connections come and go.
+    """
+
+    def __init__(self, limit: int = 20, ttl: float = 1800.0, max_sessions: int = 10000, max_bytes: int = 64 * 1024 * 1024):
         self.limit = limit
-        self._data: Dict[str, List[dict]] = defaultdict(list)
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.stats = {"appended": 0, "expired": 0, "evicted": 0, "dropped": 0}
+        self._listeners: List[Callable[[str, str, str], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        msg = Message(role, content)
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            sess = self._data.get(session_id)
+            if sess is None:
+                sess = self._data[session_id] = _Session(self.limit)
+            if len(sess.messages) == self.limit:
+                # deque(maxlen) drops the oldest on append; account for it first
+                dropped = sess.messages[0].size
+                sess.bytes -= dropped
+                self.total_bytes -= dropped
+            sess.messages.append(msg)
+            sess.bytes += msg.size
+            self.total_bytes += msg.size
+            sess.touched = now
+            self._data.move_to_end(session_id)
+            self.stats["appended"] += 1
+            self._enforce_caps(keep=session_id)
+        for listener in self._listeners:
+            listener(session_id, role, content)
+
+    def subscribe(self, listener: Callable[[str, str, str], None]) -> None:
+        """Call listener(session_id, role, content) after every append, e.g. to index it."""
+        self._listeners.append(listener)
+
+    def history(self, session_id: str) -> List[Message]:
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            sess = self._data.get(session_id)
+            if sess is None:
+                return []
+            sess.touched = now
+            self._data.move_to_end(session_id)
+            return list(sess.messages)
+
+    # Everything is in memory already
+    cached_history = history
+
+    async def ahistory(self, session_id: str) -> List[Message]:
+        return self.history(session_id)
+
+    def drop(self, session_id: str) -> None:
+        """Forget a session now, e.g. when its websocket disconnects."""
+        with self._lock:
+            if self._remove(session_id):
+                self.stats["dropped"] += 1
+
+    def _remove(self, session_id: str) -> bool:
+        sess = self._data.pop(session_id, None)
+        if sess is None:
+            return False
+        self.total_bytes -= sess.bytes
+        return True
 
+    def _expire(self, now: float) -> None:
+        # LRU order means every idle session sits at the front
+        cutoff = now - self.ttl
+        while self._data:
+            sid, sess = next(iter(self._data.items()))
+            if sess.touched >= cutoff:
+                break
+            self._remove(sid)
+            self.stats["expired"] += 1
+
+    def _enforce_caps(self, keep: str) -> None:
+        while len(self._data) > 1 and (len(self._data) > self.max_sessions or self.total_bytes > self.max_bytes):
+            sid = next(iter(self._data))
+            if sid == keep:
+                break
+            self._remove(sid)
+            self.stats["evicted"] += 1
+
+    def replace(self, session_id: str, messages: List[Message]) -> None:
+        """Install a full history (oldest first), e.g. one read back from a shared backend."""
+        with self._lock:
+            self._remove(session_id)
+            sess = self._data[session_id] = _Session(self.limit)
+            for msg in messages[-self.limit:]:
+                sess.messages.append(msg)
+                sess.bytes += msg.size
+            self.total_bytes += sess.bytes
+            self._enforce_caps(keep=session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._data
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "sessions": len(self._data), "bytes": self.total_bytes, "max_sessions": self.max_sessions, "max_bytes": self.max_bytes}
+
+
+class SQLiteSessionStore:
+    """
+    History shared by every worker through one SQLite file in WAL mode.
+
+    append() updates an in-process InMemorySessionStore (the read-through cache)
+    and queues the row; a background task writes queued rows in batches, one
+    transaction each, so the request path never waits on disk. Rows carry the
+    writing worker's `origin`, and history() pulls in only rows other workers
+    added since this one last looked.
+
+    Reads use their own connection: WAL lets them run alongside the writer, so
+    they never wait for a batch being flushed. Request handlers call ahistory(),
+    which does the read on a worker thread instead of the event loop.
+    """
+
+    def __init__(self, path: str, cache: Optional[InMemorySessionStore] = None, ttl: float = 1800.0,
+                 flush_interval: float = 0.05, batch_size: int = 256):
+        self.path = path
+        self.cache = cache or InMemorySessionStore(ttl=ttl)
+        self.limit = self.cache.limit
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.origin = f"{os.getpid()}-{id(self):x}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commits are durable at checkpoints, no fsync per transaction
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL, ts REAL NOT NULL, origin TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id)")
+        self._conn.commit()
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._seen: Dict[str, int] = {}  # session -> highest row id merged into the cache
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._last_purge = time.time()
+        self.stats = {"queued": 0, "batches": 0, "rows_written": 0, "remote_rows": 0, "cold_loads": 0}
+
+    # ---------------- Write path ----------------
     def append(self, session_id: str, role: str, content: str) -> None:
-        hist = self._data[session_id]
-        hist.append({"role": role, "content": content})
-        if len(hist) > self.limit:
-            self._data[session_id] = hist[-self.limit :]
+        self.cache.append(session_id, role, content)
+        op = ("append", (session_id, role, content, time.time(), self.origin))
+        if self._queue is not None:
+            self._queue.put_nowait(op)
+            self.stats["queued"] += 1
+        else:
+            # No flusher running (scripts, tests): write through
+            self._write_batch([op])
+
+    def subscribe(self, listener: Callable[[str, str, str], None]) -> None:
+        self.cache.subscribe(listener)
+
+    def drop(self, session_id: str) -> None:
+        self.cache.drop(session_id)
+        self._seen.pop(session_id, None)
+        op = ("drop", session_id)
+        if self._queue is not None:
+            self._queue.put_nowait(op)
+        else:
+            self._write_batch([op])
+
+    def _write_batch(self, ops: List[Tuple[str, Any]]) -> None:
+        touched = set()
+        with self._lock:
+            with self._conn:
+                for kind, arg in ops:
+                    if kind == "append":
+                        self._conn.execute(
+                            "INSERT INTO messages (session_id, role, content, ts, origin) VALUES (?, ?, ?, ?, ?)", arg
+                        )
+                        touched.add(arg[0])
+                        self.stats["rows_written"] += 1
+                    else:
+                        self._conn.execute("DELETE FROM messages WHERE session_id = ?", (arg,))
+                        touched.discard(arg)
+                # Keep only the newest `limit` rows of every session written to
+                for sid in touched:
+                    self._conn.execute(
+                        "DELETE FROM messages WHERE session_id = ? AND id <= "
+                        "(SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                        (sid, sid, self.limit),
+                    )
+                if time.time() - self._last_purge > 60:
+                    self._conn.execute("DELETE FROM messages WHERE ts < ?", (time.time() - self.ttl,))
+                    self._last_purge = time.time()
+        self.stats["batches"] += 1
+
+    async def _flush_loop(self) -> None:
+        while True:
+            ops = [await self._queue.get()]
+            # Gather whatever else arrives within flush_interval into the same transaction
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(ops) < self.batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    ops.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await asyncio.to_thread(self._write_batch, ops)
+            except Exception as e:
+                log.error("Session write-behind failed for %d ops: %s", len(ops), e)
+
+    async def start(self) -> None:
+        if self._flusher is None:
+            self._queue = asyncio.Queue()
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._queue is not None:
+            pending = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._queue = None
+            if pending:
+                self._write_batch(pending)
+
+    # ---------------- Read path ----------------
+    def _rows(self, sql: str, params: tuple) -> List[tuple]:
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def history(self, session_id: str) -> List[Message]:
+        if session_id not in self.cache:
+            rows = self._rows(
+                "SELECT id, role, content, ts FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, self.limit),
+            )
+            if not rows:
+                return []
+            self.stats["cold_loads"] += 1
+            rows.reverse()
+            self.cache.replace(session_id, [Message(r, c, ts) for _, r, c, ts in rows])
+            if len(self._seen) > 2 * self.cache.max_sessions:
+                # Forget marks of sessions the cache has since evicted
+                self._seen = {sid: i for sid, i in self._seen.items() if sid in self.cache}
+            self._seen[session_id] = rows[-1][0]
+            return self.cache.history(session_id)
+
+        # Warm: only rows other workers wrote since we last looked
+        rows = self._rows(
+            "SELECT id, role, content, ts FROM messages WHERE session_id = ? AND id > ? AND origin != ? ORDER BY id",
+            (session_id, self._seen.get(session_id, 0), self.origin),
+        )
+        history = self.cache.history(session_id)
+        if rows:
+            self.stats["remote_rows"] += len(rows)
+            merged = sorted(history + [Message(r, c, ts) for _, r, c, ts in rows], key=lambda m: m.ts)
+            self.cache.replace(session_id, merged)
+            self._seen[session_id] = rows[-1][0]
+            history = self.cache.history(session_id)
+        return history
+
+    async def ahistory(self, session_id: str) -> List[Message]:
+        return await asyncio.to_thread(self.history, session_id)
+
+    def cached_history(self, session_id: str) -> List[Message]:
+        """This worker's copy of the history; never touches the database."""
+        return self.cache.history(session_id)
+
+    def snapshot(self) -> Dict[str, Any]:
+        pending = self._queue.qsize() if self._queue is not None else 0
+        return {**self.cache.snapshot(), **self.stats, "pending": pending, "backend": "sqlite"}
+
 
-    def history(self, session_id: str) -> List[dict]:
-        return self._data.get(session_id, [])
+def build_store():
+    cache = InMemorySessionStore(
+        limit=settings.SESSION_HISTORY_LIMIT,
+        ttl=settings.SESSION_TTL_SECONDS,
+        max_sessions=settings.SESSION_MAX_COUNT,
+        max_bytes=settings.SESSION_MAX_BYTES,
+    )
+    if settings.SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore(settings.SESSION_DB, cache=cache, ttl=settings.SESSION_TTL_SECONDS)
+    return cache
 
-store = InMemorySessionStore(limit=20)
+store = build_store()
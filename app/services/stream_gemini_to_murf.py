@@ -1,107 +1,215 @@
-import os
+import re
 import json
+import time
 import base64
-import websockets
+import asyncio
 import uuid
 import datetime
+from dataclasses import dataclass
 from pathlib import Path
-from dotenv import load_dotenv
-
-load_dotenv()
-
-MURF_API_KEY = os.environ.get("MURF_API_KEY", "")
-MURF_WS_URL = (
-    f"wss://api.murf.ai/v1/speech/stream-input"
-    f"?api-key={MURF_API_KEY}&sample_rate=44100&channel_type=MONO&format=MP3"
-)
-
-
-async def stream_gemini_to_murf(text: str, websocket=None, output_path: str = None) -> str:
-    """
-    Streams text to Murf AI via WebSocket and saves synthesized audio as MP3.
-    Returns the absolute path to the audio file.
-    """
-    if not MURF_API_KEY:
-        raise RuntimeError("MURF_API_KEY not set in environment")
-
-    audio_bytes = bytearray()
-
-    # Prepare output path
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from app.services.bulkhead import Bulkhead, BulkheadFull, murf_ws_bulkhead
+from app.services.murf_pool import MurfConnectionPool, murf_pool
+
+# Sentence ends always flush; clause marks only flush once enough text is buffered
+_SENTENCE_END = re.compile(r"[.!?](?:[\"')\]]*)\s+")
+_CLAUSE_END = re.compile(r"[,;:—](?:[\"')\]]*)\s+")
+
+
+@dataclass
+class TurnTimings:
+    """Per-turn latency marks (time.perf_counter seconds)."""
+    started: float = 0.0
+    first_text_sent: Optional[float] = None
+    first_audio: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def time_to_first_audio(self) -> Optional[float]:
+        if self.first_audio is None:
+            return None
+        return self.first_audio - self.started
+
+
+def split_ready(buffer: str, min_clause_chars: int = 60, max_chars: int = 240) -> tuple[list[str], str]:
+    """Split off every complete sentence (or long clause) in buffer, returning (pieces, remainder)."""
+    pieces = []
+    start = 0
+    for m in _SENTENCE_END.finditer(buffer):
+        piece = buffer[start:m.end()].strip()
+        if piece:
+            pieces.append(piece)
+        start = m.end()
+    rest = buffer[start:]
+    if len(rest) >= min_clause_chars:
+        last = None
+        for m in _CLAUSE_END.finditer(rest):
+            if m.end() >= min_clause_chars:
+                last = m
+        if last is not None:
+            pieces.append(rest[:last.end()].strip())
+            rest = rest[last.end():]
+    # Never hold back an unbounded run-on; cut at the last space instead
+    if len(rest) > max_chars:
+        cut = rest.rfind(" ", 0, max_chars)
+        cut = cut if cut > 0 else max_chars
+        pieces.append(rest[:cut].strip())
+        rest = rest[cut:].lstrip()
+    return pieces, rest
+
+
+async def iter_sentences(deltas: AsyncIterable[str], min_clause_chars: int = 60, max_chars: int = 240) -> AsyncIterator[str]:
+    """Re-chunk streamed LLM deltas into sentence/clause pieces suitable for TTS."""
+    buffer = ""
+    async for delta in deltas:
+        buffer += delta
+        pieces, buffer = split_ready(buffer, min_clause_chars, max_chars)
+        for piece in pieces:
+            yield piece
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+def _default_output_path() -> Path:
     base_dir = Path(__file__).resolve().parent.parent.parent
     receiver_dir = base_dir / "receiver_audio"
     receiver_dir.mkdir(exist_ok=True)
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     unique_id = str(uuid.uuid4())[:8]
-    if not output_path:
-        output_path = receiver_dir / f"output_{timestamp}_{unique_id}.mp3"
-    else:
-        output_path = Path(output_path)
+    return receiver_dir / f"output_{timestamp}_{unique_id}.mp3"
+
+
+async def stream_text_to_murf(
+    chunks: AsyncIterable[str],
+    websocket=None,
+    output_path: str = None,
+    timings: Optional[TurnTimings] = None,
+    pool: Optional[MurfConnectionPool] = None,
+    bulkhead: Optional[Bulkhead] = None,
+    idle_timeout: float = 10.0,
+) -> Optional[str]:
+    """
+    Feeds text pieces into a pooled Murf stream-input context as they arrive while
+    forwarding synthesized audio to the client, so the first sentence is being
+    spoken before the LLM has finished the reply. The turn ends on Murf's final
+    chunk after the last piece, or after `idle_timeout` seconds without audio
+    while Murf has text to speak.
+    Returns the absolute path to the saved MP3, or None when the Murf bulkhead
+    turned the turn away (the text still reaches the client, without audio).
+    """
+    pool = pool or murf_pool
+    bulkhead = bulkhead or murf_ws_bulkhead
+    if not pool.api_key:
+        async for _ in chunks:
+            pass
+        raise RuntimeError("MURF_API_KEY not set in environment")
 
+    timings = timings or TurnTimings()
+    timings.started = timings.started or time.perf_counter()
+    audio_bytes = bytearray()
+    output_path = Path(output_path) if output_path else _default_output_path()
     print(f"[MURF] Saving output to {output_path}")
 
-    try:
-        async with websockets.connect(MURF_WS_URL) as ws:
-            print("[MURF] ✅ Connected to Murf WebSocket")
-
-            # 1. Send voice config
-            voice_cfg = {
-                "voice_config": {
-                    "voiceId": "en-US-natalie",
-                    "style": "Neutral",
-                    "rate": 0,
-                    "pitch": 0,
-                    "variation": 1,
-                }
-            }
-            await ws.send(json.dumps(voice_cfg))
-            print("[MURF] Sent voice_config")
-
-            # 2. Send text
-            await ws.send(json.dumps({"text": text}))
-            print(f"[MURF] Sent text: {text}")
-
-            # 3. Send end signal
-            await ws.send(json.dumps({"end": True}))
-            print("[MURF] Sent end signal")
-
-            # 4. Collect audio chunks with max chunk count and timeout
-            import asyncio
-            max_chunks = 50
-            chunk_count = 0
-            timeout_seconds = 10
-            start_time = datetime.datetime.now()
-            while True:
-                try:
-                    raw_msg = await asyncio.wait_for(ws.recv(), timeout=timeout_seconds)
-                except asyncio.TimeoutError:
-                    print(f"[MURF] Timeout waiting for audio chunk after {timeout_seconds} seconds.")
-                    break
-                chunk_count += 1
-                try:
-                    msg = json.loads(raw_msg)
-                except Exception:
-                    print(f"[MURF] Non-JSON message: {raw_msg}")
+    # The idle clock only runs while Murf owes us audio, not while the LLM is still thinking
+    waiting_for_text = False
+    last_activity = time.perf_counter()
+
+    async def restart_playback():
+        # The turn is being re-voiced from its first piece on a new socket
+        if audio_bytes and websocket:
+            await websocket.send_text(json.dumps({"type": "audio_restart"}))
+        audio_bytes.clear()
+
+    async def receive_audio(ctx):
+        nonlocal last_activity
+        restarts = ctx.restarts
+        while True:
+            try:
+                msg = await ctx.recv(timeout=idle_timeout)
+            except asyncio.TimeoutError:
+                if waiting_for_text or time.perf_counter() - last_activity < idle_timeout:
                     continue
-
-                if "audio" in msg:
-                    base64_chunk = msg["audio"]
-                    audio_bytes.extend(base64.b64decode(base64_chunk))
-                    # Stream base64 chunk to client
-                    if websocket:
-                        await websocket.send_text(json.dumps({"type": "audio_chunk", "data": base64_chunk, "final": msg.get("final")}))
-                        print("[SERVER] Sent audio chunk to client")
-                if msg.get("final"):
-                    print("[MURF] ✅ Synthesis complete")
-                    break
-                if chunk_count >= max_chunks:
-                    print(f"[MURF] Max chunk count {max_chunks} reached, breaking loop.")
-                    break
-
+                print(f"[MURF] No audio for {idle_timeout} seconds, giving up on this turn.")
+                break
+            except ConnectionError:
+                print("[MURF] Socket dropped mid-turn, resuming on a fresh one")
+                await ctx.resume(ctx.conn)
+                last_activity = time.perf_counter()
+                continue
+            if ctx.restarts != restarts:
+                restarts = ctx.restarts
+                await restart_playback()
+            last_activity = time.perf_counter()
+            # Murf may mark a piece final mid-turn; the turn is over on the final after end
+            last = bool(msg.get("final")) and ctx.ended
+
+            if msg.get("audio"):
+                base64_chunk = msg["audio"]
+                if timings.first_audio is None:
+                    timings.first_audio = time.perf_counter()
+                    print(f"[MURF] First audio after {timings.time_to_first_audio * 1000:.0f} ms")
+                audio_bytes.extend(base64.b64decode(base64_chunk))
+                # Stream base64 chunk to client
+                if websocket:
+                    await websocket.send_text(json.dumps({"type": "audio_chunk", "data": base64_chunk, "final": last}))
+            if last:
+                print("[MURF] ✅ Synthesis complete")
+                break
+
+    source = chunks.__aiter__()
+    ctx = None
+    try:
+        async with bulkhead.slot():
+            # Warm socket from the pool: no handshake, voice_config already sent
+            ctx = await pool.open_context()
+
+            receiver = asyncio.create_task(receive_audio(ctx))
+            try:
+                # Send each piece as soon as the LLM completes it
+                while True:
+                    waiting_for_text = True
+                    try:
+                        piece = await source.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        waiting_for_text = False
+                    if timings.first_text_sent is None:
+                        timings.first_text_sent = time.perf_counter()
+                    await ctx.send_text(piece)
+                    last_activity = time.perf_counter()
+                    print(f"[MURF] Sent text: {piece}")
+
+                # Close this turn's context; the socket stays open for the next one
+                await ctx.end()
+                last_activity = time.perf_counter()
+                await receiver
+            finally:
+                if not receiver.done():
+                    receiver.cancel()
+
+    except BulkheadFull as e:
+        print(f"[MURF] Turn shed, replying without audio: {e}")
+        async for _ in source:
+            pass
+        return None
     except Exception as e:
+        # Keep draining the source so the text reply still reaches the client
+        async for _ in source:
+            pass
         raise RuntimeError(f"[MURF] WebSocket error: {e}")
+    finally:
+        if ctx is not None and not ctx.done:
+            # Receiver gave up before Murf's final chunk; drop the rest of this turn upstream
+            await ctx.clear()
+        timings.finished = time.perf_counter()
 
     # Save audio
-    print(f"[MURF] Attempting to write {len(audio_bytes)} bytes to {output_path}")
     try:
         with open(output_path, "wb") as f:
             f.write(audio_bytes)
@@ -111,3 +219,11 @@ async def stream_gemini_to_murf(text: str, websocket=None, output_path: str = No
         raise RuntimeError(f"[MURF] Failed to write audio file: {e}")
 
     return str(output_path.resolve())
+
+
+async def stream_gemini_to_murf(text: str, websocket=None, output_path: str = None) -> str:
+    """
+    Streams text to Murf AI via WebSocket and saves synthesized audio as MP3.
+    Returns the absolute path to the audio file.
+    """
+    return await stream_text_to_murf(_single(text), websocket, output_path)
@@ -1,33 +1,102 @@
+import asyncio
 import logging
-import requests
+from typing import AsyncIterator, Optional
+
+import aiofiles
+import httpx
+from starlette.exceptions import HTTPException
 from app.config import settings
+from app.services.bulkhead import Bulkhead, BulkheadFull, stt_bulkhead
 
 log = logging.getLogger(__name__)
 
+
+def next_poll_delay(attempt: int, audio_duration: Optional[float], min_delay: float = 0.5, max_delay: float = 5.0) -> float:
+    """
+    Adaptive poll schedule. Batch transcription takes a fraction of the audio
+    length, so once AssemblyAI reports audio_duration we wait ~10% of it between
+    polls; until then back off exponentially from min_delay.
+    """
+    if audio_duration:
+        delay = audio_duration * 0.1 * (1.25 ** attempt)
+    else:
+        delay = min_delay * (1.5 ** attempt)
+    return max(min_delay, min(max_delay, delay))
+
+
 class AssemblyAITranscriber:
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        max_concurrent_jobs: int = 4,
+        deadline: float = 120.0,
+        min_poll: float = 0.5,
+        max_poll: float = 5.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        bulkhead: Optional[Bulkhead] = None,
+    ):
         self.api_key = api_key
         self.base = "https://api.assemblyai.com/v2"
+        self.deadline = deadline
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self._transport = transport
+        # Shared by every request in the process so a burst can't exceed the upstream rate limit;
+        # beyond its queue, jobs are turned away at once instead of waiting out the deadline
+        self._jobs = bulkhead or Bulkhead("stt", max_concurrent_jobs, max_queue=4 * max_concurrent_jobs)
 
-    def transcribe_file(self, path: str) -> str | None:
+    async def atranscribe_file(self, path: str) -> str | None:
+        """Upload, create and poll the transcript without tying up the event loop."""
+        return await self._transcribe(self._iter_file(path))
+
+    async def atranscribe_stream(self, chunks: AsyncIterator[bytes]) -> str | None:
+        """Transcribe audio streamed straight from the request body, no temp file."""
+        return await self._transcribe(chunks)
+
+    async def _iter_file(self, path: str, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        async with aiofiles.open(path, "rb") as f:
+            while chunk := await f.read(chunk_size):
+                yield chunk
+
+    async def _transcribe(self, content: AsyncIterator[bytes]) -> str | None:
         try:
-            headers = {"authorization": self.api_key}
-            with open(path, "rb") as f:
-                up = requests.post(f"{self.base}/upload", headers=headers, data=f, timeout=60)
+            async with self._jobs.slot():
+                return await asyncio.wait_for(self._run_job(content), timeout=self.deadline)
+        except BulkheadFull as e:
+            log.warning("Transcription shed: %s", e)
+            return None
+        except HTTPException:
+            # Client errors raised by the upload stream (e.g. 413) belong to the caller
+            raise
+        except asyncio.TimeoutError:
+            log.error("AssemblyAI transcription exceeded %.0fs deadline", self.deadline)
+            return None
+        except Exception as e:
+            log.exception("Transcription error: %s", e)
+            return None
+
+    async def _run_job(self, content: AsyncIterator[bytes]) -> str | None:
+        headers = {"authorization": self.api_key}
+        async with httpx.AsyncClient(base_url=self.base, headers=headers, timeout=30, transport=self._transport) as client:
+            up = await client.post("/upload", content=content, timeout=60)
             up.raise_for_status()
             audio_url = up.json().get("upload_url")
             if not audio_url:
                 raise RuntimeError("No upload_url from AssemblyAI")
 
-            req = requests.post(f"{self.base}/transcript", headers=headers, json={"audio_url": audio_url}, timeout=30)
+            req = await client.post("/transcript", json={"audio_url": audio_url})
             req.raise_for_status()
             tid = req.json().get("id")
             if not tid:
                 raise RuntimeError("No transcript id from AssemblyAI")
 
-            # poll
+            # poll on an adaptive schedule; the deadline in _transcribe bounds the loop
+            attempt = 0
+            audio_duration = None
             while True:
-                poll = requests.get(f"{self.base}/transcript/{tid}", headers=headers, timeout=30)
+                await asyncio.sleep(next_poll_delay(attempt, audio_duration, self.min_poll, self.max_poll))
+                attempt += 1
+                poll = await client.get(f"/transcript/{tid}")
                 poll.raise_for_status()
                 js = poll.json()
                 status = js.get("status")
@@ -36,8 +105,11 @@ class AssemblyAITranscriber:
                 if status == "error":
                     log.error("AssemblyAI error: %s", js.get("error"))
                     return None
-        except Exception as e:
-            log.exception("Transcription error: %s", e)
-            return None
+                audio_duration = js.get("audio_duration") or audio_duration
 
-stt = AssemblyAITranscriber(settings.ASSEMBLYAI_API_KEY)
+stt = AssemblyAITranscriber(
+    settings.ASSEMBLYAI_API_KEY,
+    max_concurrent_jobs=settings.STT_MAX_CONCURRENT_JOBS,
+    deadline=settings.STT_DEADLINE_SECONDS,
+    bulkhead=stt_bulkhead,
+)
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+log = logging.getLogger(__name__)
+
+
+def tts_cache_key(text: str, voice: str, fmt: str, rate: int = 0, pitch: int = 0) -> str:
+    """Content address of a synthesis: identical text and voice settings share one file."""
+    normalized = " ".join((text or "").split())
+    raw = json.dumps([normalized, voice, fmt.upper(), rate, pitch], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Synthesized audio on disk, one file per content address, evicted least
+    recently used once the directory exceeds `max_bytes`. The LRU order is
+    rebuilt from file mtimes on start, so the cache survives restarts.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 100 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, oldest first
+        self.total_bytes = 0
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+        self._load()
+
+    def _load(self) -> None:
+        entries = []
+        for path in self.directory.iterdir():
+            if path.is_file() and not path.name.endswith(".tmp"):
+                st = path.stat()
+                entries.append((st.st_mtime, path.name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self.total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def filename(key: str, fmt: str) -> str:
+        return f"{key}.{fmt.lower()}"
+
+    def path(self, key: str, fmt: str) -> Optional[Path]:
+        """Path of a cached file, refreshing its recency; None on a miss."""
+        name = self.filename(key, fmt)
+        with self._lock:
+            if name not in self._files:
+                self.stats["misses"] += 1
+                return None
+            self._files.move_to_end(name)
+            self.stats["hits"] += 1
+        path = self.directory / name
+        try:
+            os.utime(path)
+        except OSError:
+            # Deleted behind our back: forget it
+            with self._lock:
+                self.total_bytes -= self._files.pop(name, 0)
+            return None
+        return path
+
+    def put(self, key: str, fmt: str, data: bytes) -> Path:
+        name = self.filename(key, fmt)
+        path = self.directory / name
+        tmp = path.with_name(f"{name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)  # readers never see a partial file
+        with self._lock:
+            self.total_bytes += len(data) - self._files.pop(name, 0)
+            self._files[name] = len(data)
+            self._evict()
+        return path
+
+    def _evict(self) -> None:
+        # Never evict the entry just written, even if it alone exceeds the budget
+        while self.total_bytes > self.max_bytes and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            self.total_bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                (self.directory / name).unlink()
+            except OSError as e:
+                log.debug("Could not remove evicted audio %s: %s", name, e)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "files": len(self._files), "bytes": self.total_bytes, "max_bytes": self.max_bytes}
@@ -1,23 +1,136 @@
+import asyncio
 import logging
+import threading
 import requests
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
 from app.config import settings
+from app.services.bulkhead import Bulkhead, BulkheadFull, tts_bulkhead
+from app.services.cache import SingleFlight
+from app.services.tts_cache import AudioCache, tts_cache_key
 
 log = logging.getLogger(__name__)
 
 class MurfTTS:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[AudioCache] = None, cache_url: str = "/static/tts_cache",
+                 bulkhead: Optional[Bulkhead] = None):
         self.api_key = api_key
+        self.bulkhead = bulkhead
         self.url = "https://api.murf.ai/v1/speech/generate"
+        self.cache = cache
+        self.cache_url = cache_url.rstrip("/")
+        self._http = requests.Session()
+        self._flight = SingleFlight()
+        self.stats = {"upstream": 0, "shed": 0}
 
-    def synth(self, text: str, voice_id: str = "en-US-natalie", fmt: str = "MP3") -> str | None:
+    def _synth_remote(self, text: str, voice_id: str, fmt: str, rate: int, pitch: int) -> str | None:
         try:
             headers = {"api-key": self.api_key, "Content-Type": "application/json"}
             payload = {"voiceId": voice_id, "text": text, "format": fmt}
-            res = requests.post(self.url, headers=headers, json=payload, timeout=60)
+            if rate:
+                payload["rate"] = rate
+            if pitch:
+                payload["pitch"] = pitch
+            self.stats["upstream"] += 1
+            res = self._http.post(self.url, headers=headers, json=payload, timeout=60)
             res.raise_for_status()
             return res.json().get("audioFile")
         except Exception as e:
             log.exception("Murf TTS error: %s", e)
             return None
 
-tts = MurfTTS(settings.MURF_API_KEY)
+    def _fill(self, key: str, text: str, voice_id: str, fmt: str, rate: int, pitch: int) -> Tuple[Optional[Path], Optional[str]]:
+        # A coalesced leader may have just stored it
+        path = self.cache.path(key, fmt)
+        if path:
+            return path, None
+        remote = self._synth_remote(text, voice_id, fmt, rate, pitch)
+        if not remote:
+            return None, None
+        try:
+            res = self._http.get(remote, timeout=30)
+            res.raise_for_status()
+            return self.cache.put(key, fmt, res.content), remote
+        except Exception as e:
+            # Still usable: hand out Murf's URL, just uncached
+            log.warning("Could not cache Murf audio: %s", e)
+            return None, remote
+
+    def _lookup(self, text: str, voice_id: str, fmt: str, rate: int, pitch: int) -> Tuple[Optional[Path], Optional[str]]:
+        key = tts_cache_key(text, voice_id, fmt, rate, pitch)
+        path = self.cache.path(key, fmt)
+        if path:
+            return path, None
+        # Identical concurrent requests share one synthesis
+        return self._flight.do(key, lambda: self._fill(key, text, voice_id, fmt, rate, pitch))
+
+    def synth(self, text: str, voice_id: str = "en-US-natalie", fmt: str = "MP3", rate: int = 0, pitch: int = 0) -> str | None:
+        """URL of the spoken text: a cached local file when possible, else Murf's hosted file."""
+        if self.cache is None:
+            return self._synth_remote(text, voice_id, fmt, rate, pitch)
+        path, remote = self._lookup(text, voice_id, fmt, rate, pitch)
+        if path:
+            return f"{self.cache_url}/{path.name}"
+        return remote
+
+    async def asynth(self, text: str, voice_id: str = "en-US-natalie", fmt: str = "MP3", rate: int = 0, pitch: int = 0) -> str | None:
+        """
+        synth() on the TTS bulkhead's threads. When the bulkhead is full the
+        pre-synthesized FALLBACK_TEXT clip is returned instead of waiting.
+        """
+        if self.bulkhead is None:
+            return await asyncio.to_thread(self.synth, text, voice_id, fmt, rate, pitch)
+        try:
+            return await self.bulkhead.run(self.synth, text, voice_id, fmt, rate, pitch)
+        except BulkheadFull as e:
+            log.warning("TTS request shed: %s", e)
+            self.stats["shed"] += 1
+            return self.cached_url(settings.FALLBACK_TEXT, voice_id, fmt)
+
+    def cached_url(self, text: str, voice_id: str = "en-US-natalie", fmt: str = "MP3", rate: int = 0, pitch: int = 0) -> str | None:
+        """Local URL if the clip is already cached; never calls Murf."""
+        if self.cache is None:
+            return None
+        path = self.cache.path(tts_cache_key(text, voice_id, fmt, rate, pitch), fmt)
+        return f"{self.cache_url}/{path.name}" if path else None
+
+    def cached_audio(self, text: str, voice_id: str = "en-US-natalie", fmt: str = "MP3", rate: int = 0, pitch: int = 0) -> bytes | None:
+        """Audio bytes if already cached; never calls Murf."""
+        if self.cache is None:
+            return None
+        path = self.cache.path(tts_cache_key(text, voice_id, fmt, rate, pitch), fmt)
+        try:
+            return path.read_bytes() if path else None
+        except OSError:
+            return None
+
+    def warm(self, texts: Iterable[str], voice_id: str = "en-US-natalie", fmt: str = "MP3",
+             stop: Optional[threading.Event] = None) -> int:
+        """
+        Synthesize fixed replies ahead of time; returns how many were newly cached.
+        Setting `stop` ends it after the clip in progress, e.g. on shutdown.
+        """
+        if self.cache is None or not self.api_key:
+            return 0
+        added = 0
+        for text in dict.fromkeys(t for t in texts if t and t.strip()):
+            if stop is not None and stop.is_set():
+                break
+            key = tts_cache_key(text, voice_id, fmt)
+            if self.cache.path(key, fmt):
+                continue
+            path, _ = self._flight.do(key, lambda: self._fill(key, text, voice_id, fmt, 0, 0))
+            added += path is not None
+        log.info("TTS warm-up cached %d new clips", added)
+        return added
+
+    def snapshot(self) -> dict:
+        cache = self.cache.snapshot() if self.cache is not None else {}
+        return {**cache, **self.stats, "coalesced": self._flight.stats["coalesced"]}
+
+tts = MurfTTS(
+    settings.MURF_API_KEY,
+    cache=AudioCache(settings.TTS_CACHE_DIR, settings.TTS_CACHE_MAX_BYTES) if settings.TTS_CACHE_DIR else None,
+    cache_url=settings.TTS_CACHE_URL,
+    bulkhead=tts_bulkhead,
+)
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import Awaitable, Dict, Optional
+
+log = logging.getLogger(__name__)
+
+# Aggregated over every connection, for /metrics
+stats: Dict[str, int] = {"turns": 0, "completed": 0, "cancelled": 0, "barge_ins": 0}
+
+
+def is_barge_in(transcript: str, min_words: int = 2) -> bool:
+    """A partial transcript substantial enough to count as the user talking over the reply."""
+    return len(transcript.split()) >= min_words
+
+
+class TurnRunner:
+    """
+    Runs a connection's reply turns as tasks, one at a time, so the receive
+    loop keeps reading transcripts while a reply is generated and spoken. A
+    turn still in flight is cancelled when the user barges in or a new turn
+    starts; cancel() waits until its cleanup (e.g. clearing the Murf context)
+    has finished.
+    """
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self, turn: Awaitable) -> asyncio.Task:
+        if self.active:
+            raise RuntimeError("cancel() the running turn before starting another")
+        stats["turns"] += 1
+        self.task = asyncio.ensure_future(turn)
+        self.task.add_done_callback(self._finished)
+        return self.task
+
+    @staticmethod
+    def _finished(task: asyncio.Task) -> None:
+        if task.cancelled():
+            stats["cancelled"] += 1
+            return
+        stats["completed"] += 1
+        if task.exception() is not None:
+            log.error("Turn failed: %s", task.exception())
+
+    async def cancel(self) -> bool:
+        """Cancel the running turn, if any; True when one was cancelled."""
+        if not self.active:
+            return False
+        task = self.task
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return task.cancelled()
@@ -0,0 +1,110 @@
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Union
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Aggregated over every connection, for /metrics
+stats: Dict[str, int] = {"frames_in": 0, "frames_sent": 0, "bytes_in": 0, "bytes_sent": 0, "speech_frames": 0, "keepalives": 0}
+
+
+def voiced_windows(pcm: np.ndarray, window: int, threshold_db: float = -45.0, zcr_max: float = 0.4) -> np.ndarray:
+    """
+    Per-window speech decision for 16-bit PCM: RMS energy above `threshold_db`
+    (dBFS) and a zero-crossing rate below `zcr_max`, which rejects broadband
+    hiss that is loud but not voice. A trailing partial window is analysed too.
+    """
+    n = len(pcm)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    pad = -n % window
+    if pad:
+        pcm = np.concatenate((pcm, np.zeros(pad, dtype=pcm.dtype)))
+    frames = pcm.reshape(-1, window).astype(np.float32)
+    # Padding must not dilute the last window's averages
+    lengths = np.full(len(frames), window, dtype=np.float32)
+    lengths[-1] -= pad
+    rms = np.sqrt(np.sum(frames * frames, axis=1) / lengths) / 32768.0
+    db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+    zcr = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1) / lengths
+    return (db > threshold_db) & (zcr < zcr_max)
+
+
+class VoiceGate:
+    """
+    Decides which mic frames are worth sending to STT. Speech passes, followed
+    by `hangover` seconds of whatever comes next so trailing consonants and the
+    pause that ends a turn still reach the endpointer. The `preroll` seconds
+    before speech are held back and sent once speech starts, so word onsets are
+    not clipped. Longer silence is dropped, except for one zero-filled frame
+    every `keepalive` seconds (0 drops it all) to keep the upstream session open.
+    """
+
+    def __init__(self, sample_rate: int = 16000, threshold_db: float = -45.0, zcr_max: float = 0.4,
+                 hangover: float = 1.5, preroll: float = 0.3, keepalive: float = 1.0, window: float = 0.02):
+        self.sample_rate = sample_rate
+        self.threshold_db = threshold_db
+        self.zcr_max = zcr_max
+        self.window = max(1, int(window * sample_rate))
+        self.hangover = int(hangover * sample_rate)
+        self.preroll = int(preroll * sample_rate)
+        self.keepalive = int(keepalive * sample_rate)
+        self._hang = 0  # samples of hangover left
+        self._silent = 0  # samples dropped since the last frame sent
+        self._held: Deque[BytesLike] = deque()
+        self._held_samples = 0
+
+    def is_speech(self, frame: BytesLike) -> bool:
+        view = memoryview(frame).cast("B")
+        if len(view) % 2:
+            return True  # not whole samples; don't guess
+        pcm = np.frombuffer(view, dtype="<i2")
+        return bool(voiced_windows(pcm, self.window, self.threshold_db, self.zcr_max).any())
+
+    def process(self, frame: BytesLike) -> List[BytesLike]:
+        """The frames to send upstream now, in order; usually [frame] or []."""
+        size = memoryview(frame).nbytes
+        samples = size // 2
+        stats["frames_in"] += 1
+        stats["bytes_in"] += size
+        if self.is_speech(frame):
+            stats["speech_frames"] += 1
+            out = list(self._held)
+            out.append(frame)
+            self._held.clear()
+            self._held_samples = 0
+            self._hang = self.hangover
+        elif self._hang > 0:
+            self._hang -= samples
+            out = [frame]
+        else:
+            out = self._hold(frame, samples)
+        if out:
+            self._silent = 0
+            stats["frames_sent"] += len(out)
+            stats["bytes_sent"] += sum(memoryview(f).nbytes for f in out)
+        return out
+
+    def _hold(self, frame: BytesLike, samples: int) -> List[BytesLike]:
+        # Silence: keep it as pre-roll in case speech follows, send only keep-alives
+        if self.preroll > 0:
+            self._held.append(frame)
+            self._held_samples += samples
+            while self._held and self._held_samples - memoryview(self._held[0]).nbytes // 2 >= self.preroll:
+                self._held_samples -= memoryview(self._held.popleft()).nbytes // 2
+        self._silent += samples
+        if self.keepalive and self._silent >= self.keepalive:
+            stats["keepalives"] += 1
+            return [bytes(memoryview(frame).nbytes)]
+        return []
+
+
+def snapshot() -> Dict[str, float]:
+    return {
+        **stats,
+        "bytes_saved_pct": round(100.0 * (1 - stats["bytes_sent"] / stats["bytes_in"]), 1) if stats["bytes_in"] else 0.0,
+    }
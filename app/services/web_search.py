@@ -5,11 +5,45 @@ from typing import List, Dict, Any, Optional
 import datetime
 import time
 import requests
-import xml.etree.ElementTree as ET
 import re
+from app.services.cache import SingleFlight, SQLiteCache, TTLCache
+from app.services.gazetteer import gazetteer
+from app.services.news_index import news_index
+from app.services.news_service import news_service
+from app.services.search_orchestrator import SearchOrchestrator, acceptable, run_sync
 
 log = logging.getLogger(__name__)
 
+# Per-intent freshness for cached search results (seconds)
+SEARCH_TTLS = {"weather": 600, "sports": 300, "news": 600, "default": 3600}
+_INTENT_WORDS = {
+    "weather": ("weather", "temperature", "forecast", "rain", "humidity"),
+    "sports": ("ipl", "fifa", "match", "league", "score", "cricket", "football"),
+    "news": ("news", "latest", "update", "updates", "headlines", "breaking", "developments"),
+}
+
+# Places and IP blocks rarely move; unresolvable places are retried daily
+PLACE_TTL = 30 * 24 * 3600
+IP_TTL = 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+
+def classify_search_intent(query: str) -> str:
+    words = set(re.findall(r"[a-z0-9]+", query.lower()))
+    for intent, vocab in _INTENT_WORDS.items():
+        if words.intersection(vocab):
+            return intent
+    return "default"
+
+def search_cache_key(query: str, location: Optional[Dict[str, Any]], freshness_days: Optional[int], max_results: int) -> str:
+    normalized = " ".join(re.findall(r"[a-z0-9]+", query.lower()))
+    loc = ""
+    if location:
+        if location.get("lat") is not None and location.get("lon") is not None:
+            loc = f"{location['lat']:.2f},{location['lon']:.2f}"
+        else:
+            loc = (location.get("city") or location.get("display_name") or "").lower()
+    return f"{normalized}|{loc}|{freshness_days}|{max_results}"
+
 def build_search_query(user_query: str, append_year: bool = False) -> str:
     current_year = str(datetime.datetime.now().year)
     query = user_query.replace("2024", current_year).replace("2023", current_year)
@@ -23,61 +57,101 @@ class WebSearchService:
         self.default_location = getattr(settings, "DEFAULT_LOCATION", None)
         self._http = requests.Session()
         self._http.headers.update({"User-Agent": "AiWebSearch/1.0 (+https://example.com)"})
+        disk = SQLiteCache(settings.SEARCH_CACHE_DB, table="search_cache") if settings.SEARCH_CACHE_DB else None
+        self.cache = TTLCache(
+            maxsize=settings.SEARCH_CACHE_SIZE,
+            default_ttl=SEARCH_TTLS["default"],
+            stale_ttl=settings.SEARCH_CACHE_STALE_SECONDS,
+            disk=disk,
+        )
+        loc_disk = SQLiteCache(settings.LOCATION_CACHE_DB, table="location_cache") if settings.LOCATION_CACHE_DB else None
+        self.location_cache = TTLCache(maxsize=settings.LOCATION_CACHE_SIZE, default_ttl=PLACE_TTL, disk=loc_disk)
+        self._location_flight = SingleFlight()
+        self.orchestrator = SearchOrchestrator(hedge_delay=settings.SEARCH_HEDGE_DELAY, deadline=settings.SEARCH_DEADLINE)
 
     def update_api_key(self, new_key):
         """Update the Tavily API key and re-initialize the client."""
         self.client = TavilyClient(api_key=new_key)
 
-    def resolve_location_from_ip(self) -> Optional[Dict[str, Any]]:
-        try:
-            resp = self._http.get("http://ip-api.com/json", timeout=4)
-            resp.raise_for_status()
-            j = resp.json()
-            if j.get("status") == "success":
-                return {
-                    "city": j.get("city"),
-                    "region": j.get("regionName"),
-                    "country": j.get("country"),
-                    "lat": float(j.get("lat")) if j.get("lat") is not None else None,
-                    "lon": float(j.get("lon")) if j.get("lon") is not None else None,
-                }
-        except Exception as e:
-            log.debug("IP geolocation failed: %s", e)
+    def _cached_location(self, key: str, loader, ttl: float) -> Optional[Dict[str, Any]]:
+        """
+        Location lookups go through an LRU (+ optional persistent) cache; misses
+        are coalesced. A loader that raises (timeout, 429, network error) is not
+        cached; only a real "no result" answer is cached as a negative entry.
+        """
+        cached = self.location_cache.get(key)
+        if cached is not None:
+            return cached or None
+
+        def load():
+            try:
+                result = loader()
+            except Exception as e:
+                log.debug("Location lookup failed for %s: %s", key, e)
+                return None
+            # {} marks a negative entry so unresolvable places don't hit the network again
+            self.location_cache.set(key, result or {}, ttl if result else NEGATIVE_TTL)
+            return result
+
+        return self._location_flight.do(key, load)
+
+    def resolve_location_from_ip(self, client_ip: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return self._cached_location(f"ip:{client_ip or 'self'}", lambda: self._lookup_ip(client_ip), IP_TTL)
+
+    def _lookup_ip(self, client_ip: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """None when ip-api has no location for the address; raises on transport errors."""
+        url = f"http://ip-api.com/json/{client_ip}" if client_ip else "http://ip-api.com/json"
+        resp = self._http.get(url, timeout=4)
+        resp.raise_for_status()
+        j = resp.json()
+        if j.get("status") == "success":
+            return {
+                "city": j.get("city"),
+                "region": j.get("regionName"),
+                "country": j.get("country"),
+                "lat": float(j.get("lat")) if j.get("lat") is not None else None,
+                "lon": float(j.get("lon")) if j.get("lon") is not None else None,
+            }
         return None
 
     def geocode_place(self, place: str) -> Optional[Dict[str, Any]]:
         if not place:
             return None
-        try:
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {"q": place, "format": "json", "limit": 1}
-            resp = self._http.get(url, params=params, timeout=5)
-            resp.raise_for_status()
-            data = resp.json()
-            if not data:
-                return None
-            first = data[0]
-            return {
-                "display_name": first.get("display_name"),
-                "city": first.get("display_name").split(",")[0] if first.get("display_name") else None,
-                "lat": float(first.get("lat")) if first.get("lat") else None,
-                "lon": float(first.get("lon")) if first.get("lon") else None,
-            }
-        except Exception as e:
-            log.debug("Geocode (nominatim) failed for '%s': %s", place, e)
+        # Known places resolve from the bundled gazetteer without a network round-trip
+        match = gazetteer.lookup(place) or gazetteer.lookup(place.split(",")[0])
+        if match:
+            return match.to_location()
+        key = "place:" + " ".join(place.lower().split())
+        return self._cached_location(key, lambda: self._geocode_uncached(place), PLACE_TTL)
+
+    def _geocode_uncached(self, place: str) -> Optional[Dict[str, Any]]:
+        """None when Nominatim knows no such place; raises on transport errors."""
+        url = "https://nominatim.openstreetmap.org/search"
+        params = {"q": place, "format": "json", "limit": 1}
+        resp = self._http.get(url, params=params, timeout=5)
+        resp.raise_for_status()
+        data = resp.json()
+        if not data:
             return None
-
-    def resolve_location(self, location: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        first = data[0]
+        return {
+            "display_name": first.get("display_name"),
+            "city": first.get("display_name").split(",")[0] if first.get("display_name") else None,
+            "lat": float(first.get("lat")) if first.get("lat") else None,
+            "lon": float(first.get("lon")) if first.get("lon") else None,
+        }
+
+    def resolve_location(self, location: Optional[str] = None, client_ip: Optional[str] = None) -> Optional[Dict[str, Any]]:
         if not location:
             if self.default_location:
                 loc = self.geocode_place(self.default_location)
                 if loc:
                     return loc
-            return self.resolve_location_from_ip()
+            return self.resolve_location_from_ip(client_ip)
 
         loc = location.strip().lower()
         if loc in ("my location", "here", "current location"):
-            return self.resolve_location_from_ip()
+            return self.resolve_location_from_ip(client_ip)
 
         if "," in loc:
             parts = [p.strip() for p in loc.split(",")]
@@ -92,16 +166,23 @@ class WebSearchService:
         return self.geocode_place(location)
 
     # ---------------- Core Tavily search ----------------
-    def search_web(self, query: str, max_results: int = 3, freshness_days: Optional[int] = None, location: Optional[str | Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    def search_web(self, query: str, max_results: int = 3, freshness_days: Optional[int] = None, location: Optional[str | Dict[str, Any]] = None, attempts: int = 3) -> List[Dict[str, Any]]:
         resolved_loc = location if isinstance(location, dict) else self.resolve_location(location)
-
+        key = search_cache_key(query, resolved_loc, freshness_days, max_results)
+        return self.cache.get_or_load(
+            key,
+            lambda: self._search_uncached(query, max_results, freshness_days, resolved_loc, attempts),
+            ttl=SEARCH_TTLS[classify_search_intent(query)],
+            cacheable=lambda results: bool(results) and results[0].get("title") != "Search Error",
+        )
+
+    def _search_uncached(self, query: str, max_results: int, freshness_days: Optional[int], resolved_loc: Optional[Dict[str, Any]], attempts: int = 3) -> List[Dict[str, Any]]:
         if resolved_loc:
             city = resolved_loc.get("city") or resolved_loc.get("display_name")
             if city and city.lower() not in query.lower():
                 query = f"{query} {city}"
         query = build_search_query(query, append_year=False)
 
-        attempts = 3
         backoff = 1.0
         last_exc = None
         for attempt in range(1, attempts + 1):
@@ -146,8 +227,9 @@ class WebSearchService:
             except Exception as e:
                 last_exc = e
                 log.warning("Web search attempt %d failed: %s", attempt, e)
-                time.sleep(backoff)
-                backoff *= 2
+                if attempt < attempts:
+                    time.sleep(backoff)
+                    backoff *= 2
 
         log.exception("Web search error after retries: %s", last_exc)
         return [{
@@ -156,63 +238,42 @@ class WebSearchService:
             "content": f"I encountered an error while searching: {str(last_exc)}"
         }]
 
-    # ---------------- News fallbacks (API -> RSS) ----------------
-    def get_news_fallback(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        newsapi_key = getattr(settings, "NEWS_API_KEY", None) or getattr(settings, "NEWSAPI_KEY", None)
-        if newsapi_key:
-            try:
-                url = "https://newsapi.org/v2/everything"
-                params = {"q": query, "pageSize": max_results, "sortBy": "publishedAt", "apiKey": newsapi_key}
-                resp = self._http.get(url, params=params, timeout=6)
-                resp.raise_for_status()
-                j = resp.json()
-                for a in j.get("articles", [])[:max_results]:
-                    results.append({
-                        "title": a.get("title") or "No title",
-                        "url": a.get("url") or "",
-                        "content": (a.get("description") or a.get("content") or "").strip()
-                    })
-                if results:
-                    log.debug("NewsAPI returned %d articles for query=%s", len(results), query)
-                    return results
-            except Exception as e:
-                log.debug("NewsAPI fallback failed: %s", e)
-
-        # Google News RSS fallback
-        try:
-            rss_url = "https://news.google.com/rss/search"
-            params = {"q": query}
-            resp = self._http.get(rss_url, params=params, timeout=6)
-            resp.raise_for_status()
-            root = ET.fromstring(resp.content)
-            items = root.findall(".//item")[:max_results]
-            for it in items:
-                title = it.findtext("title") or "No title"
-                link = it.findtext("link") or ""
-                desc = it.findtext("description") or ""
-                results.append({"title": title, "url": link, "content": desc})
-            log.debug("Google News RSS returned %d items for query=%s", len(results), query)
-            return results
-        except Exception as e:
-            log.debug("Google News RSS fallback failed: %s", e)
-            return results
-
-    # ---------------- Combined fallback pipeline ----------------
-    def search_with_fallback(self, query: str, max_results: int = 3, freshness_days: Optional[int] = None, location: Optional[str | Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        results = self.search_web(query, max_results=max_results, freshness_days=freshness_days, location=location)
-        if results and results[0].get("title") == "Direct Answer":
-            return results
+    # ---------------- News (NewsAPI + RSS, merged) ----------------
+    def _news_search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        return news_service.get_latest_news(query, max_results=max_results)
 
-        q = query.lower()
-        if "news" in q or "latest" in q:
-            news = self.get_news_fallback(query, max_results=max_results)
-            if news:
-                return news
-        return results
+    def get_news_fallback(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        return self._news_search(query, max_results)
+
+    # ---------------- Combined fallback pipeline (hedged) ----------------
+    def _tavily_provider(self, freshness_days: Optional[int], location: Optional[str | Dict[str, Any]]):
+        # One attempt only: the orchestrator hedges to other providers instead of sleeping on retries
+        return ("tavily", lambda q, n: self.search_web(q, max_results=n, freshness_days=freshness_days, location=location, attempts=1))
+
+    async def asearch_with_fallback(self, query: str, max_results: int = 3, freshness_days: Optional[int] = None, location: Optional[str | Dict[str, Any]] = None, prefer_news: Optional[bool] = None) -> List[Dict[str, Any]]:
+        if prefer_news is None:
+            q = query.lower()
+            prefer_news = "news" in q or "latest" in q
+        tavily = self._tavily_provider(freshness_days, location)
+        if not prefer_news:
+            return await self.orchestrator.search(query, [tavily], max_results)
+        # Headlines already ingested by the RSS poller answer without any upstream call
+        indexed = news_index.search(query, max_results=max_results)
+        if indexed:
+            return indexed
+
+        # A Tavily direct answer still wins; plain Tavily hits only if no news provider delivers
+        def accept(name, results):
+            return acceptable(name, results) and (name != "tavily" or results[0].get("title") == "Direct Answer")
+
+        providers = [tavily, ("news", self._news_search)]
+        return await self.orchestrator.search(query, providers, max_results, accept=accept)
+
+    def search_with_fallback(self, query: str, max_results: int = 3, freshness_days: Optional[int] = None, location: Optional[str | Dict[str, Any]] = None, prefer_news: Optional[bool] = None) -> List[Dict[str, Any]]:
+        return run_sync(self.asearch_with_fallback(query, max_results, freshness_days, location, prefer_news))
 
     # ---------------- High-level news entry ----------------
-    def get_latest_news(self, region: Optional[str] = None, max_results: int = 5, freshness_days: Optional[int] = 7, location: Optional[str | Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    async def aget_latest_news(self, region: Optional[str] = None, max_results: int = 5, freshness_days: Optional[int] = 7, location: Optional[str | Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         query = ""
         if region:
             query = f"{region} news" if not region.lower().strip().endswith("news") else region
@@ -227,13 +288,18 @@ class WebSearchService:
         time_tokens = ["latest", "today", "breaking", "now", "just now", "recent", "updates", "update", "headline", "headlines"]
         prefer_api = any(tok in normalized for tok in time_tokens)
 
+        indexed = news_index.search(query, location=region, max_results=max_results)
+        if indexed:
+            return indexed
+
         if prefer_api:
-            news = self.get_news_fallback(query, max_results=max_results)
-            if news:
-                return news
-            return self.search_with_fallback(query, max_results=max_results, freshness_days=freshness_days, location=location)
+            providers = [("news", self._news_search), self._tavily_provider(freshness_days, location)]
+            return await self.orchestrator.search(query, providers, max_results)
 
-        return self.search_with_fallback(query, max_results=max_results, freshness_days=freshness_days, location=location)
+        return await self.asearch_with_fallback(query, max_results=max_results, freshness_days=freshness_days, location=location, prefer_news=True)
+
+    def get_latest_news(self, region: Optional[str] = None, max_results: int = 5, freshness_days: Optional[int] = 7, location: Optional[str | Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return run_sync(self.aget_latest_news(region, max_results, freshness_days, location))
 
     # ---------------- Formatting / helpers ----------------
     def humanize_results(self, results: List[Dict[str, Any]], max_chars: int = 800) -> str:
@@ -260,51 +326,16 @@ class WebSearchService:
 
     # ---------------- Intent handler ----------------
     def handle_special_queries(self, user_query: str) -> Optional[str]:
-        normalized = (user_query or "").strip().lower()
-        if not normalized:
-            return None
-
-        # News intent
-        if "news" in normalized:
-            m = re.search(r"(?:news of|news in|news from|latest news of|latest news in)\s+(.+)$", normalized)
-            if m:
-                place = m.group(1).strip()
-                results = self.get_latest_news(region=place, max_results=5, freshness_days=7, location=place)
-                return self.humanize_results(results)
-            results = self.get_latest_news(region=None, max_results=5, freshness_days=7, location=None)
-            return self.humanize_results(results)
-
-        # Location intent
-        if normalized in ["where am i", "where am i?", "what is my location", "my location"]:
-            loc = self.resolve_location_from_ip()
-            if not loc:
-                return "Sorry — I couldn't determine your location."
-            parts = []
-            if loc.get("city"):
-                parts.append(loc["city"])
-            if loc.get("region"):
-                parts.append(loc["region"])
-            if loc.get("country"):
-                parts.append(loc["country"])
-            coords = ""
-            if loc.get("lat") is not None and loc.get("lon") is not None:
-                coords = f" (lat: {loc['lat']:.4f}, lon: {loc['lon']:.4f})"
-            return f"You appear to be in {', '.join(parts)}{coords}."
-
-        # Domain-specific examples
-        if "ipl" in normalized and "2025" in normalized and "winner" in normalized:
-            results = self.search_web("IPL 2025 winner", max_results=3, freshness_days=60)
-            if results and "winner" in (results[0].get("content") or "").lower():
-                return f"The winner of IPL 2025 is: {results[0]['content']}"
-            return "The IPL 2025 winner information is not conclusive or not available online yet."
-
-        if "ipl" in normalized and "2025" in normalized and ("owner" in normalized or "ownership" in normalized or "own" in normalized):
-            results = self.search_web("IPL 2025 owner", max_results=3, freshness_days=60)
-            if results and ("owner" in (results[0].get("content") or "").lower() or "ownership" in (results[0].get("content") or "").lower()):
-                return f"The owner information I found: {results[0]['content']}"
-            return "The IPL 2025 ownership information is not available or clear online."
-
-        return None
+        # Routing lives in the shared intent engine; the lookup handlers are registered by llm_gemini
+        from app.services.llm_gemini import handle_special_queries
+        return handle_special_queries(user_query)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "search_cache": self.cache.snapshot(),
+            "location_cache": {**self.location_cache.snapshot(), "coalesced": self._location_flight.stats["coalesced"]},
+            "orchestrator": self.orchestrator.snapshot(),
+        }
 
 
 # Global instance and module wrapper
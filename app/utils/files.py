@@ -1,10 +1,28 @@
-import uuid
-import aiofiles
-from fastapi import UploadFile
-
-async def save_temp_upload(file: UploadFile) -> str:
-    temp_path = f"temp_{uuid.uuid4()}.webm"
-    async with aiofiles.open(temp_path, "wb") as f:
-        content = await file.read()
-        await f.write(content)
-    return temp_path
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, UploadFile
+from app.config import settings
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=413, detail=f"Audio upload exceeds {max_bytes} bytes")
+
+
+def ensure_upload_size(file: UploadFile, max_bytes: Optional[int] = None) -> None:
+    """Reject before any upstream call when the upload's size is already known."""
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+
+async def iter_upload(file: UploadFile, max_bytes: Optional[int] = None, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Yield an upload in bounded chunks so it can be streamed on without a full in-memory copy."""
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    ensure_upload_size(file, max_bytes)
+    total = 0
+    while chunk := await file.read(chunk_size):
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        yield chunk
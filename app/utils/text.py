@@ -0,0 +1,14 @@
+import re
+from typing import AbstractSet, List
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Function words that carry no topic in any query
+STOPWORDS = frozenset({
+    "a", "an", "the", "in", "of", "on", "for", "from", "to", "and", "at", "about", "is", "are", "what", "whats", "me",
+})
+
+
+def terms(text: str, stopwords: AbstractSet[str] = STOPWORDS) -> List[str]:
+    """Lowercased word terms of text, in order, without stopwords."""
+    return [w for w in _WORD.findall((text or "").lower()) if w not in stopwords]
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: upstream messages/sec and ingress CPU for many concurrent sessions, with and without frame coalescing
+Run: python benchmarks/bench_coalesce.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+
+from websockets.frames import Frame, Opcode
+
+from app.services.audio_ingress import AudioForwarder, FrameCoalescer
+
+RATE = 16000
+AUDIO_SECONDS = 10
+
+
+def chunks(seed):
+    """Irregular worklet-sized chunks (128-1024 samples of Int16) covering AUDIO_SECONDS."""
+    rng = random.Random(seed)
+    out, total = [], 0
+    while total < AUDIO_SECONDS * RATE:
+        n = rng.choice((128, 128, 256, 384, 512, 1024))
+        out.append(bytes(n * 2))
+        total += n
+    return out
+
+
+async def session(seed, frame_ms, counts):
+    async def send(data):
+        # What the websockets client does per message: build and mask a frame, then yield to the loop
+        Frame(Opcode.BINARY, bytes(data)).serialize(mask=True, extensions=[])
+        counts[0] += 1
+        await asyncio.sleep(0)
+
+    coalescer = FrameCoalescer(frame_ms * RATE // 1000 * 2) if frame_ms else None
+    forwarder = AudioForwarder(send, coalescer=coalescer)
+    for chunk in chunks(seed):
+        await forwarder.forward(chunk)
+        counts[1] += 1
+    forwarder.close()
+
+
+def bench(sessions, frame_ms):
+    counts = [0, 0]  # sent, received
+
+    async def run():
+        await asyncio.gather(*(session(i, frame_ms, counts) for i in range(sessions)))
+
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    asyncio.run(run())
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    audio = sessions * AUDIO_SECONDS
+    # Rates are per second of realtime audio across all sessions
+    return counts[1] / AUDIO_SECONDS, counts[0] / AUDIO_SECONDS, 100 * cpu / AUDIO_SECONDS, wall / audio * 1e3
+
+
+def main():
+    print(f"{'sessions':>8} {'frame':>7} {'msgs in/s':>10} {'msgs out/s':>11} {'core % at realtime':>19} {'ms wall per audio s':>20}")
+    for sessions in (100, 300, 1000):
+        for frame_ms in (0, 50, 100):
+            inp, out, core, wall = bench(sessions, frame_ms)
+            label = f"{frame_ms} ms" if frame_ms else "as-is"
+            print(f"{sessions:>8} {label:>7} {inp:>10.0f} {out:>11.0f} {core:>18.1f}% {wall:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
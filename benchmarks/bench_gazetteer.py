@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-query cost of offline location extraction from transcripts
+Run: python benchmarks/bench_gazetteer.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.gazetteer import Gazetteer
+
+TRANSCRIPTS = [
+    "what is the latest news from punjab",
+    "tell me the weather in new delhi today",
+    "any updates on the match in mumbai tonight",
+    "how are you doing today",
+    "what's happening in the world right now",
+    "latest news of india especially pune and bengaluru",
+    "explain photosynthesis to me like i am five years old please",
+    "is it going to rain in san francisco this weekend or should i go to los angeles",
+]
+
+
+def main(rounds: int = 20000):
+    t0 = time.perf_counter()
+    gaz = Gazetteer.load()
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    n = 0
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for text in TRANSCRIPTS:
+            gaz.find(text)
+            n += 1
+    elapsed = time.perf_counter() - t0
+
+    print(f"entries: {len(gaz)}  load: {load_ms:.2f} ms")
+    print(f"queries: {n}  per query: {elapsed / n * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
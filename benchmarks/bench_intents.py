@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: intent routing per utterance, compiled engine vs the old substring chains
+Run: python benchmarks/bench_intents.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+
+import app.services.llm_gemini  # noqa: F401  registers the lookup handlers
+import app.services.personas  # noqa: F401  registers the chat handlers
+from app.services.intents import IntentEngine, intents
+
+TRANSCRIPTS = [
+    "what is the latest news from punjab",
+    "tell me the weather in new delhi today",
+    "hello",
+    "who won the ipl match yesterday",
+    "explain photosynthesis to me like i am five years old please",
+    "i know you can help me with my homework on fractions",
+    "what is the price of bitcoin right now",
+    "thanks, that was helpful",
+]
+
+CHAT = [
+    (lambda q: q in ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"]),
+    (lambda q: q in ["bye", "goodbye", "see you", "good night"]),
+    (lambda q: any(w in q for w in ["who are you", "what are you", "your name"])),
+    (lambda q: any(w in q for w in ["thank you", "thanks", "good job", "well done"])),
+    (lambda q: any(w in q for w in ["stupid", "idiot", "hate you", "shut up"])),
+    (lambda q: "joke" in q),
+    (lambda q: any(w in q for w in ["predict the future", "personal opinion", "confidential"])),
+]
+LOOKUP = [
+    (lambda q: any(w in q for w in ["time", "now"])),
+    (lambda q: any(w in q for w in ["date", "today"])),
+    (lambda q: "ipl" in q or "fifa" in q or "match" in q or "league" in q),
+    (lambda q: "bitcoin" in q or "btc" in q or "ethereum" in q or "eth" in q),
+    (lambda q: "weather" in q or "temperature" in q or "forecast" in q),
+    (lambda q: any(w in q for w in ["news", "update", "latest", "developments"])),
+]
+
+
+def legacy(text: str):
+    for rule in CHAT:
+        if rule(text.lower()):
+            return True
+    q = text.lower()
+    for rule in LOOKUP:
+        if rule(q):
+            return True
+    return None
+
+
+def engine(text: str):
+    return intents.route(text, group="chat", history=[]) or intents.route(text, group="lookup")
+
+
+def run(fn, rounds: int) -> float:
+    n = 0
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for text in TRANSCRIPTS:
+            fn(text)
+            n += 1
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def scaled(extra: int):
+    """Both routers with `extra` more keyword phrases, as the intent list grows."""
+    words = [f"topic{i}" for i in range(extra)]
+    rules = LOOKUP + [(lambda q, w=w: w in q) for w in words]
+
+    def legacy_scaled(text: str):
+        q = text.lower()
+        return any(rule(q) for rule in rules)
+
+    eng = IntentEngine()
+    for name, phrases in intents._phrases.items():
+        eng.add_intent(name, phrases, whole=name in intents._whole)
+    for w in words:
+        eng.add_intent(w, [w])
+    return legacy_scaled, eng._detect
+
+
+def main(rounds: int = 20000):
+    t0 = time.perf_counter()
+    intents.compile()
+    print(f"compile: {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+    print(f"legacy substring chains: {run(legacy, rounds):.2f} us/utterance")
+    # Each utterance is new text, as in production: bypass the detect() memo
+    print(f"engine single pass (uncached): {run(intents._detect, rounds):.2f} us/utterance")
+    print(f"engine route chat+lookup (memoized detect): {run(engine, rounds):.2f} us/utterance")
+
+    for extra in (100, 500):
+        legacy_scaled, detect_scaled = scaled(extra)
+        print(f"+{extra} phrases  legacy: {run(legacy_scaled, rounds // 4):.2f} us  engine: {run(detect_scaled, rounds // 4):.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark: BM25 memory update and query cost vs history length, and the prompt it saves
+Run: python benchmarks/bench_memory.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+
+from app.services.memory_index import SessionMemory
+
+# Synthetic vocabulary with a Zipf-like frequency curve, like real conversation
+VOCAB = [f"w{i}" for i in range(5000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCAB))]
+
+
+def turn(rng):
+    return " ".join(rng.choices(VOCAB, WEIGHTS, k=rng.randint(6, 20)))
+
+
+def bench(length, queries=500, k=3):
+    rng = random.Random(length)
+    turns = [turn(rng) for _ in range(length)]
+    mem = SessionMemory(max_turns=length)
+    t0 = time.perf_counter()
+    for i, text in enumerate(turns):
+        mem.add("user" if i % 2 == 0 else "assistant", text)
+    add_us = (time.perf_counter() - t0) / length * 1e6
+
+    qs = [turn(rng) for _ in range(queries)]
+    t0 = time.perf_counter()
+    for q in qs:
+        hits = mem.search(q, k=k)
+    query_us = (time.perf_counter() - t0) / queries * 1e6
+
+    full_chars = sum(len(t) + 12 for t in turns)
+    recall_chars = sum(len(t) + 12 for _, _, t in hits)
+    return add_us, query_us, full_chars, recall_chars
+
+
+def main():
+    print(f"{'turns':>7} {'add µs':>8} {'query µs':>9} {'full history chars':>19} {'top-3 chars':>12}")
+    for length in (100, 1000, 5000, 20000):
+        add_us, query_us, full_chars, recall_chars = bench(length)
+        print(f"{length:>7} {add_us:>8.1f} {query_us:>9.1f} {full_chars:>19} {recall_chars:>12}")
+
+
+if __name__ == "__main__":
+    main()
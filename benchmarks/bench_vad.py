@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark: VAD gate throughput (frames/sec on one core) and upstream bytes saved
+Run: python benchmarks/bench_vad.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+
+from app.services.vad import VoiceGate
+
+RATE = 16000
+FRAME = 800  # what static/script.js sends: 50 ms of Int16
+
+
+def conversation(seconds, talk_ratio, seed=0):
+    """Alternating speech-like bursts (harmonics, syllable envelope) and room noise at ~-60 dBFS."""
+    rng = np.random.default_rng(seed)
+    out = []
+    total = 0
+    while total < seconds * RATE:
+        talk = rng.uniform(1.0, 4.0)
+        pause = talk * (1 - talk_ratio) / talk_ratio * rng.uniform(0.5, 1.5)
+        t = np.arange(int(talk * RATE)) / RATE
+        f0 = rng.uniform(100, 220)
+        voice = sum(np.sin(2 * np.pi * f0 * h * t) / h for h in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+        out.append(voice * envelope * 6000)
+        out.append(rng.normal(0, 30, int(pause * RATE)))
+        total += len(out[-2]) + len(out[-1])
+    pcm = np.clip(np.concatenate(out), -32768, 32767).astype("<i2")
+    usable = len(pcm) - len(pcm) % FRAME
+    return [pcm[i:i + FRAME].tobytes() for i in range(0, usable, FRAME)]
+
+
+def bench(talk_ratio, seconds=600):
+    frames = conversation(seconds, talk_ratio)
+    gate = VoiceGate(RATE)
+    sent = 0
+    t0 = time.perf_counter()
+    for frame in frames:
+        for out in gate.process(frame):
+            sent += len(out)
+    elapsed = time.perf_counter() - t0
+    total = len(frames) * FRAME * 2
+    return len(frames) / elapsed, elapsed / len(frames) * 1e6, 100 * (1 - sent / total)
+
+
+def main():
+    print(f"{'talk %':>7} {'frames/s':>10} {'us/frame':>9} {'realtime x':>11} {'bytes saved':>12}")
+    for ratio in (0.2, 0.4, 0.6, 0.8):
+        fps, us, saved = bench(ratio)
+        print(f"{ratio * 100:>6.0f}% {fps:>10.0f} {us:>9.1f} {fps * FRAME / RATE:>10.0f}x {saved:>11.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# app.services.web_search builds a Tavily client at import time, which needs a key
+os.environ.setdefault("TAVILY_API_KEY", "test")
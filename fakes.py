@@ -0,0 +1,140 @@
+"""
+Fakes shared by the offline tests: Gemini models and chats, requests-style
+HTTP sessions and the browser-facing websocket
+"""
+import asyncio
+import json
+import time
+
+from app.services import llm_gemini
+from app.services.chat_pool import ChatPool
+from app.services.llm_gemini import GeminiLLM
+from app.services.prompt_builder import PromptBuilder
+
+PROMPTS = PromptBuilder({"Default": "You are Echo.", "Pirate": "You are a pirate."}, history_budget=100,
+                        counter=lambda text: len(text.split()))
+
+
+# ---------------- Gemini ----------------
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStream:
+    def __init__(self, tokens, delay=0.0):
+        self.tokens = tokens
+        self.delay = delay
+
+    async def __aiter__(self):
+        for token in self.tokens:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield FakeChunk(token)
+
+
+class FakeChat:
+    def __init__(self, model):
+        self.model = model
+        self.history = []
+        self.sent = []
+
+    async def send_message_async(self, content, stream=False):
+        self.sent.append((content, [h["parts"][0] for h in self.history]))
+        # Like the SDK: record the exchange once the reply has streamed
+        self.history = self.history + [{"role": "user", "parts": [content]},
+                                       {"role": "model", "parts": ["".join(self.model.reply)]}]
+        return FakeStream(self.model.reply, self.model.delay)
+
+
+class FakeModel:
+    """GenerativeModel stand-in: one-shot prompts and pooled chats both stream `reply`."""
+
+    def __init__(self, reply, instruction=None, delay=0.0):
+        self.reply = list(reply)
+        self.instruction = instruction
+        self.delay = delay
+        self.prompts = []
+        self.chats = []
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        self.prompts.append(prompt)
+        return FakeStream(self.reply, self.delay)
+
+    def start_chat(self, history=()):
+        chat = FakeChat(self)
+        self.chats.append(chat)
+        return chat
+
+
+def make_chat_llm(monkeypatch, reply=("Sure", " thing.")):
+    """GeminiLLM whose chat pool builds one FakeModel per system instruction, returned alongside."""
+    monkeypatch.setattr(llm_gemini, "handle_special_queries", lambda q: None)
+    llm = GeminiLLM("test-key")
+    models = {}
+    llm.chats = ChatPool(lambda instruction: models.setdefault(instruction, FakeModel(reply, instruction)))
+    return llm, models
+
+
+# ---------------- HTTP ----------------
+class FakeResponse:
+    def __init__(self, payload=None, status=200, content=b"", headers=None):
+        self.payload = payload
+        self.status_code = status
+        self.content = content
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self.payload
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+class FakeHttp:
+    """requests.Session stand-in: records each call as (method, url, kwargs) and answers with respond()."""
+
+    def __init__(self, respond, delay=0.0):
+        self.respond = respond  # (method, url, **kwargs) -> FakeResponse
+        self.delay = delay
+        self.calls = []
+
+    def _call(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        if self.delay:
+            time.sleep(self.delay)
+        return self.respond(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self._call("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._call("POST", url, **kwargs)
+
+
+# ---------------- Client websocket ----------------
+class FakeClient:
+    """Stands in for the browser-facing FastAPI websocket."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text):
+        self.messages.append(json.loads(text))
+
+
+async def fake_llm(tokens, delay):
+    for token in tokens:
+        await asyncio.sleep(delay)
+        yield token
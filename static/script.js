@@ -191,8 +191,21 @@ async function startRecording() {
         stopRecording();
       } else if (msg.type === "session_start") {
         statusDiv.textContent = "🟢 Session started.";
+      } else if (msg.type === "ai_text_delta") {
+        // Grow the in-progress reply bubble as tokens stream in
+        removeBubbleById("thinking");
+        const streaming = transcriptionsDiv.querySelector(
+          "[data-bubble-id='streaming']"
+        );
+        if (streaming) {
+          streaming.textContent += msg.text;
+          transcriptionsDiv.scrollTop = transcriptionsDiv.scrollHeight;
+        } else {
+          addChatBubble(msg.text, false, "streaming");
+        }
       } else if (msg.type === "ai_text") {
         removeBubbleById("thinking");
+        removeBubbleById("streaming");
         addChatBubble(msg.text, false);
       } else if (msg.type === "audio_chunk") {
         console.log(
@@ -204,6 +217,21 @@ async function startRecording() {
       } else if (msg.type === "audio_start") {
         console.log("Audio playback started");
         initializeAudioPlayback();
+      } else if (msg.type === "audio_restart") {
+        // Speech lost its Murf socket and is being re-voiced from the start
+        initializeAudioPlayback();
+      } else if (msg.type === "playback_flush") {
+        // User barged in: stop speaking and drop queued chunks of the old reply
+        console.log("Playback flushed (barge-in)");
+        initializeAudioPlayback();
+        removeBubbleById("thinking");
+        const streaming = transcriptionsDiv.querySelector(
+          "[data-bubble-id='streaming']"
+        );
+        if (streaming) {
+          // Keep the partial reply on screen, but stop growing it
+          streaming.removeAttribute("data-bubble-id");
+        }
       }
     };
 
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Offline tests for zero-copy audio forwarding and the capture ring buffer
+"""
+import asyncio
+import wave
+
+from app.services import audio_ingress
+from app.services.audio_ingress import AudioForwarder, AudioRing, FrameCoalescer
+
+
+def test_ring_keeps_newest_bytes_in_order():
+    ring = AudioRing(8)
+    ring.write(b"abc")
+    assert ring.getvalue() == b"abc" and len(ring) == 3
+    ring.write(b"defgh")
+    assert ring.getvalue() == b"abcdefgh"
+    ring.write(b"ijk")
+    assert ring.getvalue() == b"defghijk"
+    ring.write(memoryview(b"0123456789"))
+    assert ring.getvalue() == b"23456789" and len(ring) == 8
+
+
+def test_ring_memory_is_constant():
+    ring = AudioRing(3200)
+    for i in range(1000):
+        ring.write(bytes([i % 256]) * 640)
+    assert len(ring._buf) == 3200
+    assert ring.getvalue()[-640:] == bytes([999 % 256]) * 640
+
+
+def test_ring_saves_wav(tmp_path):
+    ring = AudioRing(32000)
+    ring.write(b"\x01\x00" * 8000)
+    path = str(tmp_path / "capture.wav")
+    ring.save_wav(path)
+    with wave.open(path) as f:
+        assert f.getframerate() == 16000 and f.getnframes() == 8000
+
+
+def test_forwarder_sends_frames_without_copying():
+    sent = []
+    frame = bytearray(b"\x00\x01" * 320)
+
+    async def send(data):
+        sent.append(data)
+
+    ring = AudioRing(1024)
+    before = dict(audio_ingress.stats)
+    asyncio.run(AudioForwarder(send, ring=ring).forward(frame))
+    assert isinstance(sent[0], memoryview) and sent[0].obj is frame
+    assert ring.getvalue() == bytes(frame)
+    assert audio_ingress.stats["bytes"] == before["bytes"] + 640
+
+
+def test_forwarder_waits_for_slow_upstream():
+    async def run():
+        released = asyncio.Event()
+
+        async def send(data):
+            await released.wait()
+
+        forwarder = AudioForwarder(send, slow_send=0.01)
+        task = asyncio.ensure_future(forwarder.forward(b"x" * 640))
+        await asyncio.sleep(0.03)
+        assert not task.done()
+        released.set()
+        await task
+
+    before = audio_ingress.stats["backpressured"]
+    asyncio.run(run())
+    assert audio_ingress.stats["backpressured"] == before + 1
+
+
+def test_coalescer_reframes_irregular_chunks():
+    coalescer = FrameCoalescer(4)
+    data = bytes(range(23))
+    out, pos = [], 0
+    for size in (1, 2, 6, 8, 3, 3):
+        out += [bytes(f) for f in coalescer.push(data[pos:pos + size])]
+        pos += size
+    assert out == [data[i:i + 4] for i in range(0, 20, 4)]
+    assert len(coalescer) == 3 and coalescer.pending_since is not None
+    assert coalescer.flush() == data[20:] and coalescer.flush() is None
+
+
+def test_coalescer_passes_aligned_frames_as_views():
+    chunk = bytes(8)
+    out = FrameCoalescer(4).push(chunk)
+    assert len(out) == 2 and all(isinstance(f, memoryview) and f.obj is chunk for f in out)
+
+
+def test_forwarder_coalesces_and_flushes_stale_partial():
+    sent = []
+
+    async def send(data):
+        sent.append(bytes(data))
+
+    async def run():
+        forwarder = AudioForwarder(send, coalescer=FrameCoalescer(1600), max_delay=0.03)
+        for _ in range(5):
+            await forwarder.forward(b"\x01" * 256)
+        assert sent == []
+        for _ in range(2):
+            await forwarder.forward(b"\x01" * 256)
+        assert sent == [b"\x01" * 1600]
+        # 192 bytes left over; the client goes quiet and the timer sends them
+        await asyncio.sleep(0.06)
+        forwarder.close()
+
+    before = audio_ingress.stats["timer_flushes"]
+    asyncio.run(run())
+    assert sent[1:] == [b"\x01" * 192]
+    assert audio_ingress.stats["timer_flushes"] == before + 1
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Offline tests for barge-in: cancelling a reply turn mid-stream
+"""
+import asyncio
+import json
+
+import websockets
+from fastapi import WebSocketDisconnect
+
+from app.config import settings
+from app.routes import audio_transcribe
+from app.services import turns as turns_module
+from app.services.murf_pool import MurfConnectionPool
+from app.services.stream_gemini_to_murf import iter_sentences, stream_text_to_murf
+from app.services.storage import InMemorySessionStore
+from app.services.turns import TurnRunner, is_barge_in
+from fakes import FakeClient, fake_llm
+
+
+def test_barge_in_threshold():
+    assert not is_barge_in("", 2)
+    assert not is_barge_in("um", 2)
+    assert is_barge_in("wait stop", 2)
+
+
+def test_cancel_stops_running_turn_and_allows_next():
+    runner = TurnRunner()
+    steps = []
+
+    async def turn(name, n):
+        for i in range(n):
+            steps.append((name, i))
+            await asyncio.sleep(0.01)
+
+    async def run():
+        runner.start(turn("a", 100))
+        await asyncio.sleep(0.035)
+        assert await runner.cancel()
+        assert not runner.active
+        await runner.start(turn("b", 2))
+        return await runner.cancel()
+
+    before = dict(turns_module.stats)
+    assert asyncio.run(run()) is False
+    assert ("a", 99) not in steps and steps[-2:] == [("b", 0), ("b", 1)]
+    assert turns_module.stats["cancelled"] == before["cancelled"] + 1
+    assert turns_module.stats["completed"] == before["completed"] + 1
+
+
+def test_cancelled_turn_clears_murf_context(tmp_path):
+    received = []
+
+    async def slow_murf(ws):
+        # Never finishes the turn on its own, so only a clear ends it
+        async for raw in ws:
+            received.append(json.loads(raw))
+
+    async def run():
+        server = await websockets.serve(slow_murf, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        pool = MurfConnectionPool(api_key="test", base_url=f"ws://127.0.0.1:{port}")
+        client = FakeClient()
+        runner = TurnRunner()
+        tokens = [f"Sentence number {i}. " for i in range(50)]
+        try:
+            runner.start(stream_text_to_murf(
+                iter_sentences(fake_llm(tokens, 0.02)), client,
+                output_path=str(tmp_path / "out.mp3"), pool=pool,
+            ))
+            await asyncio.sleep(0.15)
+            assert await runner.cancel()
+            await asyncio.sleep(0.05)
+        finally:
+            await pool.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+    texts = [m["text"] for m in received if "text" in m]
+    assert 0 < len(texts) < 50
+    assert any(m.get("clear") for m in received)
+    # Cancelled before the end: nothing is written to disk
+    assert not (tmp_path / "out.mp3").exists()
+
+
+class FakeAssemblyAI:
+    """The upstream STT socket: replays (delay, transcript, end_of_turn) turns, then the session ends."""
+
+    def __init__(self, feed, done):
+        self.feed = feed
+        self.done = done
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def send(self, data):
+        pass
+
+    async def close(self):
+        pass
+
+    async def __aiter__(self):
+        for delay, transcript, end_of_turn in self.feed:
+            await asyncio.sleep(delay)
+            yield json.dumps({"type": "Turn", "transcript": transcript, "end_of_turn": end_of_turn})
+        await asyncio.sleep(0.05)
+        self.done.set()
+
+
+class FakeBrowser(FakeClient):
+    """The client side of /ws/transcribe: sends no audio and disconnects once the feed is over."""
+
+    def __init__(self, done):
+        super().__init__()
+        self.query_params = {}
+        self.done = done
+
+    async def accept(self):
+        pass
+
+    async def receive_bytes(self):
+        await self.done.wait()
+        raise WebSocketDisconnect()
+
+    async def close(self):
+        pass
+
+
+def test_route_barges_in_and_keeps_only_what_was_said(monkeypatch):
+    store = InMemorySessionStore()
+    monkeypatch.setattr(store, "drop", lambda session_id: None)  # keep the history to inspect it
+    monkeypatch.setattr(audio_transcribe, "store", store)
+    monkeypatch.setattr(settings, "SPECULATION_ENABLED", False)
+
+    async def llm_reply(session_id, history, persona, prompts=None, final=None):
+        if "volcanoes" in history[-1]["content"]:
+            # Long reply: the user talks over it after the first sentence
+            yield "Volcanoes are mountains. "
+            await asyncio.sleep(5)
+            yield "They erupt."
+        else:
+            yield "Lava is molten rock."
+
+    async def murf(sentences, websocket, **_):
+        async for _ in sentences:
+            pass
+
+    monkeypatch.setattr(audio_transcribe.llm, "astream_chat", llm_reply)
+    monkeypatch.setattr(audio_transcribe, "stream_text_to_murf", murf)
+
+    feed = [
+        (0.0, "tell me about volcanoes", True),
+        (0.1, "what about", False),  # barge-in while the first reply is still streaming
+        (0.02, "what about lava", True),
+        (0.1, "one more", False),  # a new turn can barge in again
+    ]
+
+    async def run():
+        done = asyncio.Event()
+        monkeypatch.setattr(audio_transcribe.websockets, "connect", lambda *a, **kw: FakeAssemblyAI(feed, done))
+        browser = FakeBrowser(done)
+        await audio_transcribe.websocket_transcribe(browser)
+        return browser.messages
+
+    messages = [m for m in asyncio.run(run()) if m["type"] != "turn_update"]
+    assert [(m["type"], m.get("text")) for m in messages] == [
+        ("playback_flush", None),
+        ("turn_end", "tell me about volcanoes"),
+        ("ai_text_delta", "Volcanoes are mountains. "),
+        ("playback_flush", None),
+        ("turn_end", "what about lava"),
+        ("ai_text_delta", "Lava is molten rock."),
+        ("ai_text", "Lava is molten rock."),
+        ("playback_flush", None),
+    ]
+    (session_id,) = store._data
+    assert [(m.role, m.content) for m in store.history(session_id)] == [
+        ("user", "tell me about volcanoes"),
+        ("assistant", "Volcanoes are mountains."),
+        ("user", "what about lava"),
+        ("assistant", "Lava is molten rock."),
+    ]
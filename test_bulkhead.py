@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Offline tests for per-provider bulkheads and load shedding
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.config import settings
+from app.services.bulkhead import Bulkhead, BulkheadFull
+from app.services.tts_cache import AudioCache, tts_cache_key
+from app.services.tts_murf import MurfTTS
+
+
+def test_blocking_calls_are_capped_and_excess_rejected():
+    bulkhead = Bulkhead("t", max_concurrent=2, max_queue=1)
+    gate = threading.Event()
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        gate.wait(2)
+        with lock:
+            active[0] -= 1
+        return "ok"
+
+    futures = [bulkhead.submit(work) for _ in range(3)]
+    with pytest.raises(BulkheadFull):
+        bulkhead.submit(work)
+    snap = bulkhead.snapshot()
+    assert snap["rejected"] == 1 and snap["running"] + snap["queued"] == 3
+    gate.set()
+    assert [f.result() for f in futures] == ["ok"] * 3
+    assert peak[0] == 2
+    assert bulkhead.snapshot()["queued"] == 0 and bulkhead.admitted == 0
+
+
+def test_queue_timeout_sheds_stale_work():
+    bulkhead = Bulkhead("t", max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    first = bulkhead.submit(time.sleep, 0.1)
+    late = bulkhead.submit(lambda: "never")
+    first.result()
+    with pytest.raises(BulkheadFull):
+        late.result()
+    assert bulkhead.stats["timed_out"] == 1
+
+
+def test_async_slots_cap_concurrency_and_export_waits():
+    bulkhead = Bulkhead("t", max_concurrent=2, max_queue=2)
+    active, peak = [0], [0]
+
+    async def turn():
+        async with bulkhead.slot():
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.02)
+            active[0] -= 1
+
+    async def run():
+        results = await asyncio.gather(*(turn() for _ in range(5)), return_exceptions=True)
+        return [r for r in results if isinstance(r, BulkheadFull)]
+
+    rejected = asyncio.run(run())
+    assert len(rejected) == 1 and peak[0] == 2
+    snap = bulkhead.snapshot()
+    assert snap["completed"] == 4 and snap["wait_ms_max"] >= 15
+
+
+def test_cancelled_queued_call_frees_its_place():
+    bulkhead = Bulkhead("t", max_concurrent=1, max_queue=1)
+
+    async def run():
+        blocker = asyncio.ensure_future(bulkhead.run(time.sleep, 0.05))
+        queued = asyncio.ensure_future(bulkhead.run(lambda: "x"))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await blocker
+
+    asyncio.run(run())
+    assert bulkhead.admitted == 0
+
+
+def test_tts_is_shed_to_cached_fallback(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    cache.put(tts_cache_key(settings.FALLBACK_TEXT, "en-US-natalie", "MP3"), "MP3", b"fallback")
+    full = Bulkhead("tts", max_concurrent=1, max_queue=0)
+    tts = MurfTTS("key", cache=cache, bulkhead=full)
+    tts.synth = lambda *a: "/remote.mp3"
+    gate = threading.Event()
+    full.submit(gate.wait, 2)
+    try:
+        url = asyncio.run(tts.asynth("something new"))
+    finally:
+        gate.set()
+    assert url.endswith(".mp3") and url.startswith("/static/tts_cache/")
+    assert tts.stats["shed"] == 1
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the pooled per-session Gemini chats
+"""
+import asyncio
+
+from app.services.chat_pool import ChatPool
+from app.services.prompt_builder import PromptBuilder
+from app.services.storage import InMemorySessionStore
+from fakes import PROMPTS, FakeModel, make_chat_llm
+
+
+def turn(llm, store, sid, text, persona="Default"):
+    store.append(sid, "user", text)
+    reply = asyncio.run(llm.agenerate_chat(sid, store.history(sid), persona, prompts=PROMPTS))
+    store.append(sid, "assistant", reply)
+    return reply
+
+
+def test_only_the_new_turn_is_sent(monkeypatch):
+    llm, models = make_chat_llm(monkeypatch)
+    store = InMemorySessionStore()
+    assert turn(llm, store, "s", "hello") == "Sure thing."
+    turn(llm, store, "s", "and then?")
+    chat = models["You are Echo."].chats[0]
+    assert chat.sent == [("hello", []), ("and then?", ["hello", "Sure thing."])]
+    assert llm.chats.stats["misses"] == 1 and llm.chats.stats["hits"] == 1
+
+
+def test_turns_answered_outside_the_chat_are_appended(monkeypatch):
+    llm, models = make_chat_llm(monkeypatch)
+    store = InMemorySessionStore()
+    turn(llm, store, "s", "hello")
+    # A canned reply the chat never saw
+    store.append("s", "user", "thanks")
+    store.append("s", "assistant", "You're welcome!")
+    turn(llm, store, "s", "one more")
+    _, seen = models["You are Echo."].chats[0].sent[-1]
+    assert seen == ["hello", "Sure thing.", "thanks", "You're welcome!"]
+    assert llm.chats.stats["rebuilds"] == 0
+
+
+def test_persona_change_rebuilds_chat(monkeypatch):
+    llm, models = make_chat_llm(monkeypatch)
+    store = InMemorySessionStore()
+    turn(llm, store, "s", "hello")
+    turn(llm, store, "s", "ahoy", persona="Pirate")
+    chat = models["You are a pirate."].chats[0]
+    assert chat.sent == [("ahoy", ["hello", "Sure thing."])]
+    assert llm.chats.stats["rebuilds"] == 1
+
+
+def test_failed_reply_discards_chat(monkeypatch):
+    llm, models = make_chat_llm(monkeypatch)
+    store = InMemorySessionStore()
+    turn(llm, store, "s", "hello")
+
+    async def boom(content, stream=False):
+        raise RuntimeError("upstream down")
+
+    models["You are Echo."].chats[0].send_message_async = boom
+    assert turn(llm, store, "s", "again") == "Sorry, I couldn't generate a response."
+    assert "s" not in llm.chats._entries and llm.chats.stats["discarded"] == 1
+
+
+def test_history_is_trimmed_to_budget():
+    prompts = PromptBuilder({"Default": "x"}, history_budget=4, counter=lambda text: len(text.split()))
+    pool = ChatPool(lambda instruction: FakeModel([], instruction))
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn number {i}"} for i in range(6)]
+    chat = pool.checkout("s", history, "Default", prompts)
+    # Three tokens per turn: only the last exchange fits, and it opens with a user turn
+    assert [h["parts"][0] for h in chat.history] == ["turn number 4", "turn number 5"]
+    assert pool.stats["trimmed"] == 4
+
+
+def test_pool_is_lru_bounded():
+    pool = ChatPool(lambda instruction: FakeModel([], instruction), max_sessions=2)
+    for sid in ("a", "b", "c"):
+        pool.checkout(sid, [], "Default", PROMPTS)
+    assert len(pool) == 2 and "a" not in pool._entries
+    assert pool.snapshot()["evictions"] == 1
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Offline tests for background compaction of trimmed chat turns into rolling summaries
+"""
+import asyncio
+
+from app.services.chat_pool import ChatPool
+from app.services.compaction import SUMMARY_INTRO, Compactor
+from app.services.prompt_builder import PromptBuilder
+from fakes import FakeModel
+
+PROMPTS = PromptBuilder({"Default": "x"}, history_budget=6, counter=lambda text: len(text.split()))
+
+
+def history(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn number {i}"} for i in range(n)]
+
+
+def make_pool(compactor):
+    return ChatPool(lambda instruction: FakeModel([], instruction), on_trim=compactor.add, summary_for=compactor.summary)
+
+
+def test_trimmed_turns_are_summarized_in_background():
+    prompts = []
+
+    async def summarize(prompt):
+        prompts.append(prompt)
+        return "The user counted turns."
+
+    compactor = Compactor(summarize)
+    pool = make_pool(compactor)
+
+    async def scenario():
+        pool.checkout("s", history(6), "Default", PROMPTS)
+        # Nothing is summarized on the request path
+        assert prompts == [] and compactor.summary("s") is None
+        await compactor.run("s")
+        return pool.checkout("s", history(6), "Default", PROMPTS)
+
+    chat = asyncio.run(scenario())
+    assert "turn number 0" in prompts[0] and "turn number 3" in prompts[0]
+    texts = [h["parts"][0] for h in chat.history]
+    assert texts[0] == f"{SUMMARY_INTRO} The user counted turns."
+    assert texts[2:] == ["turn number 4", "turn number 5"]
+    assert compactor.stats["turns_compacted"] == 4
+
+
+def test_summary_rolls_forward():
+    seen = []
+
+    async def summarize(prompt):
+        seen.append(prompt)
+        return f"summary {len(seen)}"
+
+    compactor = Compactor(summarize)
+    compactor.add("s", [("user", "a"), ("model", "b")])
+    asyncio.run(compactor.run("s"))
+    compactor.add("s", [("user", "c"), ("model", "d")])
+    asyncio.run(compactor.run("s"))
+    assert "summary 1" in seen[1] and "User: c" in seen[1]
+    assert compactor.summary("s") == "summary 2"
+
+
+def test_failed_summary_keeps_turns_for_retry():
+    async def summarize(prompt):
+        raise RuntimeError("upstream down")
+
+    compactor = Compactor(summarize)
+    compactor.add("s", [("user", "a"), ("model", "b")])
+    asyncio.run(compactor.run("s"))
+    assert compactor.summary("s") is None
+    assert compactor._sessions["s"].pending == [("user", "a"), ("model", "b")]
+    assert compactor.stats["failures"] == 1
+
+
+def test_summary_replaces_previous_one_in_chat():
+    compactor = Compactor(None)
+    pool = make_pool(compactor)
+    pool.checkout("s", history(2), "Default", PROMPTS)
+    compactor._session("s").summary = "first"
+    pool.checkout("s", history(2), "Default", PROMPTS)
+    compactor._session("s").summary = "second"
+    chat = pool.checkout("s", history(2), "Default", PROMPTS)
+    texts = [h["parts"][0] for h in chat.history]
+    assert texts == [f"{SUMMARY_INTRO} second", texts[1], "turn number 0", "turn number 1"]
+
+
+def test_pending_turns_are_bounded():
+    compactor = Compactor(None, max_pending=3)
+    compactor.add("s", [("user", str(i)) for i in range(5)])
+    assert [t for _, t in compactor._sessions["s"].pending] == ["2", "3", "4"]
+    assert compactor.stats["dropped_turns"] == 2
+
+
+def test_rebuilt_chat_does_not_report_trimmed_turns_again():
+    reported = []
+    pool = ChatPool(lambda instruction: FakeModel([], instruction), on_trim=lambda sid, turns: reported.extend(turns))
+    prompts = PromptBuilder({"Default": "x", "Pirate": "y"}, history_budget=6, counter=lambda text: len(text.split()))
+    pool.checkout("s", history(6), "Default", prompts)
+    # A failed reply and a persona switch both rebuild the chat from the full session history
+    pool.discard("s")
+    pool.checkout("s", history(8), "Default", prompts)
+    pool.checkout("s", history(8), "Pirate", prompts)
+    assert [text for _, text in reported] == [f"turn number {i}" for i in range(6)]
+    pool.drop("s")
+    assert "s" not in pool._trim_marks
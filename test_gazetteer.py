@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the bundled gazetteer used for location extraction
+"""
+
+from app.services.gazetteer import Gazetteer, gazetteer
+
+
+def test_bundled_data_loads():
+    assert len(gazetteer) > 200
+    assert gazetteer.lookup("Punjab").kind == "region"
+
+
+def test_finds_places_anywhere_in_a_transcript():
+    names = [m.name for m in gazetteer.find_all("what is the weather in new delhi and in mumbai today")]
+    assert names == ["New Delhi", "Mumbai"]
+
+
+def test_longest_match_and_aliases():
+    assert gazetteer.find("any news from new york city tonight").name == "New York"
+    assert gazetteer.find("traffic in bangalore").name == "Bengaluru"
+    assert gazetteer.find("Tell me about Mexico City").name == "Mexico City"
+
+
+def test_most_specific_place_wins():
+    match = gazetteer.find("latest news of India, especially Pune")
+    assert match.name == "Pune"
+    loc = match.to_location()
+    assert loc["display_name"] == "Pune, India"
+    assert round(loc["lat"]) == 19 and round(loc["lon"]) == 74
+
+
+def test_no_place_and_no_false_friends():
+    assert gazetteer.find("do you know what time it is") is None
+    assert gazetteer.find("") is None
+    assert gazetteer.lookup("Atlantis") is None
+
+
+def test_common_word_places_need_a_capital():
+    assert gazetteer.find("give me a turkey recipe") is None
+    assert gazetteer.find("which airline flies emirates class") is None
+    assert gazetteer.find("latest news from Turkey").name == "Turkey"
+    assert gazetteer.find("news from the UAE").name == "United Arab Emirates"
+    assert gazetteer.lookup("turkey").name == "Turkey"
+
+
+def test_geocode_place_uses_gazetteer_without_network():
+    from app.services.web_search import WebSearchService
+
+    service = WebSearchService()
+
+    class NoNetwork:
+        def get(self, *args, **kwargs):
+            raise AssertionError("network used")
+
+    service._http = NoNetwork()
+    assert service.geocode_place("Ludhiana")["city"] == "Ludhiana"
+    assert service.resolve_location("Pune, India")["city"] == "Pune"
+
+
+def test_custom_entries():
+    gaz = Gazetteer()
+    gaz.add("Springfield", "city", "United States", 39.8, -89.6, ["spfld"])
+    assert gaz.find("news from spfld").name == "Springfield"
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Routing corpus for the compiled intent engine (no network: routes are resolved, not run)
+"""
+
+import pytest
+
+import app.services.llm_gemini  # noqa: F401  registers the lookup handlers
+from app.services.intents import IntentEngine, intents, normalize
+from app.services.personas import PERSONA_GREETINGS, canned_reply
+from app.services.web_search import web_search
+
+LOOKUP_CORPUS = [
+    ("what time is it", "current_time"),
+    ("What's the date today?", "current_date"),
+    ("I know you can help me", None),  # "now" inside "know" no longer means time
+    ("explain photosynthesis", None),
+    ("who won the IPL match yesterday", "sports"),
+    ("IPL two zero two five winner", "ipl_winner"),
+    ("who is the owner of ipl 2025 teams", "ipl_owner"),
+    ("bitcoin price", "crypto_price"),
+    ("how much is eth worth", "crypto_price"),
+    ("what is something", None),  # "eth" inside "something" is not crypto
+    ("weather forecast for today in pune", "weather"),
+    ("latest news from punjab", "news"),
+    ("any updates on the election", "news"),
+    ("where am I?", "my_location"),
+    ("where am i going wrong with my code", None),
+    ("update me on the league table", "sports"),
+]
+
+CHAT_CORPUS = [
+    ("", "empty"),
+    ("Hello!", "greeting"),
+    ("hello can you explain gravity", None),
+    ("good night", "farewell"),
+    ("what's your name", "identity"),
+    ("thanks a lot", "thanks"),
+    ("you are stupid", "rude"),
+    ("tell me a joke", "joke"),
+    ("can you predict the future", "out_of_scope"),
+    ("what is a black hole", None),
+]
+
+
+@pytest.mark.parametrize("text,expected", LOOKUP_CORPUS)
+def test_lookup_routing(text, expected):
+    assert intents.route(text, group="lookup") == expected
+
+
+@pytest.mark.parametrize("text,expected", CHAT_CORPUS)
+def test_chat_routing(text, expected):
+    assert intents.route(text, group="chat", history=[]) == expected
+
+
+def test_repetition_uses_history():
+    history = [
+        {"role": "user", "content": "What is a black hole?"},
+        {"role": "assistant", "content": "A region of space..."},
+        {"role": "user", "content": "what is a black hole"},
+    ]
+    assert intents.route("what is a black hole", group="chat", history=history) == "repetition"
+
+
+def test_canned_reply_uses_persona():
+    assert canned_reply("hey", persona="Pirate") == PERSONA_GREETINGS["Pirate"]
+    assert canned_reply("hey", persona="Unknown") == PERSONA_GREETINGS["Default"]
+    assert canned_reply("how do planes fly") is None
+
+
+def test_normalize_joins_spoken_digits():
+    assert normalize("IPL two zero two five, winner?") == "ipl 2025 winner"
+
+
+def test_handlers_are_pluggable_and_prioritized():
+    engine = IntentEngine()
+    engine.add_intent("greet", ["hi"])
+    engine.add_intent("help", ["help"])
+
+    @engine.handler("greet", priority=1)
+    def greet(utt, **_):
+        return "hi!"
+
+    @engine.handler("help", priority=5)
+    def helper(utt, **_):
+        return None  # declines, so the next eligible handler answers
+
+    assert engine.dispatch("hi, help") == "hi!"
+    assert engine.route("hi, help") == "helper"
+    assert engine.dispatch("nothing here") is None
+
+
+RESULTS = [{"title": "Story", "content": "Something happened today.", "url": "https://example.com/a"}]
+
+
+@pytest.fixture
+def stub_search(monkeypatch):
+    calls = []
+
+    def record(name):
+        def provider(*args, **kwargs):
+            calls.append((name, args, kwargs))
+            return RESULTS
+        return provider
+
+    monkeypatch.setattr(web_search, "search_web", record("search_web"))
+    monkeypatch.setattr(web_search, "search_with_fallback", record("search_with_fallback"))
+    monkeypatch.setattr(web_search, "get_latest_news", record("get_latest_news"))
+    return calls
+
+
+@pytest.mark.parametrize("text,provider,prefix", [
+    ("latest news in delhi", "get_latest_news", "Here's the latest news:"),
+    ("what is the news", "search_with_fallback", "Here's the latest news:"),
+    ("weather in pune", "search_web", "Weather update:"),
+    ("ipl match score", "search_web", "Here are the latest sports updates:"),
+])
+def test_lookup_handlers_run_against_search_providers(stub_search, text, provider, prefix):
+    reply = web_search.handle_special_queries(text)
+    assert reply.startswith(prefix)
+    assert "Story" in reply and "https://example.com/a" in reply
+    assert [name for name, _, _ in stub_search] == [provider]
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the async, token-streaming Gemini path
+"""
+import asyncio
+
+from app.services import llm_gemini
+from app.services.llm_gemini import GeminiLLM
+from fakes import FakeModel
+
+
+def make_llm(tokens, delay=0.01):
+    llm = GeminiLLM("test-key")
+    llm.model = FakeModel(tokens, delay=delay)
+    return llm
+
+
+def test_astream_yields_tokens_in_order(monkeypatch):
+    monkeypatch.setattr(llm_gemini, "handle_special_queries", lambda q: None)
+    llm = make_llm(["Photo", "synthesis ", "is neat."])
+
+    async def collect():
+        return [d async for d in llm.astream("Explain photosynthesis", "Teacher")]
+
+    assert asyncio.run(collect()) == ["Photo", "synthesis ", "is neat."]
+    assert "Explain photosynthesis" in llm.model.prompts[0]
+
+
+def test_astream_short_circuits_special_queries(monkeypatch):
+    monkeypatch.setattr(llm_gemini, "handle_special_queries", lambda q: "Special answer")
+    llm = make_llm(["unused"])
+
+    async def collect():
+        return [d async for d in llm.astream("anything")]
+
+    assert asyncio.run(collect()) == ["Special answer"]
+    assert llm.model.prompts == []
+
+
+def test_astream_falls_back_on_error(monkeypatch):
+    monkeypatch.setattr(llm_gemini, "handle_special_queries", lambda q: None)
+    llm = make_llm([])
+
+    async def boom(prompt, stream=False, **kwargs):
+        raise RuntimeError("upstream down")
+
+    llm.model.generate_content_async = boom
+
+    assert asyncio.run(llm.agenerate("hello there")) == "Sorry, I couldn't generate a response."
+
+
+def test_concurrent_streams_do_not_block_event_loop(monkeypatch):
+    monkeypatch.setattr(llm_gemini, "handle_special_queries", lambda q: None)
+    llm = make_llm(["a", "b", "c", "d", "e"], delay=0.02)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(asyncio.get_running_loop().time())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        replies = await asyncio.gather(
+            llm.agenerate("first question"),
+            llm.agenerate("second question"),
+            ticker(),
+        )
+        return replies[:2]
+
+    assert asyncio.run(run()) == ["abcde", "abcde"]
+    # The ticker kept running while both replies were streaming
+    assert len(ticks) == 5
+    assert ticks[-1] - ticks[0] < 0.09
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the geocoding / IP-location cache
+"""
+import threading
+
+from app.services.cache import SingleFlight, SQLiteCache, TTLCache
+from app.services.web_search import WebSearchService
+from fakes import FakeHttp, FakeResponse
+
+
+def geo_api(method, url, params=None, **_):
+    """Nominatim knows every place but Atlantis; ip-api puts every address in Pune."""
+    if "nominatim" in url:
+        if params["q"].lower().startswith("atlantis"):
+            return FakeResponse([])
+        return FakeResponse([{"display_name": f"{params['q']}, India", "lat": "31.1", "lon": "75.3"}])
+    return FakeResponse({"status": "success", "city": "Pune", "regionName": "MH", "country": "India", "lat": 18.5, "lon": 73.8})
+
+
+def make_service(db=None, delay=0.0):
+    service = WebSearchService()
+    service._http = FakeHttp(geo_api, delay)
+    service.location_cache = TTLCache(maxsize=16, disk=SQLiteCache(db, table="location_cache") if db else None)
+    service._location_flight = SingleFlight()
+    return service
+
+
+def test_geocode_is_cached_by_normalized_place():
+    service = make_service()
+    first = service.geocode_place("Zirakpur")
+    second = service.geocode_place("  zirakpur ")
+    assert first == second and first["lat"] == 31.1
+    assert len(service._http.calls) == 1
+
+
+def test_unresolvable_place_is_negatively_cached():
+    service = make_service()
+    assert service.geocode_place("Atlantis") is None
+    assert service.geocode_place("atlantis") is None
+    assert len(service._http.calls) == 1
+
+
+def test_upstream_errors_are_not_negatively_cached():
+    service = make_service()
+    # The next two requests are rate limited
+    statuses = [429, 429]
+    service._http.respond = lambda method, url, **kw: FakeResponse({}, statuses.pop()) if statuses else geo_api(method, url, **kw)
+    assert service.geocode_place("Nowhereville") is None
+    assert service.resolve_location_from_ip("5.6.7.8") is None
+    # The next call goes back to the network and succeeds
+    assert service.geocode_place("Nowhereville")["lat"] == 31.1
+    assert service.resolve_location_from_ip("5.6.7.8")["city"] == "Pune"
+    assert len(service._http.calls) == 4
+
+
+def test_ip_lookup_keyed_by_client_ip():
+    service = make_service()
+    service.resolve_location_from_ip("1.2.3.4")
+    service.resolve_location_from_ip("1.2.3.4")
+    service.resolve_location_from_ip()
+    urls = [url for _, url, _ in service._http.calls]
+    assert urls == ["http://ip-api.com/json/1.2.3.4", "http://ip-api.com/json"]
+
+
+def test_concurrent_misses_are_coalesced():
+    service = make_service(delay=0.1)
+    results = []
+
+    def worker():
+        results.append(service.geocode_place("Kharar"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(service._http.calls) == 1
+    assert len(results) == 8 and all(r == results[0] for r in results)
+    assert service.snapshot()["location_cache"]["coalesced"] == 7
+
+
+def test_persistent_store_survives_restart(tmp_path):
+    db = str(tmp_path / "loc.db")
+    make_service(db).geocode_place("Rajpura")
+
+    restarted = make_service(db)
+    assert restarted.geocode_place("Rajpura")["lat"] == 31.1
+    assert restarted._http.calls == []
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Offline tests for BM25 long-term memory over past turns
+"""
+import asyncio
+
+from app.services import llm_gemini
+from app.services.memory_index import MemoryIndex, SessionMemory
+from app.services.storage import InMemorySessionStore
+from fakes import PROMPTS, make_chat_llm
+
+
+def test_bm25_ranks_relevant_turns_first():
+    mem = SessionMemory()
+    mem.add("user", "my dog is called Bruno and he loves the beach")
+    mem.add("user", "what is the capital of France")
+    mem.add("assistant", "The capital of France is Paris")
+    mem.add("user", "remind me what my dog likes")
+    hits = mem.search("what does my dog Bruno love", k=1, before=3)
+    assert hits[0][2].startswith("my dog is called Bruno")
+
+
+def test_news_words_still_count_in_memory():
+    mem = SessionMemory()
+    mem.add("user", "today I have a meeting with the design team")
+    mem.add("user", "remind me to buy milk")
+    mem.add("user", "what is the weather")
+    hits = mem.search("what did I say about today", k=1, before=3)
+    assert hits[0][2].startswith("today I have a meeting")
+
+
+def test_results_are_chronological_and_respect_before():
+    mem = SessionMemory()
+    for text in ["paris trip in may", "budget for the paris trip", "paris hotel booked"]:
+        mem.add("user", text)
+    hits = mem.search("paris trip", k=3, before=2)
+    assert [t for _, _, t in hits] == ["paris trip in may", "budget for the paris trip"]
+
+
+def test_oldest_turns_leave_the_index():
+    mem = SessionMemory(max_turns=2)
+    mem.add("user", "alpha topic")
+    mem.add("user", "beta topic")
+    mem.add("user", "gamma topic")
+    assert "alpha" not in mem.postings
+    assert mem.postings["topic"].keys() == {1, 2}
+    assert mem.total_length == 4
+
+
+def test_store_appends_are_indexed():
+    store = InMemorySessionStore()
+    index = MemoryIndex(min_score=0.0)
+    store.subscribe(index.add)
+    store.append("s", "user", "I am allergic to peanuts")
+    store.append("s", "assistant", "Noted")
+    store.append("s", "user", "suggest a snack")
+    assert index.recall("s", "snack without peanuts", k=1, skip_recent=1) == [("user", "I am allergic to peanuts")]
+    assert index.recall("s", "snack without peanuts", k=1, skip_recent=3) == []
+
+
+def test_recalled_turns_are_sent_but_not_kept(monkeypatch):
+    llm, models = make_chat_llm(monkeypatch)
+    index = MemoryIndex(min_score=0.0)
+    monkeypatch.setattr(llm_gemini, "memory", index)
+    store = InMemorySessionStore()
+    store.subscribe(index.add)
+    store.append("s", "user", "my sister lives in Pune")
+    store.append("s", "assistant", "Nice")
+    llm.chats.drop("s")  # as if these turns had been trimmed out of the chat
+    store.append("s", "user", "where does my sister live")
+    history = store.history("s")[-1:]
+    asyncio.run(llm.agenerate_chat("s", history, "Default", prompts=PROMPTS))
+    chat = models["You are Echo."].chats[0]
+    sent, _ = chat.sent[0]
+    assert "my sister lives in Pune" in sent and sent.endswith("Current message: where does my sister live")
+    assert chat.history[-2] == {"role": "user", "parts": ["where does my sister live"]}
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the pooled, context-multiplexed Murf connection manager
+"""
+import asyncio
+import base64
+import json
+
+import websockets
+
+from app.services.murf_pool import MurfConnectionPool
+
+
+class FakeMurf:
+    """Local stream-input server that tags replies with the caller's context_id."""
+
+    def __init__(self):
+        self.connections = 0
+        self.voice_configs = 0
+        self.sockets = []
+
+    async def handler(self, ws):
+        self.connections += 1
+        self.sockets.append(ws)
+        async for raw in ws:
+            msg = json.loads(raw)
+            ctx = msg.get("context_id")
+            if "voice_config" in msg:
+                self.voice_configs += 1
+            if "text" in msg:
+                await asyncio.sleep(0.01)
+                audio = base64.b64encode(msg["text"].encode()).decode()
+                await ws.send(json.dumps({"audio": audio, "context_id": ctx}))
+            if msg.get("end"):
+                await ws.send(json.dumps({"audio": "", "final": True, "context_id": ctx}))
+
+
+async def speak(pool, text):
+    ctx = await pool.open_context()
+    await ctx.send_text(text)
+    await ctx.end()
+    audio = b""
+    while True:
+        msg = await ctx.recv(timeout=2)
+        audio += base64.b64decode(msg.get("audio", ""))
+        if msg.get("final"):
+            return audio
+
+
+async def with_server(body, **pool_kwargs):
+    fake = FakeMurf()
+    server = await websockets.serve(fake.handler, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    pool = MurfConnectionPool(api_key="test", base_url=f"ws://127.0.0.1:{port}", **pool_kwargs)
+    try:
+        return await body(pool, fake)
+    finally:
+        await pool.close()
+        server.close()
+        await server.wait_closed()
+
+
+def test_sequential_turns_reuse_one_configured_socket():
+    async def body(pool, fake):
+        await pool.warm()
+        for i in range(3):
+            assert await speak(pool, f"turn {i}") == f"turn {i}".encode()
+        return fake
+
+    fake = asyncio.run(with_server(body))
+    assert fake.connections == 1
+    assert fake.voice_configs == 1
+
+
+def test_concurrent_turns_are_multiplexed_by_context_id():
+    async def body(pool, fake):
+        await pool.warm()
+        texts = [f"reply number {i}" for i in range(4)]
+        results = await asyncio.gather(*(speak(pool, t) for t in texts))
+        return fake, texts, results
+
+    fake, texts, results = asyncio.run(with_server(body, max_contexts_per_socket=4))
+    assert results == [t.encode() for t in texts]
+    assert fake.connections == 1
+
+
+def test_dropped_socket_reconnects_transparently():
+    async def body(pool, fake):
+        await pool.warm()
+        await fake.sockets[0].close()
+        await asyncio.sleep(0.05)
+        audio = await speak(pool, "after reconnect")
+        return fake, audio
+
+    fake, audio = asyncio.run(with_server(body))
+    assert audio == b"after reconnect"
+    assert fake.connections == 2
+
+
+def test_idle_sockets_are_reaped_but_warm_key_is_kept():
+    async def body(pool, fake):
+        await pool.warm()
+        await asyncio.gather(*(speak(pool, f"x{i}") for i in range(3)))
+        assert pool.snapshot()["sockets"] == 3
+        await asyncio.sleep(0.05)
+        reaped = await pool.reap_idle()
+        return reaped, pool.snapshot()
+
+    reaped, snap = asyncio.run(with_server(body, max_contexts_per_socket=1, idle_timeout=0.01))
+    assert reaped == 2
+    assert snap["sockets"] == 1
+    assert snap["open_contexts"] == 0
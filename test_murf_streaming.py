@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Offline tests for sentence-pipelined LLM -> Murf streaming against fake LLM and Murf servers
+"""
+import asyncio
+import base64
+import json
+import time
+
+import websockets
+
+from app.services.murf_pool import MurfConnectionPool
+from app.services.stream_gemini_to_murf import (
+    TurnTimings,
+    iter_sentences,
+    split_ready,
+    stream_text_to_murf,
+)
+from fakes import FakeClient, fake_llm
+
+
+async def fake_murf(ws):
+    """Echoes every text piece back as one audio chunk, then a final chunk on end."""
+    async for raw in ws:
+        msg = json.loads(raw)
+        ctx = msg.get("context_id")
+        if "text" in msg:
+            audio = base64.b64encode(msg["text"].encode()).decode()
+            await ws.send(json.dumps({"audio": audio, "context_id": ctx}))
+        if msg.get("end"):
+            await ws.send(json.dumps({"audio": "", "final": True, "context_id": ctx}))
+
+
+def test_split_ready_sentences_and_clauses():
+    pieces, rest = split_ready("Hello there. How are you? I am")
+    assert pieces == ["Hello there.", "How are you?"]
+    assert rest == "I am"
+
+    long_clause = "This clause keeps going for quite a while before it pauses, and then it"
+    pieces, rest = split_ready(long_clause, min_clause_chars=40)
+    assert pieces == ["This clause keeps going for quite a while before it pauses,"]
+    assert rest == "and then it"
+
+
+def test_iter_sentences_rechunks_deltas():
+    async def run():
+        deltas = fake_llm(["Hel", "lo. Wor", "ld! Last bit"], 0)
+        return [s async for s in iter_sentences(deltas)]
+
+    assert asyncio.run(run()) == ["Hello.", "World!", "Last bit"]
+
+
+def test_first_audio_arrives_before_llm_finishes(tmp_path):
+    tokens = ["First sentence here. ", "Second ", "sentence. ", "Third ", "sentence."]
+    token_delay = 0.1
+
+    async def run():
+        server = await websockets.serve(fake_murf, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = FakeClient()
+        timings = TurnTimings(started=time.perf_counter())
+        pool = MurfConnectionPool(api_key="test", base_url=f"ws://127.0.0.1:{port}")
+        try:
+            path = await stream_text_to_murf(
+                iter_sentences(fake_llm(tokens, token_delay)),
+                client,
+                output_path=str(tmp_path / "out.mp3"),
+                timings=timings,
+                pool=pool,
+            )
+        finally:
+            await pool.close()
+            server.close()
+            await server.wait_closed()
+        return client, timings, path
+
+    client, timings, path = asyncio.run(run())
+    llm_duration = token_delay * len(tokens)
+
+    assert timings.time_to_first_audio is not None
+    # Sentence 1 was already voiced while the rest of the reply was being generated
+    assert timings.time_to_first_audio < llm_duration / 2
+    audio = [base64.b64decode(m["data"]) for m in client.messages if m["type"] == "audio_chunk"]
+    assert b"".join(audio) == b"First sentence here.Second sentence.Third sentence."
+    with open(path, "rb") as f:
+        assert f.read() == b"".join(audio)
+
+
+def test_murf_failure_still_drains_llm(tmp_path):
+    consumed = []
+
+    async def llm():
+        for token in ["One. ", "Two."]:
+            consumed.append(token)
+            yield token
+
+    async def run():
+        try:
+            pool = MurfConnectionPool(api_key="test", base_url="ws://127.0.0.1:9")
+            await stream_text_to_murf(iter_sentences(llm()), None, str(tmp_path / "x.mp3"), pool=pool)
+        except RuntimeError as e:
+            return e
+
+    assert isinstance(asyncio.run(run()), RuntimeError)
+    assert consumed == ["One. ", "Two."]
+
+
+async def run_against_fake_murf(pieces, tmp_path, **kwargs):
+    server = await websockets.serve(fake_murf, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    client = FakeClient()
+    pool = MurfConnectionPool(api_key="test", base_url=f"ws://127.0.0.1:{port}")
+    try:
+        await stream_text_to_murf(pieces, client, output_path=str(tmp_path / "out.mp3"), pool=pool, **kwargs)
+    finally:
+        await pool.close()
+        server.close()
+        await server.wait_closed()
+    return [m for m in client.messages if m["type"] == "audio_chunk"]
+
+
+def test_long_reply_is_not_cut_off(tmp_path):
+    sentences = [f"Sentence {i}." for i in range(80)]
+    chunks = asyncio.run(run_against_fake_murf(fake_llm(sentences, 0), tmp_path))
+    audio = b"".join(base64.b64decode(m["data"]) for m in chunks)
+    assert audio == "".join(sentences).encode()
+
+
+def test_slow_first_token_does_not_end_the_turn(tmp_path):
+    # The LLM takes longer than the idle timeout to produce anything
+    chunks = asyncio.run(run_against_fake_murf(fake_llm(["Late but here."], 0.3), tmp_path, idle_timeout=0.1))
+    assert b"".join(base64.b64decode(m["data"]) for m in chunks) == b"Late but here."
+
+
+def test_socket_drop_mid_turn_resumes_on_fresh_socket(tmp_path):
+    connections = []
+
+    async def flaky_murf(ws):
+        connections.append(ws)
+        async for raw in ws:
+            msg = json.loads(raw)
+            ctx = msg.get("context_id")
+            if "text" in msg:
+                audio = base64.b64encode(msg["text"].encode()).decode()
+                await ws.send(json.dumps({"audio": audio, "context_id": ctx}))
+                if len(connections) == 1:
+                    # First socket dies after voicing one piece, before the final
+                    await ws.close()
+                    return
+            if msg.get("end"):
+                await ws.send(json.dumps({"audio": "", "final": True, "context_id": ctx}))
+
+    async def run():
+        server = await websockets.serve(flaky_murf, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = FakeClient()
+        pool = MurfConnectionPool(api_key="test", base_url=f"ws://127.0.0.1:{port}")
+        try:
+            path = await stream_text_to_murf(
+                iter_sentences(fake_llm(["One. ", "Two. ", "Three."], 0.05)),
+                client, output_path=str(tmp_path / "out.mp3"), pool=pool,
+            )
+        finally:
+            await pool.close()
+            server.close()
+            await server.wait_closed()
+        return client, path, pool.stats
+
+    client, path, stats = asyncio.run(run())
+    types = [m["type"] for m in client.messages]
+    assert "audio_restart" in types
+    after = client.messages[types.index("audio_restart") + 1:]
+    audio = b"".join(base64.b64decode(m["data"]) for m in after if m["type"] == "audio_chunk")
+    assert audio == b"One.Two.Three."
+    with open(path, "rb") as f:
+        assert f.read() == audio
+    assert len(connections) == 2 and stats["resumed"] == 1
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the unified news aggregator (merge, dedupe, cache, coalescing)
+"""
+import threading
+import time
+
+from app.services.cache import SingleFlight, TTLCache
+from app.services.news_index import NewsIndex
+from app.services.news_service import NewsService, canonical_url, merge_articles
+
+
+def article(title, url):
+    return {"title": title, "url": url, "content": "c"}
+
+
+def make_service(api, rss, delay=0.0):
+    service = NewsService()
+    service.cache = TTLCache(maxsize=8, default_ttl=60)
+    service._flight = SingleFlight()
+    service.index = NewsIndex()
+    calls = []
+
+    def fetch_api(query, n):
+        calls.append(query)
+        time.sleep(delay)
+        return list(api)
+
+    service.fetch_newsapi = fetch_api
+    service.fetch_rss = lambda query, n: list(rss)
+    return service, calls
+
+
+def test_canonical_url_strips_tracking_and_fragment():
+    a = canonical_url("http://www.Example.com/story/?utm_source=x&id=7&fbclid=abc#top")
+    assert a == canonical_url("https://example.com/story?id=7")
+    assert a != canonical_url("https://example.com/story?id=8")
+
+
+def test_merge_dedupes_urls_and_near_identical_titles():
+    api = [
+        article("Punjab cabinet approves new water policy", "https://a.com/1?utm_medium=rss"),
+        article("Monsoon arrives early in Kerala", "https://a.com/2"),
+    ]
+    rss = [
+        article("Punjab cabinet approves new water policy - The Tribune", "https://news.google.com/x"),
+        article("Totally different story", "https://a.com/1"),
+        article("Stock markets close higher", "https://b.com/3"),
+    ]
+    merged = merge_articles(api, rss, max_results=5)
+    assert [a["title"] for a in merged] == [
+        "Punjab cabinet approves new water policy",
+        "Monsoon arrives early in Kerala",
+        "Stock markets close higher",
+    ]
+
+
+def test_results_cached_per_query_and_location():
+    service, calls = make_service([article("A", "https://a.com/a")], [])
+    service.get_latest_news("news", location="Pune")
+    service.get_latest_news("News ", location="pune")
+    service.get_latest_news("news", location="Delhi")
+    assert calls == ["news Pune", "news Delhi"]
+
+
+def test_concurrent_identical_requests_coalesce():
+    service, calls = make_service([article("A", "https://a.com/a")], [], delay=0.1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get_latest_news("latest news"))) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len(results) == 6 and all(r == results[0] for r in results)
+
+
+def test_empty_results_not_cached():
+    service, calls = make_service([], [])
+    assert service.get_latest_news("nothing") == []
+    service.get_latest_news("nothing")
+    assert len(calls) == 2
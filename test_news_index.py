@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the local news index and the conditional-GET RSS poller
+"""
+import time
+from email.utils import formatdate
+
+from app.services.news_index import NewsIndex, RSSPoller, parse_rss
+from fakes import FakeHttp, FakeResponse
+
+
+def rss(*items):
+    body = "".join(
+        f"<item><title>{t}</title><link>{u}</link><description>{d}</description><pubDate>{p}</pubDate></item>"
+        for t, u, d, p in items
+    )
+    return f'<?xml version="1.0"?><rss><channel><title>feed</title>{body}</channel></rss>'.encode()
+
+
+def chunked(data, size=7):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+NOW = formatdate(time.time())
+OLD = formatdate(time.time() - 7 * 24 * 3600)
+
+
+def test_parse_rss_is_incremental_and_stops_early():
+    doc = rss(*[(f"t{i}", f"https://x/{i}", "", NOW) for i in range(10)])
+    reads = []
+
+    def source():
+        for chunk in chunked(doc):
+            reads.append(chunk)
+            yield chunk
+
+    items = list(parse_rss(source(), max_items=2))
+    assert [i["title"] for i in items] == ["t0", "t1"]
+    assert len(reads) < len(list(chunked(doc)))
+
+
+def test_search_by_terms_and_location():
+    index = NewsIndex()
+    index.add({"title": "Farmers protest in Ludhiana", "url": "https://a/1", "content": "", "publishedAt": NOW})
+    index.add({"title": "Election results announced", "url": "https://a/2", "content": "", "publishedAt": NOW}, region="Punjab")
+    index.add({"title": "Election results in Delhi", "url": "https://a/3", "content": "", "publishedAt": NOW})
+
+    assert [a["url"] for a in index.search("punjab election news")] == ["https://a/2"]
+    assert [a["url"] for a in index.search("latest news", location="Ludhiana")] == ["https://a/1"]
+    assert {a["url"] for a in index.search("election results")} == {"https://a/2", "https://a/3"}
+    assert index.search("cricket news") == []
+    assert index.stats["misses"] == 1
+
+
+def test_duplicates_and_stale_articles_are_skipped():
+    index = NewsIndex(max_age=24 * 3600)
+    assert index.add({"title": "Story", "url": "https://a.com/s?utm_source=rss", "publishedAt": NOW})
+    assert not index.add({"title": "Story", "url": "http://www.a.com/s", "publishedAt": NOW})
+    index.add({"title": "Old story", "url": "https://a.com/old", "publishedAt": OLD})
+    assert [a["title"] for a in index.search("story")] == ["Story"]
+    assert index.prune() == 1 and len(index) == 1
+
+
+def test_max_items_evicts_oldest():
+    index = NewsIndex(max_items=2)
+    for i in range(3):
+        index.add({"title": f"headline {i}", "url": f"https://a/{i}", "publishedAt": NOW})
+    assert len(index) == 2
+    assert index.search("headline 0") == []
+
+
+def rss_feed(method, url, headers=None, **_):
+    """One-item feed with an ETag; a request that sends the ETag back gets 304."""
+    if headers and headers.get("If-None-Match") == '"v1"':
+        return FakeResponse(status=304)
+    doc = rss(("Rain lashes Mumbai", "https://m/1", "", NOW))
+    return FakeResponse(content=doc, headers={"ETag": '"v1"', "Last-Modified": NOW})
+
+
+def test_poller_uses_conditional_get():
+    index = NewsIndex()
+    poller = RSSPoller(index, [("https://feed", "Mumbai")])
+    poller._http = FakeHttp(rss_feed)
+
+    assert poller.poll_once() == 1
+    assert poller.poll_once() == 0
+    assert poller._http.calls[1][2]["headers"] == {"If-None-Match": '"v1"', "If-Modified-Since": NOW}
+    assert poller.stats["not_modified"] == 1
+    assert [a["title"] for a in index.search("mumbai news")] == ["Rain lashes Mumbai"]
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the per-endpoint prompt settings used by the chat pool
+"""
+
+from app.services.prompt_builder import PromptBuilder, count_tokens
+
+PREFIXES = {"Default": "You are Echo.", "Pirate": "You are a pirate."}
+
+
+def words(text):
+    return len(text.split())
+
+
+def test_prefix_is_rendered_and_measured_once():
+    seen = []
+
+    def counter(text):
+        seen.append(text)
+        return words(text)
+
+    builder = PromptBuilder(PREFIXES, history_budget=100, counter=counter)
+    assert builder.prefix("Pirate") == ("You are a pirate.\n\n", 4)
+    assert builder.prefix("Pirate") == ("You are a pirate.\n\n", 4)
+    assert seen == ["You are a pirate.\n\n"]
+
+
+def test_unknown_persona_uses_default_prefix():
+    builder = PromptBuilder(PREFIXES, history_budget=100, counter=words)
+    assert builder.prefix("Ninja")[0] == "You are Echo.\n\n"
+    for i in range(50):
+        builder.prefix(f"persona-{i}")
+    # Client-supplied names never add entries of their own
+    assert len(builder._prefix_cache) == 1
+
+
+def test_recall_is_prepended_to_the_message():
+    assert PromptBuilder.with_recall("and now?", []) == "and now?"
+    message = PromptBuilder.with_recall("and now?", [("user", "my dog is Rex"), ("assistant", "Nice name")])
+    assert message == "Relevant earlier conversation:\nUser: my dog is Rex\nAssistant: Nice name\n\nCurrent message: and now?"
+
+
+def test_count_tokens_is_positive():
+    assert count_tokens("hello world") >= 2
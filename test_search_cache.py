@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the TTL/LRU search cache and its SQLite tier
+"""
+import time
+
+from app.services.cache import SQLiteCache, TTLCache
+from app.services.web_search import WebSearchService, classify_search_intent, search_cache_key
+
+
+class FakeTavily:
+    def __init__(self):
+        self.calls = []
+
+    def search(self, query, **kwargs):
+        self.calls.append(query)
+        return {"results": [{"title": f"result for {query}", "url": "https://x", "content": "c"}]}
+
+
+def make_service():
+    service = WebSearchService()
+    service.client = FakeTavily()
+    service.cache = TTLCache(maxsize=8, default_ttl=60)
+    return service
+
+
+def test_identical_queries_hit_cache():
+    service = make_service()
+    loc = {"city": "Pune", "lat": 18.52, "lon": 73.85}
+
+    first = service.search_web("Weather  in Pune?", location=loc)
+    second = service.search_web("weather in pune", location=loc)
+
+    assert first == second
+    assert len(service.client.calls) == 1
+    assert service.cache.snapshot()["hits"] == 1
+
+
+def test_key_separates_location_freshness_and_size():
+    a = search_cache_key("ipl score", {"lat": 1.0, "lon": 2.0}, None, 3)
+    assert a != search_cache_key("ipl score", {"lat": 1.5, "lon": 2.0}, None, 3)
+    assert a != search_cache_key("ipl score", {"lat": 1.0, "lon": 2.0}, 7, 3)
+    assert a != search_cache_key("ipl score", {"lat": 1.0, "lon": 2.0}, None, 5)
+
+
+def test_intent_ttls():
+    assert classify_search_intent("weather tomorrow") == "weather"
+    assert classify_search_intent("IPL match score") == "sports"
+    assert classify_search_intent("latest news punjab") == "news"
+    assert classify_search_intent("capital of france") == "default"
+
+
+def test_errors_are_not_cached(monkeypatch):
+    import app.services.web_search as ws
+
+    service = make_service()
+
+    def failing(query, **kwargs):
+        raise RuntimeError("down")
+
+    service.client.search = failing
+    monkeypatch.setattr(ws.time, "sleep", lambda s: None)
+
+    result = service.search_web("capital of france", location={"city": "x"})
+
+    assert result[0]["title"] == "Search Error"
+    assert len(service.cache) == 0
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, default_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.snapshot()["evictions"] == 1
+
+
+def test_stale_while_revalidate():
+    cache = TTLCache(maxsize=4, default_ttl=0.05, stale_ttl=10)
+    values = iter(["old", "new"])
+    loader = lambda: next(values)
+
+    assert cache.get_or_load("k", loader) == "old"
+    time.sleep(0.06)
+    # Expired: the stale value is served immediately while a refresh runs
+    assert cache.get_or_load("k", loader) == "old"
+    deadline = time.time() + 2
+    while cache.get("k") != "new" and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get("k") == "new"
+    assert cache.snapshot()["stale_hits"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db = str(tmp_path / "search.db")
+    first = TTLCache(maxsize=4, default_ttl=60, disk=SQLiteCache(db))
+    first.set("q", [{"title": "t"}])
+
+    restarted = TTLCache(maxsize=4, default_ttl=60, disk=SQLiteCache(db))
+    assert restarted.get_or_load("q", lambda: "loaded") == [{"title": "t"}]
+    assert restarted.snapshot()["disk_hits"] == 1
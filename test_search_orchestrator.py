@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the hedged search fan-out
+"""
+import asyncio
+import time
+
+from app.services.search_orchestrator import SearchOrchestrator, run_sync
+from app.services.web_search import WebSearchService
+
+
+def provider(results, delay=0.0, calls=None, name=None):
+    def fn(query, max_results):
+        if calls is not None:
+            calls.append(name)
+        time.sleep(delay)
+        if isinstance(results, Exception):
+            raise results
+        return results
+    return fn
+
+
+def test_fast_fallback_beats_slow_primary():
+    orch = SearchOrchestrator(hedge_delay=0.05, deadline=2.0)
+    providers = [
+        ("tavily", provider([{"title": "slow"}], delay=1.0)),
+        ("rss", provider([{"title": "fast"}])),
+    ]
+    started = time.perf_counter()
+    results = asyncio.run(orch.search("q", providers))
+    assert results == [{"title": "fast"}]
+    assert time.perf_counter() - started < 0.5
+    assert orch.stats["hedged"] == 1 and orch.wins == {"rss": 1}
+
+
+def test_fast_primary_never_launches_hedge():
+    calls = []
+    orch = SearchOrchestrator(hedge_delay=0.5, deadline=2.0)
+    providers = [
+        ("tavily", provider([{"title": "t"}], calls=calls, name="tavily")),
+        ("rss", provider([{"title": "r"}], calls=calls, name="rss")),
+    ]
+    assert asyncio.run(orch.search("q", providers)) == [{"title": "t"}]
+    assert calls == ["tavily"]
+
+
+def test_failure_launches_next_without_waiting():
+    orch = SearchOrchestrator(hedge_delay=5.0, deadline=2.0)
+    providers = [
+        ("tavily", provider(RuntimeError("down"))),
+        ("newsapi", provider([])),
+        ("rss", provider([{"title": "r"}])),
+    ]
+    started = time.perf_counter()
+    assert asyncio.run(orch.search("q", providers)) == [{"title": "r"}]
+    assert time.perf_counter() - started < 1.0
+    assert orch.stats["hedged"] == 0
+
+
+def test_deadline_returns_best_effort():
+    orch = SearchOrchestrator(hedge_delay=0.01, deadline=0.2)
+    providers = [
+        ("tavily", provider([{"title": "Search Error"}])),
+        ("rss", provider([{"title": "late"}], delay=2.0)),
+    ]
+    started = time.perf_counter()
+    # run_sync must not wait for the abandoned provider thread either
+    results = run_sync(orch.search("q", providers))
+    assert time.perf_counter() - started < 1.0
+    assert results == [{"title": "Search Error"}]
+    assert orch.stats["deadline_exceeded"] == 1
+
+
+def test_news_query_prefers_news_over_plain_tavily_hits():
+    service = WebSearchService()
+    service.orchestrator = SearchOrchestrator(hedge_delay=0.01, deadline=2.0)
+    service.search_web = lambda q, **kw: [{"title": "web page", "url": "", "content": ""}]
+    service._news_search = lambda q, n: [{"title": "headline", "url": "", "content": ""}]
+
+    assert service.search_with_fallback("latest news punjab")[0]["title"] == "headline"
+    assert service.search_with_fallback("capital of france")[0]["title"] == "web page"
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the bounded in-memory and SQLite session stores
+"""
+import asyncio
+import time
+
+from app.services.storage import InMemorySessionStore, Message, SQLiteSessionStore
+
+
+def test_history_is_bounded_per_session():
+    store = InMemorySessionStore(limit=3)
+    for i in range(5):
+        store.append("s", "user", f"m{i}")
+    history = store.history("s")
+    assert [m["content"] for m in history] == ["m2", "m3", "m4"]
+    assert store.total_bytes == sum(m.size for m in history)
+
+
+def test_messages_are_slotted_and_dict_compatible():
+    msg = Message("user", "hi")
+    assert not hasattr(msg, "__dict__")
+    assert msg["role"] == "user" and msg.get("missing", 1) == 1
+    assert msg.to_dict() == {"role": "user", "content": "hi"}
+
+
+def test_idle_sessions_expire():
+    store = InMemorySessionStore(ttl=0.05)
+    store.append("old", "user", "x")
+    time.sleep(0.06)
+    store.append("new", "user", "y")
+    assert store.history("old") == []
+    assert len(store) == 1 and store.stats["expired"] == 1
+
+
+def test_lru_eviction_by_session_count():
+    store = InMemorySessionStore(max_sessions=2)
+    store.append("a", "user", "x")
+    store.append("b", "user", "x")
+    store.history("a")  # a is now most recent
+    store.append("c", "user", "x")
+    assert store.history("b") == []
+    assert store.history("a") and store.history("c")
+    assert store.stats["evicted"] == 1
+
+
+def test_byte_cap_keeps_memory_flat():
+    store = InMemorySessionStore(limit=4, max_bytes=20_000)
+    for i in range(2000):
+        store.append(f"conn-{i}", "user", "hello " * 20)
+        store.append(f"conn-{i}", "assistant", "reply " * 40)
+    snap = store.snapshot()
+    assert snap["bytes"] <= 20_000
+    assert snap["sessions"] < 100
+    assert snap["bytes"] == sum(m.size for sid in list(store._data) for m in store.history(sid))
+
+
+def test_drop_on_disconnect():
+    store = InMemorySessionStore()
+    store.append("ws", "user", "x")
+    store.drop("ws")
+    assert len(store) == 0 and store.total_bytes == 0 and store.stats["dropped"] == 1
+
+
+def test_sqlite_history_shared_across_workers(tmp_path):
+    db = str(tmp_path / "sessions.db")
+    worker_a = SQLiteSessionStore(db)
+    worker_b = SQLiteSessionStore(db)
+
+    worker_a.append("chat-1", "user", "hi")
+    worker_a.append("chat-1", "assistant", "hello")
+    # Cold read on another worker loads from disk
+    assert [m["content"] for m in worker_b.history("chat-1")] == ["hi", "hello"]
+
+    worker_b.append("chat-1", "user", "how are you")
+    assert [m["content"] for m in worker_a.history("chat-1")] == ["hi", "hello", "how are you"]
+    assert worker_a.stats["remote_rows"] == 1
+
+
+def test_sqlite_write_behind_batches(tmp_path):
+    db = str(tmp_path / "sessions.db")
+
+    async def scenario():
+        store = SQLiteSessionStore(db, flush_interval=0.05)
+        await store.start()
+        for i in range(50):
+            store.append("s", "user", f"m{i}")
+        # Served from the read-through cache before anything hits disk
+        assert len(store.history("s")) == 20
+        await asyncio.sleep(0.2)
+        batches = store.stats["batches"]
+        await store.close()
+        return batches
+
+    assert asyncio.run(scenario()) == 1
+    # Only the newest `limit` rows are kept on disk
+    fresh = SQLiteSessionStore(db)
+    assert [m["content"] for m in fresh.history("s")][-1] == "m49"
+    assert len(fresh._rows("SELECT id FROM messages", ())) == 20
+
+
+def test_sqlite_drop_deletes_rows(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    store.append("ws", "user", "x")
+    store.drop("ws")
+    assert store.history("ws") == []
+
+
+def test_sqlite_reads_do_not_wait_for_the_writer(tmp_path):
+    db = str(tmp_path / "sessions.db")
+    SQLiteSessionStore(db).append("s", "user", "hi")
+    store = SQLiteSessionStore(db)
+
+    async def scenario():
+        # A write-behind batch in progress holds the writer lock
+        with store._lock:
+            return await asyncio.wait_for(store.ahistory("s"), 1.0)
+
+    assert [m["content"] for m in asyncio.run(scenario())] == ["hi"]
+    assert store.stats["cold_loads"] == 1
+    assert [m["content"] for m in store.cached_history("s")] == ["hi"]
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Offline tests for speculative replies on stable partial transcripts
+"""
+import asyncio
+
+from app.services import llm_gemini, speculation
+from app.services.chat_pool import ChatPool
+from app.services.llm_gemini import GeminiLLM
+from app.services.speculation import Speculator, edit_distance
+from fakes import PROMPTS, FakeModel
+
+
+def test_edit_distance_is_bounded():
+    assert edit_distance("weather today", "weather today", 2) == 0
+    assert edit_distance("weather today", "weather todays", 2) == 1
+    assert edit_distance("kitten", "sitting", 5) == 3
+    assert edit_distance("kitten", "sitting", 2) == 3  # gave up at limit + 1
+    assert edit_distance("hi", "what is the weather", 2) == 3
+
+
+def make_speculator(calls, chunks=("Hello ", "there."), delay=0.0):
+    async def reply(text):
+        calls.append(text)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+
+    return Speculator(lambda text, final: reply(text), stable_for=0.02, max_edits=2)
+
+
+def test_stable_partial_is_committed_and_replayed():
+    calls = []
+    before = dict(speculation.stats)
+
+    async def run():
+        spec_er = make_speculator(calls, delay=0.01)
+        await spec_er.observe("What is the weather")
+        await asyncio.sleep(0.05)
+        spec = await spec_er.resolve("What is the weather?")
+        assert spec is not None
+        return "".join([d async for d in spec.stream()])
+
+    assert asyncio.run(run()) == "Hello there."
+    assert calls == ["What is the weather"]
+    assert speculation.stats["committed"] == before["committed"] + 1
+    assert speculation.stats["latency_saved_ms"] > before["latency_saved_ms"]
+
+
+def test_changing_partials_do_not_start_until_stable():
+    calls = []
+
+    async def run():
+        spec_er = make_speculator(calls)
+        for partial in ("what", "what is", "what is the", "what is the news"):
+            await spec_er.observe(partial)
+            await asyncio.sleep(0.005)
+        assert spec_er.current is None
+        await asyncio.sleep(0.04)
+        await spec_er.cancel()
+
+    asyncio.run(run())
+    assert calls == ["what is the news"]
+
+
+def test_divergent_final_is_discarded():
+    calls = []
+    before = dict(speculation.stats)
+
+    async def run():
+        spec_er = make_speculator(calls, delay=0.05)
+        await spec_er.observe("tell me about")
+        await asyncio.sleep(0.03)
+        started = spec_er.current
+        assert await spec_er.resolve("tell me about the weather in Paris") is None
+        # Already shut down when resolve() returns
+        return started.task.cancelled()
+
+    assert asyncio.run(run())
+    assert speculation.stats["discarded"] == before["discarded"] + 1
+
+
+def test_user_continuing_abandons_speculation():
+    calls = []
+    before = dict(speculation.stats)
+
+    async def run():
+        spec_er = make_speculator(calls, delay=0.05)
+        await spec_er.observe("play some")
+        await asyncio.sleep(0.03)
+        assert spec_er.current is not None
+        await spec_er.observe("play some music from the eighties")
+        assert spec_er.current is None
+        await asyncio.sleep(0.04)
+        spec = await spec_er.resolve("play some music from the eighties")
+        await spec.cancel()
+
+    asyncio.run(run())
+    assert calls == ["play some", "play some music from the eighties"]
+    assert speculation.stats["abandoned"] == before["abandoned"] + 1
+
+
+def test_generate_may_decline():
+    async def run():
+        spec_er = Speculator(lambda text, final: None, stable_for=0.01)
+        await spec_er.observe("hello")
+        await asyncio.sleep(0.03)
+        return await spec_er.resolve("hello")
+
+    assert asyncio.run(run()) is None
+
+
+def test_cancel_waits_for_the_reply_stream_to_stop():
+    closed = []
+
+    async def reply(text):
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield "more "
+        finally:
+            closed.append(text)
+
+    async def run():
+        spec_er = Speculator(lambda text, final: reply(text), stable_for=0.01)
+        await spec_er.observe("keep talking")
+        await asyncio.sleep(0.03)
+        await spec_er.cancel()
+        return list(closed)
+
+    assert asyncio.run(run()) == ["keep talking"]
+
+
+def test_latency_saved_is_measured_from_end_of_turn():
+    before = dict(speculation.stats)
+
+    async def run():
+        spec_er = make_speculator([], delay=0.05)
+        await spec_er.observe("tell me a story")
+        await asyncio.sleep(0.04)
+        started = spec_er.current.started
+        # The turn ended 10 ms after speculation started, before the first token
+        spec = await spec_er.resolve("tell me a story", ended=started + 0.01)
+        await spec.cancel()
+
+    asyncio.run(run())
+    saved = speculation.stats["latency_saved_ms"] - before["latency_saved_ms"]
+    assert abs(saved - 10.0) < 1e-6
+
+
+def test_committed_speculation_records_the_final_transcript(monkeypatch):
+    lookups = []
+    monkeypatch.setattr(llm_gemini, "handle_special_queries", lambda q: lookups.append(q))
+    llm = GeminiLLM("test-key")
+    models = {}
+    llm.chats = ChatPool(lambda instruction: models.setdefault(instruction, FakeModel(["Sure."], instruction)))
+
+    async def run():
+        spec_er = Speculator(
+            lambda text, final: llm.astream_chat("s", [{"role": "user", "content": text}], "Default", PROMPTS, final=final),
+            stable_for=0.01,
+        )
+        await spec_er.observe("tell me a joke about cat")
+        await asyncio.sleep(0.05)
+        spec = await spec_er.resolve("Tell me a joke about cats.")
+        return "".join([d async for d in spec.stream()])
+
+    assert asyncio.run(run()) == "Sure."
+    # Speculation skips lookups, and the chat keeps the final wording
+    assert lookups == []
+    chat = models["You are Echo."].chats[0]
+    assert [h["parts"][0] for h in chat.history] == ["Tell me a joke about cats.", "Sure."]
+    assert llm.chats._entries["s"].last == ("model", "Sure.")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the async AssemblyAI batch transcriber against a mock transport
+"""
+import asyncio
+
+import httpx
+
+from app.services.stt_assemblyai import AssemblyAITranscriber, next_poll_delay
+
+
+class FakeAssemblyAI:
+    """Completes each transcript after `polls_needed` polls and tracks concurrency."""
+
+    def __init__(self, polls_needed=3, audio_duration=4.0):
+        self.polls_needed = polls_needed
+        self.audio_duration = audio_duration
+        self.polls = {}
+        self.uploaded = []
+        self.active = 0
+        self.max_active = 0
+
+    async def handler(self, request):
+        path = request.url.path
+        if path.endswith("/upload"):
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.uploaded.append(request.content)
+            return httpx.Response(200, json={"upload_url": "https://cdn/audio"})
+        if path.endswith("/transcript"):
+            tid = f"t{len(self.polls)}"
+            self.polls[tid] = 0
+            return httpx.Response(200, json={"id": tid})
+        tid = path.rsplit("/", 1)[-1]
+        self.polls[tid] += 1
+        if self.polls[tid] >= self.polls_needed:
+            self.active -= 1
+            return httpx.Response(200, json={"status": "completed", "text": f"hello from {tid}"})
+        return httpx.Response(200, json={"status": "processing", "audio_duration": self.audio_duration})
+
+
+def make_stt(fake, **kwargs):
+    kwargs.setdefault("min_poll", 0.01)
+    kwargs.setdefault("max_poll", 0.05)
+    return AssemblyAITranscriber("key", transport=httpx.MockTransport(fake.handler), **kwargs)
+
+
+def test_poll_delay_backs_off_and_scales_with_duration():
+    unknown = [next_poll_delay(i, None) for i in range(6)]
+    assert unknown == sorted(unknown)
+    assert unknown[0] == 0.5 and unknown[-1] <= 5.0
+    assert next_poll_delay(0, 10.0) == 1.0
+    assert next_poll_delay(0, 600.0) == 5.0
+    assert next_poll_delay(0, 1.0) == 0.5
+
+
+def test_atranscribe_file_uploads_and_polls(tmp_path):
+    audio = tmp_path / "clip.webm"
+    audio.write_bytes(b"x" * 200_000)
+    fake = FakeAssemblyAI(polls_needed=3)
+
+    text = asyncio.run(make_stt(fake).atranscribe_file(str(audio)))
+
+    assert text == "hello from t0"
+    assert fake.uploaded == [b"x" * 200_000]
+    assert fake.polls["t0"] == 3
+
+
+def test_semaphore_caps_in_flight_jobs(tmp_path):
+    audio = tmp_path / "clip.webm"
+    audio.write_bytes(b"abc")
+    fake = FakeAssemblyAI(polls_needed=2)
+    stt = make_stt(fake, max_concurrent_jobs=2)
+
+    async def run():
+        return await asyncio.gather(*(stt.atranscribe_file(str(audio)) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(results) == 5 and all(r.startswith("hello from") for r in results)
+    assert fake.max_active == 2
+
+
+def test_deadline_gives_up_and_keeps_loop_responsive(tmp_path):
+    audio = tmp_path / "clip.webm"
+    audio.write_bytes(b"abc")
+    fake = FakeAssemblyAI(polls_needed=10_000)
+    stt = make_stt(fake, deadline=0.2)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        t = asyncio.create_task(ticker())
+        result = await stt.atranscribe_file(str(audio))
+        t.cancel()
+        return result
+
+    assert asyncio.run(run()) is None
+    assert len(ticks) >= 10
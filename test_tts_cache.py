@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the content-addressed TTS audio cache
+"""
+import threading
+import zlib
+
+from app.services.tts_cache import AudioCache, tts_cache_key
+from app.services.tts_murf import MurfTTS
+from fakes import FakeHttp, FakeResponse
+
+
+def murf_api(method, url, json=None, **_):
+    """Murf answers a synth POST with a clip URL; GET on that URL returns the MP3."""
+    if method == "POST":
+        return FakeResponse({"audioFile": f"https://murf.example/{zlib.crc32(json['text'].encode())}.mp3"})
+    return FakeResponse(content=b"ID3" + url.encode() * 10)
+
+
+def posts(tts):
+    return [kw["json"] for method, _, kw in tts._http.calls if method == "POST"]
+
+
+def make_tts(tmp_path, max_bytes=10_000, delay=0.0):
+    tts = MurfTTS("key", cache=AudioCache(str(tmp_path / "tts"), max_bytes))
+    tts._http = FakeHttp(murf_api, delay)
+    return tts
+
+
+def test_key_covers_text_and_voice_settings():
+    base = tts_cache_key("Hello  there", "en-US-natalie", "MP3")
+    assert base == tts_cache_key(" Hello there ", "en-US-natalie", "mp3")
+    assert base != tts_cache_key("Hello there", "en-US-ken", "MP3")
+    assert base != tts_cache_key("Hello there", "en-US-natalie", "MP3", rate=10)
+    assert base != tts_cache_key("Hello there", "en-US-natalie", "MP3", pitch=-5)
+
+
+def test_second_synth_is_served_from_disk(tmp_path):
+    tts = make_tts(tmp_path)
+    first = tts.synth("Goodbye! Have a great day!")
+    second = tts.synth("Goodbye! Have a great day!")
+    assert first == second and first.startswith("/static/tts_cache/")
+    assert len(posts(tts)) == 1
+    assert tts.cached_audio("Goodbye! Have a great day!").startswith(b"ID3")
+
+
+def test_concurrent_identical_requests_coalesce(tmp_path):
+    tts = make_tts(tmp_path, delay=0.1)
+    urls = []
+    threads = [threading.Thread(target=lambda: urls.append(tts.synth("same text"))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(posts(tts)) == 1
+    assert len(set(urls)) == 1
+
+
+def test_lru_eviction_by_bytes_and_restart(tmp_path):
+    cache = AudioCache(str(tmp_path / "a"), max_bytes=250)
+    cache.put("k1", "mp3", b"x" * 100)
+    cache.put("k2", "mp3", b"x" * 100)
+    cache.path("k1", "mp3")  # k1 is now most recent
+    cache.put("k3", "mp3", b"x" * 100)
+    assert cache.path("k2", "mp3") is None
+    assert cache.path("k1", "mp3") and cache.path("k3", "mp3")
+    assert cache.snapshot()["bytes"] == 200
+
+    restarted = AudioCache(str(tmp_path / "a"), max_bytes=250)
+    assert restarted.snapshot()["files"] == 2
+
+
+def test_warm_skips_cached_and_duplicate_texts(tmp_path):
+    tts = make_tts(tmp_path)
+    tts.synth("Hello!")
+    assert tts.warm(["Hello!", "Bye!", "Bye!", ""]) == 1
+    assert len(posts(tts)) == 2
+
+
+def test_warm_stops_when_asked(tmp_path):
+    tts = make_tts(tmp_path)
+    stop = threading.Event()
+    stop.set()
+    assert tts.warm(["Hello!", "Bye!"], stop=stop) == 0
+    assert posts(tts) == []
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Offline tests for streaming uploads from UploadFile straight into the STT upload
+"""
+import asyncio
+import io
+import os
+
+import httpx
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.services.stt_assemblyai import AssemblyAITranscriber, stt
+from app.utils.files import UploadTooLarge, iter_upload
+
+
+def make_upload(data: bytes, size=None):
+    return UploadFile(io.BytesIO(data), size=len(data) if size is None else size, filename="clip.webm")
+
+
+def test_iter_upload_yields_bounded_chunks():
+    data = os.urandom(300_000)
+
+    async def run():
+        return [c async for c in iter_upload(make_upload(data), max_bytes=1_000_000, chunk_size=64 * 1024)]
+
+    chunks = asyncio.run(run())
+    assert b"".join(chunks) == data
+    assert max(len(c) for c in chunks) == 64 * 1024
+
+
+def test_iter_upload_rejects_known_size_before_reading():
+    upload = make_upload(b"x" * 100)
+
+    async def run():
+        return [c async for c in iter_upload(upload, max_bytes=10)]
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(run())
+    assert upload.file.tell() == 0
+
+
+def test_iter_upload_enforces_limit_when_size_unknown():
+    upload = make_upload(b"x" * 100)
+    upload.size = None
+
+    async def run_unknown():
+        return [c async for c in iter_upload(upload, max_bytes=10, chunk_size=8)]
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(run_unknown())
+
+
+def test_stream_reaches_assemblyai_and_413_propagates():
+    received = []
+
+    async def handler(request):
+        if request.url.path.endswith("/upload"):
+            received.append(await request.aread())
+            return httpx.Response(200, json={"upload_url": "u"})
+        if request.url.path.endswith("/transcript"):
+            return httpx.Response(200, json={"id": "t"})
+        return httpx.Response(200, json={"status": "completed", "text": "streamed"})
+
+    client = AssemblyAITranscriber("key", min_poll=0.01, transport=httpx.MockTransport(handler))
+    data = b"a" * 150_000
+
+    assert asyncio.run(client.atranscribe_stream(iter_upload(make_upload(data), max_bytes=1_000_000))) == "streamed"
+    assert received == [data]
+
+    upload = make_upload(b"a" * 100)
+    upload.size = None
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(client.atranscribe_stream(iter_upload(upload, max_bytes=10, chunk_size=8)))
+
+
+def test_oversized_request_rejected_by_content_length(monkeypatch):
+    from app.main import app
+
+    calls = []
+
+    async def fake_stream(chunks):
+        calls.append(chunks)
+        return "never"
+
+    monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 1000)
+    monkeypatch.setattr(stt, "atranscribe_stream", fake_stream)
+    client = TestClient(app)
+
+    response = client.post("/tts/echo", files={"file": ("clip.webm", b"x" * 5000, "audio/webm")})
+
+    assert response.status_code == 413
+    assert calls == []
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the server-side voice activity gate
+"""
+import asyncio
+
+import numpy as np
+
+from app.services import vad
+from app.services.audio_ingress import AudioForwarder
+from app.services.vad import VoiceGate, voiced_windows
+
+RATE = 16000
+FRAME = 800
+
+
+def tone(amplitude=8000, freq=200, n=FRAME):
+    t = np.arange(n) / RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype("<i2").tobytes()
+
+
+def hush(n=FRAME):
+    return np.random.default_rng(n).normal(0, 20, n).astype("<i2").tobytes()
+
+
+def hiss(n=FRAME):
+    return np.random.default_rng(1).normal(0, 6000, n).astype("<i2").tobytes()
+
+
+def test_energy_and_zero_crossings():
+    assert voiced_windows(np.frombuffer(tone(), "<i2"), 320).all()
+    assert not voiced_windows(np.frombuffer(hush(), "<i2"), 320).any()
+    # Loud but broadband: high zero-crossing rate
+    assert not voiced_windows(np.frombuffer(hiss(), "<i2"), 320).any()
+    assert len(voiced_windows(np.zeros(0, dtype="<i2"), 320)) == 0
+
+
+def test_gate_drops_silence_with_hangover_preroll_and_keepalive():
+    gate = VoiceGate(RATE, hangover=0.1, preroll=0.1, keepalive=0.5)
+    pre = [hush() for _ in range(12)]
+    sent = [gate.process(f) for f in pre]
+    # 0.6 s of silence: nothing but one keep-alive of zeros
+    keepalives = [out for out in sent if out]
+    assert len(keepalives) == 1 and keepalives[0][0] == bytes(FRAME * 2)
+
+    speech = tone()
+    out = gate.process(speech)
+    # Pre-roll: the last 0.1 s of silence goes out ahead of the speech frame
+    assert out == pre[-2:] + [speech]
+    # Hangover: two 50 ms frames after speech still pass, then silence is dropped
+    assert gate.process(pre[0]) == [pre[0]]
+    assert gate.process(pre[1]) == [pre[1]]
+    assert gate.process(pre[2]) == []
+
+
+def test_forwarder_sends_only_gated_frames():
+    sent = []
+
+    async def send(data):
+        sent.append(bytes(data))
+
+    forwarder = AudioForwarder(send, gate=VoiceGate(RATE, hangover=0, preroll=0, keepalive=0))
+    before = dict(vad.stats)
+
+    async def run():
+        for frame in [hush(), tone(), hush(), hush()]:
+            await forwarder.forward(frame)
+
+    asyncio.run(run())
+    assert sent == [tone()]
+    assert vad.stats["bytes_in"] - before["bytes_in"] == 4 * FRAME * 2
+    assert vad.stats["bytes_sent"] - before["bytes_sent"] == FRAME * 2